@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Measures repeated access to the parsed properties of
+`cablemap.core.models.Cable` with and without the per instance cache.
+
+Usage::
+
+    python -m benchmarks.bench_cable_properties [--cables N] [--repeat N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import time
+import argparse
+from cablemap.core.models import Cable, cable_from_row
+from benchmarks.corpus import synthetic_rows
+
+_PROPERTIES = ('transmission_id', 'recipients', 'info_recipients', 'subject',
+               'classification_categories', 'nondisclosure_deadline',
+               'references', 'tags', 'summary', 'comment', 'signed_by',
+               'classified_by')
+
+
+def _uncached(cables, repeat):
+    parsers = [vars(Cable)[name].func for name in _PROPERTIES]
+    for cable in cables:
+        for _ in range(repeat):
+            for parse in parsers:
+                parse(cable)
+
+
+def _cached(cables, repeat):
+    for cable in cables:
+        for _ in range(repeat):
+            for name in _PROPERTIES:
+                getattr(cable, name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=500, help='number of synthetic cables')
+    parser.add_argument('--repeat', type=int, default=3, help='how often each property is accessed')
+    args = parser.parse_args()
+    rows = list(synthetic_rows(args.cables))
+    results = []
+    for name, func in (('uncached', _uncached), ('cached', _cached)):
+        cables = [cable_from_row(row) for row in rows]
+        start = time.perf_counter()
+        func(cables, args.repeat)
+        results.append((name, time.perf_counter() - start))
+    print('%d cables, every property accessed %d times' % (args.cables, args.repeat))
+    for name, total in results:
+        print('%-10s %8.3f s %8.3f ms/cable' % (name, total, total * 1000 / args.cables))
+    print('speedup    %8.2fx' % (results[0][1] / results[1][1]))
+
+
+if __name__ == '__main__':
+    main()
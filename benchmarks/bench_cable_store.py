@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares the memory usage of fully parsed `Cable` instances against a `CableStore`.
+
+Further, the time to count the cables per origin is measured. Usage::
+
+    python -m benchmarks.bench_cable_store [--cables N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+from collections import Counter
+from cablemap.core.models import cable_from_row, _RECORD_FIELDS
+from cablemap.core.store import CableStore
+from benchmarks.corpus import synthetic_rows
+
+
+def _parsed_cables(count):
+    for row in synthetic_rows(count):
+        cable = cable_from_row(row)
+        for name in _RECORD_FIELDS:
+            getattr(cable, name)
+        # Not part of the parsed properties
+        cable._content_sections = None
+        yield cable
+
+
+def _allocated(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=5000, help='number of synthetic cables')
+    args = parser.parse_args()
+    print('%d cables' % args.cables)
+    print('%-24s %10s %12s %14s' % ('', 'MB', 'bytes/cable', 'count origins'))
+    cables, size = _allocated(lambda: list(_parsed_cables(args.cables)))
+    start = time.perf_counter()
+    Counter(cable.origin for cable in cables)
+    elapsed = time.perf_counter() - start
+    print('%-24s %10.1f %12d %12.2f ms' % ('Cable', size / 1e6, size // args.cables, elapsed * 1000))
+    del cables
+    for name, include_text in (('CableStore', True), ('CableStore (no text)', False)):
+        def fill():
+            store = CableStore(include_text)
+            store.extend(_parsed_cables(args.cables))
+            return store
+        store, size = _allocated(fill)
+        start = time.perf_counter()
+        codes, values = store.codes('origin')
+        Counter(codes)
+        elapsed = time.perf_counter() - start
+        print('%-24s %10.1f %12d %12.2f ms' % (name, size / 1e6, size // args.cables, elapsed * 1000))
+        del store
+
+
+if __name__ == '__main__':
+    main()
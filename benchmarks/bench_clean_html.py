@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Measures the throughput of `cablemap.core.reader._clean_html` against the former implementation.
+
+Uses the ``<code><pre>`` sections of the HTML pages in ``tests/data-subject/in``.
+Usage::
+
+    python -m benchmarks.bench_clean_html [--repeat N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import time
+import codecs
+import argparse
+
+
+def _legacy_clean_html(html):
+    from cablemap.core import reader
+    content = html.replace(u'&#x000A;', u'\n').replace(u'¶', '')
+    content = reader._LINK_PATTERN.sub(u'', content)
+    content = reader._HTML_TAG_PATTERN.sub(u'', content)
+    content = reader._BACKSLASH_PATTERN.sub(u'\n', content)
+    return content
+
+
+def _sections():
+    from cablemap.core import reader
+    directory = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'data-subject', 'in')
+    sections = []
+    for name in sorted(os.listdir(directory)):
+        html = codecs.open(os.path.join(directory, name), 'rb', 'utf-8').read()
+        sections.extend(reader._CONTENT_PATTERN.findall(html))
+    return sections
+
+
+def _time(func, sections, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        for _ in range(50):
+            for section in sections:
+                func(section)
+        elapsed = (time.process_time() - start) / 50
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=20, help='number of runs, the best run is reported')
+    args = parser.parse_args()
+    from cablemap.core.reader import _clean_html
+    sections = _sections()
+    size = sum(len(section.encode('utf-8')) for section in sections) / 1048576.0
+    print('%d sections, %.1f KB' % (len(sections), size * 1024))
+    for name, func in (('legacy', _legacy_clean_html), ('current', _clean_html)):
+        elapsed = _time(func, sections, args.repeat)
+        print('%-8s %8.1f MB/s' % (name, size / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares the content parsers with and without a shared
+`cablemap.core.reader.ContentSections` instance.
+
+Usage::
+
+    python -m benchmarks.bench_content_sections [--cables N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import time
+import argparse
+from cablemap.core import reader
+from benchmarks.corpus import synthetic_rows
+
+
+def _parse(content, reference_id, sections):
+    reader.parse_subject(content, reference_id, sections=sections)
+    reader.parse_tags(content, reference_id, sections=sections)
+    reader.parse_references(content, u'2009', reference_id, sections=sections)
+    reader.parse_classified_by(content, sections=sections)
+    reader.parse_classification_categories(content, sections=sections)
+    reader.parse_nondisclosure_deadline(content, sections=sections)
+    reader.parse_summary(content, reference_id, sections=sections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=2000, help='number of synthetic cables')
+    args = parser.parse_args()
+    cables = [(row[7], row[2]) for row in synthetic_rows(args.cables)]
+    results = []
+    for name, shared in (('separate', False), ('shared', True)):
+        start = time.perf_counter()
+        for content, reference_id in cables:
+            _parse(content, reference_id, reader.ContentSections(content) if shared else None)
+        results.append((name, time.perf_counter() - start))
+    for name, total in results:
+        print('%-10s %8.3f s %8.3f ms/cable' % (name, total, total * 1000 / args.cables))
+    print('speedup    %8.2fx' % (results[0][1] / results[1][1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares reading a directory of cable HTML files with the former `cable_from_file` against the memory mapped one.
+
+The former implementation decoded the whole page and searched the
+``<code><pre>`` sections twice. The directory contains copies of the HTML
+pages in ``tests/data-subject/in``. Usage::
+
+    python -m benchmarks.bench_directory_ingest [--copies N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import time
+import codecs
+import shutil
+import tempfile
+import argparse
+
+
+def _legacy_cable_from_file(filename):
+    from cablemap.core import reader
+    from cablemap.core.models import cable_from_html
+    html = codecs.open(filename, 'rb', 'utf-8').read()
+    return cable_from_html(html, reader.reference_id_from_filename(filename))
+
+
+def _time(func, files):
+    start = time.perf_counter()
+    for filename in files:
+        func(filename)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--copies', type=int, default=500, help='number of copies of each HTML page')
+    args = parser.parse_args()
+    from cablemap.core.models import cable_from_file
+    from cablemap.core.utils import cablefiles_from_directory
+    source = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'data-subject', 'in')
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(args.copies):
+            shutil.copytree(source, os.path.join(directory, '%04d' % i))
+        files = list(cablefiles_from_directory(directory))
+        size = sum(os.path.getsize(filename) for filename in files) / 1048576.0
+        print('%d files, %.1f MB' % (len(files), size))
+        for name, func in (('legacy', _legacy_cable_from_file), ('mmap', cable_from_file)):
+            elapsed = _time(func, files)
+            print('%-8s %8.2f s %8.0f files/s %8.1f MB/s' % (name, elapsed, len(files) / elapsed, size / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
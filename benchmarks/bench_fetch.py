@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares fetching cables one by one with `cable_by_url` against `cables_by_urls`.
+
+The second run of `cable_by_url` uses a warm `cablemap.core.cache.ResponseCache`
+in offline mode. The cables are served by a local HTTP server which delays each response to
+simulate the network latency. Usage::
+
+    python -m benchmarks.bench_fetch [--cables N] [--latency SECONDS] [--concurrency N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import gzip
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def _handler(body, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=200, help='number of cables')
+    parser.add_argument('--latency', type=float, default=0.05, help='delay of each response in seconds')
+    parser.add_argument('--concurrency', type=int, default=32, help='number of concurrent requests')
+    args = parser.parse_args()
+    from cablemap.core import cable_by_url, utils
+    from cablemap.core.cache import ResponseCache
+    from cablemap.core.fetch import cables_by_urls
+    filename = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'data-subject', 'in', '07BERN881.html')
+    with open(filename, 'rb') as f:
+        body = gzip.compress(f.read())
+    server = _Server(('127.0.0.1', 0), _handler(body, args.latency))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    urls = ['http://127.0.0.1:%d/cable/%d' % (server.server_address[1], i) for i in range(args.cables)]
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            cable_by_url(url)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        n = sum(1 for _ in cables_by_urls(urls, concurrency=args.concurrency))
+        concurrent = time.perf_counter() - start
+        cache_dir = tempfile.mkdtemp()
+        cache = ResponseCache(cache_dir)
+        utils.set_response_cache(cache)
+        try:
+            for url in urls:
+                cable_by_url(url)
+            cache.offline = True
+            start = time.perf_counter()
+            for url in urls:
+                cable_by_url(url)
+            cached = time.perf_counter() - start
+        finally:
+            utils.set_response_cache(None)
+            cache.close()
+            shutil.rmtree(cache_dir)
+    finally:
+        server.shutdown()
+    print('%d cables, %.0f ms latency' % (n, args.latency * 1000))
+    print('cable_by_url:   %8.2f s' % sequential)
+    print('cables_by_urls: %8.2f s (concurrency %d, %.1fx)' % (concurrent, args.concurrency, sequential / concurrent))
+    print('cable_by_url:   %8.2f s (cached, %.1fx)' % (cached, sequential / cached))
+
+
+if __name__ == '__main__':
+    main()
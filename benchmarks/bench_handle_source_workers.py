@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Measures how `cablemap.core.handle_source` scales with the number of
+worker processes. Usage::
+
+    python -m benchmarks.bench_handle_source_workers [--cables N] [--workers 1,2,4]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import time
+import tempfile
+import argparse
+from cablemap.core import handle_source
+from cablemap.core.handler import NoopCableHandler
+from benchmarks.corpus import write_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=5000, help='number of synthetic cables')
+    parser.add_argument('--workers', default='1,2,4', help='comma separated list of worker counts')
+    args = parser.parse_args()
+    fd, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(filename, args.cables)
+        baseline = None
+        print('%-8s %10s %10s %8s' % ('workers', 'total', 'cables/s', 'speedup'))
+        for workers in [int(w) for w in args.workers.split(',')]:
+            start = time.perf_counter()
+            handle_source(filename, NoopCableHandler(), workers=workers)
+            total = time.perf_counter() - start
+            baseline = baseline or total
+            print('%-8d %8.2f s %10.0f %7.2fx' % (workers, total, args.cables / total, baseline / total))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Measures `cablemap.core.handler.handle_cables` through a 5-deep handler
+chain (logging -> id filter -> tee -> multiple -> noop) with the previous
+closure per event dispatch and with the current dispatch. Usage::
+
+    python -m benchmarks.bench_handler_chain [--cables N] [--repeat N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import time
+import logging
+import argparse
+from cablemap.core.models import cable_from_row, cable_record
+from cablemap.core.handler import handle_cables, NoopCableHandler, LoggingCableHandler, \
+    CableIdFilter, TeeCableHandler, MultipleCableHandler
+from benchmarks.corpus import synthetic_rows
+
+
+class _LegacyNoop(object):
+    def __getattr__(self, name):
+        def noop(*args): pass
+        return noop
+
+
+class _LegacyLogging(object):
+    def __init__(self, handler, level='info'):
+        self._handler = handler
+        self.level = level
+
+    def __getattr__(self, name):
+        def logme(*args):
+            getattr(logging, self.level)('%s%r' % (name, args))
+            getattr(self._handler, name)(*args)
+        return logme
+
+
+class _LegacyTee(object):
+    def __init__(self, first, second):
+        self._first = first
+        self._second = second
+
+    def __getattr__(self, name):
+        def delegate(*args):
+            getattr(self._first, name)(*args)
+            getattr(self._second, name)(*args)
+        return delegate
+
+
+class _LegacyMultiple(object):
+    def __init__(self, handlers):
+        self._handlers = tuple(handlers)
+
+    def __getattr__(self, name):
+        def delegate(*args):
+            for handler in self._handlers:
+                getattr(handler, name)(*args)
+        return delegate
+
+
+class _LegacyCableIdFilter(object):
+    def __init__(self, handler, predicate):
+        self._handler = handler
+        self._predicate = predicate
+        self._accept = False
+
+    def start(self):
+        self._handler.start()
+
+    def end(self):
+        self._handler.end()
+
+    def start_cable(self, reference_id, canonical_id):
+        self._accept = self._predicate(canonical_id)
+        if self._accept:
+            self._handler.start_cable(reference_id, canonical_id)
+
+    def __getattr__(self, name):
+        def noop(*args): pass
+        if self._accept:
+            return getattr(self._handler, name)
+        return noop
+
+
+def _chain(noop, logging_handler, id_filter, tee, multiple):
+    sink = multiple([noop(), noop()])
+    return logging_handler(id_filter(tee(noop(), sink), lambda canonical_id: True), level='debug')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=2000, help='number of synthetic cables')
+    parser.add_argument('--repeat', type=int, default=5, help='how often the cables are processed')
+    args = parser.parse_args()
+    cables = [cable_record(cable_from_row(row)) for row in synthetic_rows(args.cables)]
+    chains = (('closures', (_LegacyNoop, _LegacyLogging, _LegacyCableIdFilter, _LegacyTee, _LegacyMultiple)),
+              ('cached', (NoopCableHandler, LoggingCableHandler, CableIdFilter, TeeCableHandler, MultipleCableHandler)))
+    print('%d cables, %d runs' % (args.cables, args.repeat))
+    for name, classes in chains:
+        handler = _chain(*classes)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            handle_cables(cables, handler)
+        total = time.perf_counter() - start
+        print('%-10s %8.3f s %8.2f us/cable' % (name, total, total * 1e6 / (args.cables * args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares the former dict of ``cable2month.csv.gz`` against the memory mapped month index.
+
+Each variant runs in a fresh process to measure the resident memory. Usage::
+
+    python -m benchmarks.bench_month_index [--lookups N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import csv
+import gzip
+import time
+import random
+import resource
+import tempfile
+import argparse
+import multiprocessing
+
+
+def _reference_ids():
+    import cablemap.core
+    filename = os.path.join(os.path.dirname(cablemap.core.__file__), 'cable2month.csv.gz')
+    with gzip.open(filename, 'rt') as f:
+        return [row[0] for row in csv.reader(f) if row]
+
+
+def _legacy_load():
+    import cablemap.core
+    with gzip.open(os.path.join(os.path.dirname(cablemap.core.__file__), 'cable2month.csv.gz'), 'r') as f:
+        return dict(csv.reader(line.decode() for line in f))
+
+
+def _run(variant, ids, queue):
+    from cablemap.core import monthindex
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == 'dict':
+        mapping = _legacy_load()
+    else:
+        mapping = monthindex.MonthIndex(variant)
+    loaded = time.perf_counter()
+    get = mapping.get
+    for reference_id in ids:
+        get(reference_id)
+    end = time.perf_counter()
+    queue.put((loaded - start, end - loaded, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss))
+
+
+def _measure(variant, ids):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_run, args=(variant, ids, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lookups', type=int, default=1000, help='number of lookups')
+    args = parser.parse_args()
+    import cablemap.core
+    from cablemap.core.monthindex import build_month_index
+    ids = random.Random(42).sample(_reference_ids(), args.lookups)
+    fd, filename = tempfile.mkstemp(suffix='.idx')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        build_month_index(os.path.join(os.path.dirname(cablemap.core.__file__), 'cable2month.csv.gz'), filename)
+        print('Index build: %.2f s, %.1f MB' % (time.perf_counter() - start, os.path.getsize(filename) / 1048576.0))
+        print('%-8s %10s %12s %12s' % ('variant', 'load', 'lookups', 'max rss'))
+        for name, variant in (('dict', 'dict'), ('index', filename)):
+            load, lookups, rss = _measure(variant, ids)
+            print('%-8s %8.3f s %10.4f s %9.1f MB' % (name, load, lookups, rss / 1024.0))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
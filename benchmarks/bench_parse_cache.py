@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares `cablemap.core.handle_source` without a cache, with a cold cache
+and with a warm cache. Usage::
+
+    python -m benchmarks.bench_parse_cache [--cables N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import time
+import shutil
+import tempfile
+import argparse
+from cablemap.core import handle_source
+from cablemap.core.handler import NoopCableHandler
+from benchmarks.corpus import write_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=5000, help='number of synthetic cables')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'cables.csv')
+    cache_dir = os.path.join(directory, 'cache')
+    try:
+        write_csv(filename, args.cables)
+        print('%-10s %10s %10s' % ('run', 'total', 'cables/s'))
+        for name, kw in (('no cache', {}), ('cold', {'cache_dir': cache_dir}), ('warm', {'cache_dir': cache_dir})):
+            start = time.perf_counter()
+            handle_source(filename, NoopCableHandler(), **kw)
+            total = time.perf_counter() - start
+            print('%-10s %8.2f s %10.0f' % (name, total, args.cables / total))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
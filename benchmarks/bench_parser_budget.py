@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Measures `cablemap.core.handler.handle_cables` over synthetic cables with a
+few pathological cables (an unterminated "Classified By" line which lets
+``_CLIST_CONTENT_PATTERN`` backtrack quadratically) without and with a
+parser time budget. Usage::
+
+    python -m benchmarks.bench_parser_budget [--cables N] [--pathological N] [--size N] [--budget S]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import sys
+import time
+import logging
+import argparse
+from cablemap.core.models import cable_from_row
+from cablemap.core.handler import handle_cables, NoopCableHandler, TimingCableHandler
+from benchmarks.corpus import synthetic_rows
+
+
+def _pathological(row, size):
+    content = row[-1]
+    idx = content.index(u'Classified By')
+    return row[:-1] + (content[:idx] + u'Classified By: ' + u'POLITICAL COUNSELOR JOHN SMITH ' * (size // 31),)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=1000, help='number of synthetic cables')
+    parser.add_argument('--pathological', type=int, default=5, help='number of pathological cables')
+    parser.add_argument('--size', type=int, default=12000, help='length of the pathological "Classified By" line')
+    parser.add_argument('--budget', type=float, default=0.05, help='time budget per parser call in seconds')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    rows = list(synthetic_rows(args.cables))
+    step = max(1, len(rows) // max(1, args.pathological))
+    for i in range(0, min(len(rows), step * args.pathological), step):
+        rows[i] = _pathological(rows[i], args.size)
+    print('%d cables, %d pathological' % (len(rows), args.pathological))
+    for name, budget in (('no budget', None), ('budget', args.budget)):
+        handler = TimingCableHandler(NoopCableHandler(), budget=budget)
+        start = time.perf_counter()
+        handle_cables((cable_from_row(row) for row in rows), handler)
+        total = time.perf_counter() - start
+        outcomes = {}
+        for _, _, _, outcome in handler.timings.exceeded:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        print('%-10s %8.3f s  exceeded: %s' % (name, total, ', '.join('%s %d' % item for item in sorted(outcomes.items())) or '-'))
+    sys.stdout.write('\n' + handler.timings.report() + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares filtered runs over a CSV source with and without predicate pushdown.
+
+The former `cablemap.core.utils.rows_from_csv` decoded all columns of each
+row before the predicate was evaluated. Usage::
+
+    python -m benchmarks.bench_predicate_pushdown [--cables N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import sys
+import csv
+import time
+import tempfile
+import argparse
+csv.field_size_limit(sys.maxsize)
+
+
+def _legacy_rows_from_csv(filename, predicate=None, encoding='utf-8'):
+    pred = predicate or bool
+    with open(filename, 'r', encoding=encoding, newline='') as f:
+        for row in csv.reader(f, delimiter=',', quotechar='"', escapechar='\\'):
+            if not row:
+                continue
+            ident, created, reference_id, origin, classification, references, header, body = row
+            if pred(reference_id):
+                yield ident, created, reference_id, origin, classification, references, header, body
+
+
+def _time(func, filename, predicate):
+    from cablemap.core.models import cable_from_row
+    start = time.perf_counter()
+    n = 0
+    for row in func(filename, predicate):
+        cable_from_row(row)
+        n += 1
+    return n, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=20000, help='number of synthetic cables')
+    args = parser.parse_args()
+    from benchmarks.corpus import write_csv
+    from cablemap.core.utils import rows_from_csv
+    from cablemap.core.predicates import origin_filter, classification_filter
+    fd, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(filename, args.cables)
+        print('Corpus: %d cables, %.1f MB' % (args.cables, os.path.getsize(filename) / 1048576.0))
+        runs = (
+            ('full scan', None),
+            ('origin BERLIN', origin_filter(lambda origin: origin == u'BERLIN')),
+            ('SECRET', classification_filter(lambda c: c.upper().startswith(u'SECRET'))),
+        )
+        print('%-16s %8s %10s %10s %8s' % ('filter', 'cables', 'legacy', 'pushdown', 'speedup'))
+        for name, pred in runs:
+            legacy_pred = pred
+            if hasattr(pred, 'accept_row'):
+                # The former implementation can only evaluate the classification after parsing
+                legacy_pred = None
+            n, legacy = _time(_legacy_rows_from_csv, filename, legacy_pred)
+            m, pushdown = _time(rows_from_csv, filename, pred)
+            print('%-16s %8d %8.2f s %8.2f s %7.1fx' % (name, m, legacy, pushdown, legacy / pushdown))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
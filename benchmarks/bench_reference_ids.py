@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares the canonicalization and validation of reference identifiers one
+at a time against the batch functions and the station alternation patterns
+against the station trie patterns.
+
+Uses all cable identifiers of ``cablemap/core/cable2month.csv.gz``. Usage::
+
+    python -m benchmarks.bench_reference_ids [--repeat N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import re
+import csv
+import gzip
+import time
+import argparse
+
+
+def _reference_ids():
+    import cablemap.core
+    filename = os.path.join(os.path.dirname(cablemap.core.__file__), 'cable2month.csv.gz')
+    with gzip.open(filename, 'rt') as f:
+        return [row[0] for row in csv.reader(f) if row]
+
+
+def _per_id_c14n(ids):
+    from cablemap.core.c14n import canonicalize_id
+    return [canonicalize_id(reference_id) for reference_id in ids]
+
+
+def _per_id_validate(ids):
+    from cablemap.core.c14n import canonicalize_id
+    from cablemap.core.utils import reference_id_parts
+    result = []
+    for reference_id in ids:
+        try:
+            result.append(reference_id_parts(canonicalize_id(reference_id)))
+        except ValueError:
+            result.append(None)
+    return result
+
+
+def _time(func, ids, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(ids)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _matcher(pattern):
+    match = pattern.match
+    return lambda ids: [match(reference_id) for reference_id in ids]
+
+
+def _alternation_patterns():
+    """\
+    Returns the former ``consts.REFERENCE_ID_PATTERN`` and ``reader._C14N_PATTERN``
+    which used an alternation of all stations.
+    """
+    from cablemap.core import consts, reader
+    return (re.compile(r'^([0-9]{2})(%s)([0-9]{%d,%d})$' % ('|'.join(consts._STATIONS), consts.MIN_SERIAL_LENGTH,
+                                                            consts.MAX_SERIAL_LENGTH), re.UNICODE),
+            re.compile(r'[0-9]{2}(%s)[0-9]+' % '|'.join(reader._C14N_FIXES.keys())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs, the best run is reported')
+    args = parser.parse_args()
+    from cablemap.core import consts, reader
+    from cablemap.core.c14n import canonicalize_ids
+    from cablemap.core.utils import validate_ids
+    ids = _reference_ids()
+    print('%d identifiers' % len(ids))
+    print('%-12s %12s %12s %8s' % ('task', 'per id', 'batch', 'speedup'))
+    for name, per_id, batch in (('c14n', _per_id_c14n, canonicalize_ids),
+                                ('validation', _per_id_validate, validate_ids)):
+        a = _time(per_id, ids, args.repeat)
+        b = _time(batch, ids, args.repeat)
+        print('%-12s %10.3f s %10.3f s %7.1fx' % (name, a, b, a / b))
+    canonical_ids = canonicalize_ids(ids)
+    # Identifiers without a valid station
+    invalid_ids = [reference_id[:2] + u'X' + reference_id[2:] for reference_id in canonical_ids]
+    reference_id_pattern, c14n_pattern = _alternation_patterns()
+    print('')
+    print('%-20s %12s %12s %8s' % ('pattern', 'alternation', 'trie', 'speedup'))
+    for name, old, new, sample in (('reference id', reference_id_pattern, consts.REFERENCE_ID_PATTERN, canonical_ids),
+                                   ('reference id (bad)', reference_id_pattern, consts.REFERENCE_ID_PATTERN, invalid_ids),
+                                   ('reader c14n', c14n_pattern, reader._C14N_PATTERN, ids)):
+        a = _time(_matcher(old), sample, args.repeat)
+        b = _time(_matcher(new), sample, args.repeat)
+        print('%-20s %10.3f s %10.3f s %7.1fx' % (name, a, b, a / b))
+
+
+if __name__ == '__main__':
+    main()
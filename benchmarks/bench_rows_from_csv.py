@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compares the streaming `cablemap.core.utils.rows_from_csv` against the
+former implementation which read all lines into memory before the first
+row was returned.
+
+Each implementation runs in its own process to get meaningful peak RSS
+values. Usage::
+
+    python -m benchmarks.bench_rows_from_csv [--cables N]
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import sys
+import csv
+import time
+import json
+import resource
+import tempfile
+import argparse
+import subprocess
+csv.field_size_limit(sys.maxsize)
+
+
+def _legacy_rows_from_csv(filename, predicate=None, encoding='utf-8'):
+    pred = predicate or bool
+    with open(filename, 'rb') as f:
+        for row in csv.reader((line.decode() for line in f.readlines()), delimiter=',', quotechar='"', escapechar='\\'):
+            ident, created, reference_id, origin, classification, references, header, body = row
+            if row and pred(reference_id):
+                yield ident, created, reference_id, origin, classification, references, header, body
+
+
+def _maxrss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _run(impl, filename):
+    from cablemap.core.models import cable_from_row
+    from cablemap.core.utils import rows_from_csv
+    rows = _legacy_rows_from_csv if impl == 'legacy' else rows_from_csv
+    rss_before = _maxrss_mb()
+    start = time.perf_counter()
+    cables = (cable_from_row(row) for row in rows(filename))
+    next(cables)
+    first = time.perf_counter() - start
+    n = 1
+    for _ in cables:
+        n += 1
+    total = time.perf_counter() - start
+    print(json.dumps({'impl': impl, 'cables': n, 'first_cable': first,
+                      'total': total, 'peak_rss_delta_mb': _maxrss_mb() - rss_before}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=20000, help='number of synthetic cables')
+    parser.add_argument('--run', choices=('legacy', 'streaming'), help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return _run(args.run, args.file)
+    from benchmarks.corpus import write_csv
+    fd, filename = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_csv(filename, args.cables)
+        print('Corpus: %d cables, %.1f MB' % (args.cables, os.path.getsize(filename) / 1048576.0))
+        print('%-10s %14s %10s %18s' % ('impl', 'first cable', 'total', 'peak RSS delta'))
+        for impl in ('legacy', 'streaming'):
+            out = subprocess.check_output([sys.executable, '-m', 'benchmarks.bench_rows_from_csv',
+                                           '--run', impl, '--file', filename])
+            res = json.loads(out)
+            print('%-10s %12.4f s %8.2f s %15.1f MB' % (impl, res['first_cable'], res['total'], res['peak_rss_delta_mb']))
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Generates synthetic cable corpora for the benchmarks.
+
+The real ``cables.csv`` cannot be shipped, so the benchmarks use cables
+which mimic the structure of real cables (header, subject, TAGS, references,
+summary, numbered paragraphs and signer).
+
+`fixture_rows` and `fixture_pages` derive cables from the real cables of
+the test fixtures (``tests/data-subject/in``).
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import re
+import random
+from html import escape
+
+_ORIGINS = (
+    (u'BERLIN', u'Embassy Berlin'), (u'MADRID', u'Embassy Madrid'),
+    (u'ROME', u'Embassy Rome'), (u'STATE', u'Secretary of State'),
+    (u'MOSCOW', u'Embassy Moscow'), (u'BRASILIA', u'Embassy Brasilia'),
+    (u'CAIRO', u'Embassy Cairo'), (u'TOKYO', u'Embassy Tokyo'),
+)
+
+_CLASSIFICATIONS = (u'UNCLASSIFIED', u'UNCLASSIFIED//FOR OFFICIAL USE ONLY',
+                    u'CONFIDENTIAL', u'SECRET', u'SECRET//NOFORN')
+
+_TAGS = (u'PREL', u'PGOV', u'ECON', u'EFIN', u'MARR', u'PHUM', u'KNNP',
+         u'PTER', u'ETRD', u'SNAR', u'GM', u'SP', u'IT', u'RS', u'BR', u'EG')
+
+_WORDS = (u'the', u'minister', u'said', u'government', u'embassy', u'would',
+          u'meeting', u'officials', u'support', u'election', u'security',
+          u'economic', u'discussed', u'with', u'and', u'of', u'to', u'in',
+          u'that', u'policy', u'president', u'party', u'cooperation')
+
+_SIGNERS = (u'CLINTON', u'RICE', u'TIMKEN', u'AGUIRRE', u'SPOGLI', u'BEYRLE')
+
+_HEADER = u'''VZCZCXRO%(tid)s
+PP RUEHAG RUEHROV
+DE RUEH%(short)s #%(sn)04d/01 %(day)03d1234
+ZNY CCCCC ZZH
+P %(day)02d1234Z %(month)s %(year)02d
+FM AMEMBASSY %(origin)s
+TO RUEHC/SECSTATE WASHDC PRIORITY %(mcn)s
+INFO RUCNMEM/EU MEMBER STATES COLLECTIVE
+RUEHBS/USEU BRUSSELS 1234'''
+
+_CONTENT = u'''%(classification)s SECTION 01 OF 02 %(origin)s %(sn)06d
+
+SIPDIS
+
+E.O. 12958: DECL: %(month_num)02d/%(day)02d/20%(decl)02d
+TAGS: %(tags)s
+SUBJECT: %(subject)s
+
+REF: A. %(ref1)s
+     B. %(ref2)s
+
+Classified By: Ambassador %(signer_title)s for reasons 1.4 (b) and (d)
+
+1. (C) SUMMARY: %(summary)s END SUMMARY.
+
+%(paragraphs)s
+
+%(comment_no)d. (C) COMMENT: %(comment)s END COMMENT.
+
+%(signer)s
+'''
+
+
+def _sentence(rnd, min_words=8, max_words=25):
+    words = [rnd.choice(_WORDS) for _ in range(rnd.randint(min_words, max_words))]
+    return u' '.join(words).capitalize() + u'.'
+
+
+def _text(rnd, sentences):
+    return u' '.join(_sentence(rnd) for _ in range(sentences))
+
+
+def synthetic_rows(count, seed=42, paragraphs=8):
+    """\
+    Returns a generator which yields `count` synthetic CSV rows.
+
+    The rows have the same layout as the rows returned by
+    `cablemap.core.utils.rows_from_csv`.
+
+    `count`
+        The number of rows to generate.
+    `seed`
+        Seed for the random generator, the same seed generates the same corpus.
+    `paragraphs`
+        Number of numbered paragraphs per cable.
+    """
+    rnd = random.Random(seed)
+    for i in range(count):
+        origin, origin_name = rnd.choice(_ORIGINS)
+        year = rnd.randint(2003, 2010)
+        month_num = rnd.randint(1, 12)
+        day = rnd.randint(1, 28)
+        sn = rnd.randint(1, 9999)
+        reference_id = u'%02d%s%d' % (year % 100, origin, sn)
+        classification = rnd.choice(_CLASSIFICATIONS)
+        signer = rnd.choice(_SIGNERS)
+        values = {
+            'tid': u'%04d' % rnd.randint(0, 9999),
+            'short': origin[:2],
+            'sn': sn,
+            'day': day,
+            'month': (u'JAN', u'FEB', u'MAR', u'APR', u'MAY', u'JUN', u'JUL',
+                      u'AUG', u'SEP', u'OCT', u'NOV', u'DEC')[month_num - 1],
+            'month_num': month_num,
+            'year': year % 100,
+            'decl': year % 100 + 10,
+            'origin': origin,
+            'mcn': u'%04d' % rnd.randint(0, 9999),
+            'classification': classification.split(u'/')[0],
+            'tags': u', '.join(rnd.sample(_TAGS, rnd.randint(2, 6))),
+            'subject': _sentence(rnd, 4, 10).rstrip(u'.').upper(),
+            'ref1': u'%02d %s %d' % (year % 100 - 1, rnd.choice(_ORIGINS)[0], rnd.randint(1, 9999)),
+            'ref2': u'%02d %s %d' % (year % 100, origin, rnd.randint(1, 9999)),
+            'signer_title': signer.title(),
+            'signer': signer,
+            'summary': _text(rnd, 3),
+            'comment_no': paragraphs + 2,
+            'comment': _text(rnd, 2),
+            'paragraphs': u'\n\n'.join(u'%d. (C) %s' % (n, _text(rnd, rnd.randint(3, 8)))
+                                       for n in range(2, paragraphs + 2)),
+        }
+        created = u'%d/%d/%d %d:%02d' % (month_num, day, year, rnd.randint(0, 23), rnd.randint(0, 59))
+        yield (str(i + 1), created, reference_id, origin_name, classification,
+               values['ref1'], _HEADER % values, _CONTENT % values)
+
+
+def write_csv(filename, count, seed=42, paragraphs=8):
+    """\
+    Writes a synthetic CSV corpus with `count` cables to `filename`.
+
+    The file uses the same dialect as the Cablegate ``cables.csv``.
+    """
+    def quote(s):
+        return u'"%s"' % s.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        for row in synthetic_rows(count, seed, paragraphs):
+            f.write(u','.join(quote(v) for v in row))
+            f.write(u'\n')
+
+
+_FIXTURES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'data-subject', 'in')
+
+_PARAGRAPH_PATTERN = re.compile(r'^[ ]*[1-9][0-9]?\.[ ]+', re.MULTILINE)
+_PRE_PATTERN = re.compile(r'(<code><pre>)(.+?)(</pre></code>)', re.DOTALL)
+_REFERENCE_ID_PATTERN = re.compile(r'^([0-9]{2}[A-Z]+?)([0-9]+)$')
+
+
+def _split_paragraphs(content):
+    """\
+    Returns the text before the first numbered paragraph and a list of the
+    paragraphs (without their number).
+    """
+    starts = [m for m in _PARAGRAPH_PATTERN.finditer(content)]
+    if not starts:
+        return content, []
+    bounds = [m.start() for m in starts] + [len(content)]
+    return content[:bounds[0]], [content[m.end():end] for m, end in zip(starts, bounds[1:])]
+
+
+def fixture_cables():
+    """\
+    Returns a list of ``(cable, html)`` tuples of the cables in ``tests/data-subject/in``.
+    """
+    from cablemap.core.models import cable_from_file
+    result = []
+    for name in sorted(os.listdir(_FIXTURES_DIR)):
+        if name.endswith('.html'):
+            filename = os.path.join(_FIXTURES_DIR, name)
+            with open(filename, encoding='utf-8') as f:
+                result.append((cable_from_file(filename), f.read()))
+    return result
+
+
+def _fixture_variants(count, seed):
+    """\
+    Yields `count` ``(fixture-index, row)`` tuples.
+
+    Each row keeps the header, the text before the first numbered paragraph
+    and the last paragraph (the signer) of a fixture cable. The other
+    paragraphs are randomly picked from all fixture cables.
+    """
+    rnd = random.Random(seed)
+    fixtures = [cable for cable, _ in fixture_cables()]
+    parts = [_split_paragraphs(cable.content) for cable in fixtures]
+    pool = [paragraph for _, paragraphs in parts for paragraph in paragraphs[:-1]]
+    for i in range(count):
+        idx = rnd.randrange(len(fixtures))
+        cable = fixtures[idx]
+        head, paragraphs = parts[idx]
+        if paragraphs:
+            body = rnd.sample(pool, min(len(pool), rnd.randint(1, max(1, len(paragraphs) - 1)))) + paragraphs[-1:]
+            content = head + u''.join(u'%d. %s' % (n, paragraph) for n, paragraph in enumerate(body, 1))
+        else:
+            content = cable.content
+        m = _REFERENCE_ID_PATTERN.match(cable.reference_id)
+        reference_id = u'%s%d' % (m.group(1), rnd.randint(1, 9999)) if m else cable.reference_id
+        date, time = cable.created.split()
+        year, month, day = date.split(u'-')
+        created = u'%d/%d/%s %s' % (int(month), int(day), year, time)
+        yield idx, (str(i + 1), created, reference_id, cable.origin, cable.classification,
+                    u'', cable.header, content)
+
+
+def fixture_rows(count, seed=42):
+    """\
+    Returns a generator which yields `count` CSV rows derived from the
+    fixture cables, c.f. `synthetic_rows`.
+
+    `count`
+        The number of rows to generate.
+    `seed`
+        Seed for the random generator, the same seed generates the same corpus.
+    """
+    for _, row in _fixture_variants(count, seed):
+        yield row
+
+
+def fixture_pages(count, seed=42):
+    """\
+    Returns a generator which yields `count` Cablegate HTML pages, the pages
+    of the fixture cables with the header and content of `fixture_rows`.
+    """
+    pages = [page for _, page in fixture_cables()]
+    fixtures = [cable.reference_id for cable, _ in fixture_cables()]
+    for idx, row in _fixture_variants(count, seed):
+        sections = iter((row[6], row[7]))
+        def replace(m):
+            return m.group(1) + escape(next(sections), False).replace(u'\n', u'&#x000A;') + m.group(3)
+        yield _PRE_PATTERN.sub(replace, pages[idx], 2).replace(fixtures[idx], row[2])
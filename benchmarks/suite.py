@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Times the parser functions over a synthetic corpus and detects regressions against a baseline.
+
+The corpus consists of `benchmarks.corpus.synthetic_rows` and of cables
+derived from the test fixtures (`benchmarks.corpus.fixture_rows` and
+`benchmarks.corpus.fixture_pages`). Each benchmark runs over the whole
+corpus, the best of ``--repeat`` runs is reported as CPU time per item.
+
+Timed are all ``cablemap.core.reader.parse_*`` functions, ``cable_from_row``,
+``cable_from_html``, ``titlefy``, ``clean_content``, ``canonicalize_id`` and
+``handle_cables`` (end to end with a `NoopCableHandler`).
+
+Usage::
+
+    python -m benchmarks.suite --save baseline.json
+    # ... change the code ...
+    python -m benchmarks.suite --baseline baseline.json [--threshold 0.25]
+
+With ``--baseline``, the exit code is ``1`` if a benchmark is more than
+``--threshold`` (relative) slower than the baseline. Baselines are only
+comparable if they were recorded on the same machine with the same corpus
+options.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import re
+import sys
+import json
+import time
+import platform
+import argparse
+from cablemap.core import reader
+from cablemap.core.models import Cable, cable_from_row, cable_from_html
+from cablemap.core.utils import titlefy, clean_content
+from cablemap.core.c14n import canonicalize_id
+from cablemap.core.handler import handle_cables, NoopCableHandler
+from benchmarks.corpus import synthetic_rows, fixture_rows, fixture_pages
+
+_VERSION = 1
+
+
+class _Corpus(object):
+    """\
+    The inputs of the benchmarks.
+    """
+    def __init__(self, count, seed):
+        self.rows = list(synthetic_rows(count - count // 2, seed)) + list(fixture_rows(count // 2, seed))
+        self.pages = list(fixture_pages(count // 2, seed))
+        self.page_ids = [reader.reference_id_from_html(page) for page in self.pages]
+        cables = [cable_from_row(row) for row in self.rows]
+        self.cables = [(cable.reference_id, cable.header, cable.content, cable.created[:4]) for cable in cables]
+        self.contents = [cable.content for cable in cables]
+        self.subjects = [cable.subject for cable in cables]
+        self.reference_ids = [cable.reference_id for cable in cables]
+        # Reference ids as they occur in REF sections
+        self.reference_ids += [(u'%s %s %s' % (reference_id[:2], reference_id[2:-4], reference_id[-4:])).lower()
+                               for reference_id in self.reference_ids]
+
+
+def _parser(func, args):
+    """\
+    Returns a benchmark which invokes the reader function `func` for each
+    cable. `args` returns the arguments from a ``(reference_id, header,
+    content, year)`` tuple.
+    """
+    def run(corpus):
+        for cable in corpus.cables:
+            func(*args(*cable))
+        return len(corpus.cables)
+    return run
+
+
+# The arguments of the parser functions, c.f. the properties of `cablemap.core.models.Cable`
+_PARSER_ARGS = {
+    'parse_transmission_id': lambda reference_id, header, content, year: (header,),
+    'parse_recipients': lambda reference_id, header, content, year: (header, reference_id),
+    'parse_info_recipients': lambda reference_id, header, content, year: (header, reference_id),
+    'parse_subject': lambda reference_id, header, content, year: (content, reference_id),
+    'parse_tags': lambda reference_id, header, content, year: (content, reference_id),
+    'parse_references': lambda reference_id, header, content, year: (content, year, reference_id),
+    'parse_summary': lambda reference_id, header, content, year: (content, reference_id),
+    'parse_comment': lambda reference_id, header, content, year: (content,),
+    'parse_signed_by': lambda reference_id, header, content, year: (content,),
+    'parse_classified_by': lambda reference_id, header, content, year: (content,),
+    'parse_classification_categories': lambda reference_id, header, content, year: (content,),
+    'parse_nondisclosure_deadline': lambda reference_id, header, content, year: (content,),
+}
+
+
+def _parse_meta(corpus):
+    for page, reference_id in zip(corpus.pages, corpus.page_ids):
+        reader.parse_meta(page, Cable(reference_id))
+    return len(corpus.pages)
+
+
+def _each(func, attr):
+    def run(corpus):
+        items = getattr(corpus, attr)
+        for item in items:
+            func(item)
+        return len(items)
+    return run
+
+
+def _handle_cables(corpus):
+    handle_cables((cable_from_row(row) for row in corpus.rows), NoopCableHandler())
+    return len(corpus.rows)
+
+
+def benchmarks():
+    """\
+    Returns a list of ``(name, benchmark)`` tuples. A benchmark accepts the
+    corpus and returns the number of processed items.
+
+    Raises a ``ValueError`` if a parser function of `cablemap.core.reader`
+    is not covered.
+    """
+    result = []
+    for name in sorted(name for name in dir(reader) if name.startswith('parse_')):
+        if name == 'parse_meta':
+            bench = _parse_meta
+        elif name in _PARSER_ARGS:
+            bench = _parser(getattr(reader, name), _PARSER_ARGS[name])
+        else:
+            raise ValueError('No benchmark for "reader.%s", please update _PARSER_ARGS' % name)
+        result.append(('reader.' + name, bench))
+    result.extend([
+        ('cable_from_row', _each(cable_from_row, 'rows')),
+        ('cable_from_html', _each(cable_from_html, 'pages')),
+        ('titlefy', _each(titlefy, 'subjects')),
+        ('clean_content', _each(clean_content, 'contents')),
+        ('canonicalize_id', _each(canonicalize_id, 'reference_ids')),
+        ('handle_cables', _handle_cables),
+    ])
+    return result
+
+
+def _measure(bench, corpus, min_time):
+    """\
+    Runs `bench` at least once and until `min_time` seconds passed, returns
+    the CPU time per item.
+    """
+    count, elapsed = 0, 0.0
+    while not count or elapsed < min_time:
+        start = time.process_time()
+        count += bench(corpus)
+        elapsed += time.process_time() - start
+    return elapsed / max(1, count)
+
+
+def run(corpus, repeat, pattern=None, min_time=0.05):
+    """\
+    Runs the benchmarks and returns a dict which maps the benchmark name to
+    the best CPU time per item in seconds.
+
+    The benchmarks are run in turns, so that a temporarily busy machine does
+    not affect all runs of one benchmark.
+    """
+    selected = [(name, bench) for name, bench in benchmarks() if not pattern or re.search(pattern, name)]
+    results = {}
+    for _ in range(repeat):
+        for name, bench in selected:
+            elapsed = _measure(bench, corpus, min_time)
+            results[name] = min(elapsed, results.get(name, elapsed))
+    return results
+
+
+def compare(baseline, results, threshold):
+    """\
+    Returns a list of ``(name, baseline, result, ratio)`` tuples of the
+    benchmarks which are more than `threshold` slower than the `baseline`.
+    """
+    regressions = []
+    for name, elapsed in sorted(results.items()):
+        base = baseline.get(name)
+        if base and elapsed / base > 1 + threshold:
+            regressions.append((name, base, elapsed, elapsed / base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--cables', type=int, default=500, help='number of cables in the corpus')
+    parser.add_argument('--seed', type=int, default=42, help='seed of the corpus generator')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs, the best run is reported')
+    parser.add_argument('--filter', help='regular expression which selects the benchmarks by name')
+    parser.add_argument('--save', metavar='FILE', help='writes the results as JSON into FILE')
+    parser.add_argument('--baseline', metavar='FILE', help='compares the results against the JSON FILE')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='max. relative slowdown against the baseline (default: 0.25)')
+    args = parser.parse_args()
+    corpus = _Corpus(args.cables, args.seed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            data = json.load(f)
+        if (data.get('cables'), data.get('seed')) != (args.cables, args.seed):
+            sys.stderr.write('Warning: the baseline uses %s cables and seed %s\n' % (data.get('cables'), data.get('seed')))
+        baseline = data['results']
+    results = run(corpus, args.repeat, args.filter)
+    print('%d cables, %d HTML pages, best of %d runs' % (len(corpus.rows), len(corpus.pages), args.repeat))
+    if baseline is None:
+        print('%-40s %14s' % ('benchmark', 'us/item'))
+        for name, elapsed in sorted(results.items()):
+            print('%-40s %14.2f' % (name, elapsed * 1e6))
+    else:
+        print('%-40s %14s %14s %8s' % ('benchmark', 'baseline', 'us/item', 'ratio'))
+        for name, elapsed in sorted(results.items()):
+            base = baseline.get(name)
+            print('%-40s %14s %14.2f %8s' % (name, '%.2f' % (base * 1e6) if base else '-', elapsed * 1e6,
+                                             '%.2f' % (elapsed / base) if base else '-'))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'version': _VERSION, 'cables': args.cables, 'seed': args.seed,
+                       'python': platform.python_version(), 'machine': platform.machine(),
+                       'results': results}, f, indent=2, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        for name, base, elapsed, ratio in regressions:
+            sys.stderr.write('Regression: %s %.2f us -> %.2f us (%.2fx)\n' % (name, base * 1e6, elapsed * 1e6, ratio))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
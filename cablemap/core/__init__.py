@@ -20,9 +20,27 @@ from logging import NullHandler
 
 __all__ = ['cable_from_file', 'cable_from_html', 'cable_from_row',
            'cables_from_source', 'cables_from_directory', 'cables_from_csv',
-           'cable_by_id', 'cable_by_url', 'handle_source'
+           'cable_by_id', 'cable_by_url', 'cables_by_ids', 'cables_by_urls', 'handle_source'
            ]
 
+
+def cables_by_ids(*args, **kw):
+    """\
+    C.f. `cablemap.core.fetch.cables_by_ids`.
+    """
+    # Imported on demand to avoid loading asyncio and ssl on import
+    from cablemap.core.fetch import cables_by_ids
+    return cables_by_ids(*args, **kw)
+
+
+def cables_by_urls(*args, **kw):
+    """\
+    C.f. `cablemap.core.fetch.cables_by_urls`.
+    """
+    from cablemap.core.fetch import cables_by_urls
+    return cables_by_urls(*args, **kw)
+
+
 _nh = NullHandler()
 
 logger = logging.getLogger('cablemap')
@@ -171,6 +171,10 @@ _STATION_C14N = {
 
 _C14N_PATTERN = re.compile(r'[0-9]{2}([0A-Z\-]+)[0-9]+')
 
+# Malformed and invalid identifiers -> valid identifier
+_FIXED_IDS = dict(INVALID_CABLE_IDS)
+_FIXED_IDS.update(MALFORMED_CABLE_IDS)
+
 def canonicalize_origin(origin):
     """\
 
@@ -206,6 +210,95 @@ def canonicalize_id(reference_id):
         return reference_id.replace(origin, canonicalize_origin(origin))
     return reference_id
 
+
+def canonicalize_ids(reference_ids):
+    """\
+    Returns a list with the canonicalized forms of the provided reference
+    identifiers, c.f. `canonicalize_id`.
+
+    The origins of all identifiers are extracted by one regular expression
+    pass and each distinct origin is canonicalized only once.
+
+    `reference_ids`
+        An iterable of cable identifiers.
+    """
+    fixed_id = _FIXED_IDS.get
+    reference_ids = [fixed_id(reference_id, reference_id) for reference_id in reference_ids]
+    origins = _C14N_ORIGIN_COLUMN_PATTERN.findall(u'\n'.join(reference_ids))
+    if len(origins) != len(reference_ids):
+        # At least one identifier contains a line break
+        origins = [_split_id(reference_id)[1] for reference_id in reference_ids]
+    fixes = {}
+    for origin in set(origins):
+        canonical_origin = canonicalize_origin(origin) if origin else origin
+        if canonical_origin != origin:
+            fixes[origin] = canonical_origin
+    if not fixes:
+        return reference_ids
+    return [reference_id.replace(origin, fixes[origin]) if origin in fixes else reference_id
+            for reference_id, origin in zip(reference_ids, origins)]
+
+
+# The following patterns match each line of a newline separated list of
+# identifiers. Identifiers which are not matched by _C14N_PATTERN are matched
+# by the second alternative and all groups are empty.
+_C14N_ORIGIN_COLUMN_PATTERN = re.compile(r'^(?:[0-9]{2}([0A-Z\-]+)[0-9][^\n]*|[^\n]*)$', re.MULTILINE)
+_C14N_COLUMN_PATTERN = re.compile(r'^(?:([0-9]{2})([0A-Z\-]+)([0-9][^\n]*)|[^\n]*)$', re.MULTILINE)
+
+def _id_columns(reference_ids, canonicalize=True):
+    """\
+    Returns a tuple of four lists::
+
+        (identifiers, YEARs, ORIGINs, RESTs)
+
+    where RESTs are the remaining characters after the origin, usually the
+    serial number. YEAR, ORIGIN and REST are empty strings if the identifier
+    is not matched by `_C14N_PATTERN`.
+
+    `reference_ids`
+        An iterable of cable identifiers.
+    `canonicalize`
+        Indicates if the identifiers and origins should be canonicalized
+        (enabled by default).
+    """
+    if canonicalize:
+        fixed_id = _FIXED_IDS.get
+        reference_ids = [fixed_id(reference_id, reference_id) for reference_id in reference_ids]
+    else:
+        reference_ids = list(reference_ids)
+    if not reference_ids:
+        return [], [], [], []
+    parts = _C14N_COLUMN_PATTERN.findall(u'\n'.join(reference_ids))
+    if len(parts) != len(reference_ids):
+        # At least one identifier contains a line break
+        parts = [_split_id(reference_id) for reference_id in reference_ids]
+    if not canonicalize:
+        return (reference_ids,) + tuple(list(column) for column in zip(*parts))
+    origins = {}
+    canonical_ids, years, canonical_origins, rests = [], [], [], []
+    for reference_id, (year, origin, rest) in zip(reference_ids, parts):
+        canonical_origin = origins.get(origin)
+        if canonical_origin is None:
+            canonical_origin = origins[origin] = canonicalize_origin(origin) if origin else origin
+        if canonical_origin != origin:
+            reference_id = reference_id.replace(origin, canonical_origin)
+        canonical_ids.append(reference_id)
+        years.append(year)
+        canonical_origins.append(canonical_origin)
+        rests.append(rest)
+    return canonical_ids, years, canonical_origins, rests
+
+
+def _split_id(reference_id):
+    """\
+    Returns a ``(YEAR, ORIGIN, REST)`` tuple, c.f. `_id_columns`.
+    """
+    m = _C14N_PATTERN.match(reference_id)
+    if m:
+        return reference_id[:2], m.group(1), reference_id[m.end(1):]
+    return u'', u'', u''
+
+
 _SURNAME_C14N = {
     u'ADDELTON': u'ADDLETON',
     u'ALLGEIR': u'ALLGEIER',
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Persistent caches of parsed cables and of fetched cable pages.
+
+`ParseCache` stores fully parsed `cablemap.core.models.CableRecord` instances
+in a SQLite database. Entries are keyed by the reference identifier and a
+digest of the raw cable (the CSV row or the HTML page). The cache is
+discarded automatically if the parser modules change.
+
+`ResponseCache` stores the responses of `cablemap.core.utils.cable_by_id`
+and `cablemap.core.utils.cable_by_url` requests, c.f.
+`cablemap.core.utils.set_response_cache`.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import time
+import zlib
+import pickle
+import sqlite3
+import hashlib
+from cablemap.core import reader, models, c14n, consts
+from cablemap.core.models import cable_from_row, cable_from_html, cable_record
+from cablemap.core.interfaces import IResponseCache, implements
+
+__all__ = ['ParseCache', 'ResponseCache', 'parser_version']
+
+_CACHE_FILENAME = 'parse-cache.sqlite'
+_RESPONSE_CACHE_FILENAME = 'response-cache.sqlite'
+_SQLITE_MAX_VARS = 500
+# Max. number of reads of the response cache before the access times are committed
+_ACCESS_COMMIT_INTERVAL = 100
+
+_parser_version = None
+
+
+def parser_version():
+    """\
+    Returns a string which changes whenever one of the modules which
+    influence the parsing results changes.
+    """
+    global _parser_version
+    if _parser_version is None:
+        h = hashlib.sha1()
+        for module in (reader, models, c14n, consts):
+            with open(os.path.splitext(module.__file__)[0] + '.py', 'rb') as f:
+                h.update(f.read())
+        _parser_version = h.hexdigest()
+    return _parser_version
+
+
+def _digest(*values):
+    h = hashlib.sha1()
+    for value in values:
+        h.update((value or u'').encode('utf-8'))
+        h.update(b'\x00')
+    return h.digest()
+
+
+class ParseCache(object):
+    """\
+    SQLite based cache of `cablemap.core.models.CableRecord` instances.
+    """
+    def __init__(self, cache_dir, version=None):
+        """\
+
+        `cache_dir`
+            The directory where the cache is stored. It is created if
+            it does not exist.
+        `version`
+            The parser version (default: `parser_version()`). If the cache
+            was created by another version, all entries are discarded.
+        """
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, _CACHE_FILENAME))
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cables (reference_id TEXT PRIMARY KEY, digest BLOB, record BLOB)')
+        version = version or parser_version()
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'parser_version'").fetchone()
+        if not row or row[0] != version:
+            self._conn.execute('DELETE FROM cables')
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('parser_version', ?)", (version,))
+        self._conn.commit()
+
+    @staticmethod
+    def key_from_row(row):
+        """\
+        Returns the cache key of the provided CSV `row`.
+
+        The identifier and the references column are not part of the
+        digest since `cablemap.core.models.cable_from_row` ignores them.
+        """
+        return row[2], _digest(*(row[1:5] + row[6:]))
+
+    @staticmethod
+    def key_from_html(html, reference_id=None):
+        """\
+        Returns the cache key of the provided HTML page.
+        """
+        return reference_id or reader.reference_id_from_html(html), _digest(html)
+
+    def get_many(self, keys):
+        """\
+        Returns a list of records (or ``None`` if a record is not cached)
+        for the provided keys.
+        """
+        found = {}
+        ids = list(set(reference_id for reference_id, _ in keys))
+        for i in range(0, len(ids), _SQLITE_MAX_VARS):
+            chunk = ids[i:i + _SQLITE_MAX_VARS]
+            for reference_id, digest, record in self._conn.execute(
+                    'SELECT reference_id, digest, record FROM cables WHERE reference_id IN (%s)'
+                    % ','.join('?' * len(chunk)), chunk):
+                found[reference_id, digest] = record
+        return [pickle.loads(zlib.decompress(found[key])) if key in found else None for key in keys]
+
+    def get(self, key):
+        """\
+        Returns the record for the provided key or ``None``.
+        """
+        return self.get_many([key])[0]
+
+    def put_many(self, items):
+        """\
+        Stores the provided ``(key, record)`` tuples.
+        """
+        self._conn.executemany('INSERT OR REPLACE INTO cables VALUES (?, ?, ?)',
+                               ((reference_id, digest, zlib.compress(pickle.dumps(record, pickle.HIGHEST_PROTOCOL), 1))
+                                for (reference_id, digest), record in items))
+        self._conn.commit()
+
+    def put(self, key, record):
+        """\
+        Stores the provided record.
+        """
+        self.put_many([(key, record)])
+
+    def record_from_row(self, row):
+        """\
+        Returns the cached record of the CSV `row`, c.f. `cablemap.core.models.cable_from_row`.
+        """
+        key = self.key_from_row(row)
+        record = self.get(key)
+        if record is None:
+            record = cable_record(cable_from_row(row))
+            self.put(key, record)
+        return record
+
+    def record_from_html(self, html, reference_id=None):
+        """\
+        Returns the cached record of the HTML page, c.f. `cablemap.core.models.cable_from_html`.
+        """
+        key = self.key_from_html(html, reference_id)
+        record = self.get(key)
+        if record is None:
+            record = cable_record(cable_from_html(html, reference_id))
+            self.put(key, record)
+        return record
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM cables').fetchone()[0]
+
+    def clear(self):
+        """\
+        Removes all entries.
+        """
+        self._conn.execute('DELETE FROM cables')
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+class ResponseCache(object):
+    """\
+    SQLite based `IResponseCache` implementation.
+
+    The bodies are stored compressed. If the cache exceeds its max. size,
+    the least recently used responses are removed.
+
+    The access times are committed in batches (with the next ``put``, on
+    ``close`` or after a number of reads), so a process which does not close
+    the cache may lose the most recent access times.
+    """
+    implements(IResponseCache)
+
+    def __init__(self, cache_dir, max_size=256 * 1024 * 1024, max_age=None, offline=False):
+        """\
+
+        `cache_dir`
+            The directory where the cache is stored. It is created if
+            it does not exist.
+        `max_size`
+            The max. size of the (compressed) bodies in bytes (default: 256 MB).
+        `max_age`
+            The number of seconds a response is used without asking the
+            server if the page has changed (default: ``None``, the server
+            is always asked).
+        `offline`
+            Indicates if the responses should be served from the cache only
+            (default: ``False``).
+        """
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.offline = offline
+        self._conn = sqlite3.connect(os.path.join(cache_dir, _RESPONSE_CACHE_FILENAME))
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, etag TEXT, '
+                           'last_modified TEXT, fetched REAL, accessed INTEGER, size INTEGER, body BLOB)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._conn.commit()
+        self._clock, self._size = self._conn.execute('SELECT MAX(accessed), SUM(size) FROM responses').fetchone()
+        self._clock = self._clock or 0
+        self._size = self._size or 0
+        self._reads = 0
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def get(self, url):
+        row = self._conn.execute('SELECT etag, last_modified, fetched, body FROM responses WHERE url = ?',
+                                 (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, fetched, body = row
+        self._conn.execute('UPDATE responses SET accessed = ? WHERE url = ?', (self._tick(), url))
+        self._reads += 1
+        if self._reads >= _ACCESS_COMMIT_INTERVAL:
+            self._commit()
+        fresh = self.max_age is not None and time.time() - fetched < self.max_age
+        return zlib.decompress(body).decode('utf-8'), etag, last_modified, fresh
+
+    def put(self, url, body, etag=None, last_modified=None):
+        data = zlib.compress(body.encode('utf-8'))
+        row = self._conn.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        if row is not None:
+            self._size -= row[0]
+        self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (url, etag, last_modified, time.time(), self._tick(), len(data), data))
+        self._size += len(data)
+        if self._size > self.max_size:
+            self._evict()
+        self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._reads = 0
+
+    def _evict(self):
+        removed = []
+        for url, size in self._conn.execute('SELECT url, size FROM responses ORDER BY accessed'):
+            if self._size <= self.max_size:
+                break
+            removed.append((url,))
+            self._size -= size
+        self._conn.executemany('DELETE FROM responses WHERE url = ?', removed)
+
+    def __contains__(self, url):
+        return self._conn.execute('SELECT 1 FROM responses WHERE url = ?', (url,)).fetchone() is not None
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @property
+    def size(self):
+        """\
+        Returns the size of the (compressed) bodies in bytes.
+        """
+        return self._size
+
+    def clear(self):
+        """\
+        Removes all entries.
+        """
+        self._conn.execute('DELETE FROM responses')
+        self._commit()
+        self._size = 0
+
+    def close(self):
+        self._commit()
+        self._conn.close()
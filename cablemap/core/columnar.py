@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Columnar (Apache Parquet) export of cables.
+
+The export writes one row per cable. Scalar properties become plain columns,
+TAGs, references, recipients etc. become list columns. Requires
+`pyarrow <https://arrow.apache.org/docs/python/>`_.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+from datetime import datetime, timezone
+from cablemap.core.handler import handle_source
+from cablemap.core.interfaces import ICableHandler, ICableBatchHandler, implements
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+__all__ = ['ParquetCableHandler', 'export_parquet', 'read_parquet', 'rows_from_parquet']
+
+# Columns which hold a list of values
+_LIST_COLUMNS = ('tags', 'references', 'recipients', 'info_recipients',
+                 'signers', 'classificationists', 'classification_categories',
+                 'media_iris')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('The columnar export requires pyarrow, install it with "pip install pyarrow"')
+
+
+def _schema(include_text):
+    reference = pa.struct([('value', pa.string()), ('kind', pa.int8()),
+                           ('bullet', pa.string()), ('title', pa.string())])
+    recipient = pa.struct([('route', pa.string()), ('name', pa.string()),
+                           ('precedence', pa.string()), ('mcn', pa.string()),
+                           ('excluded', pa.list_(pa.string()))])
+    fields = [
+        ('reference_id', pa.string()),
+        ('canonical_id', pa.string()),
+        ('created', pa.timestamp('s', tz='UTC')),
+        ('released', pa.string()),
+        ('origin', pa.string()),
+        ('classification', pa.string()),
+        ('partial', pa.bool_()),
+        ('subject', pa.string()),
+        ('summary', pa.string()),
+        ('comment', pa.string()),
+        ('transmission_id', pa.string()),
+        ('nondisclosure_deadline', pa.string()),
+        ('tags', pa.list_(pa.string())),
+        ('references', pa.list_(reference)),
+        ('recipients', pa.list_(recipient)),
+        ('info_recipients', pa.list_(recipient)),
+        ('signers', pa.list_(pa.string())),
+        ('classificationists', pa.list_(pa.string())),
+        ('classification_categories', pa.list_(pa.string())),
+        ('media_iris', pa.list_(pa.string())),
+    ]
+    if include_text:
+        fields.extend([('header', pa.string()), ('content', pa.string())])
+    return pa.schema(fields)
+
+
+def _reference(ref):
+    return {'value': ref.value, 'kind': ref.kind, 'bullet': ref.bullet, 'title': ref.title}
+
+
+def _recipient(rec):
+    return {'route': rec.route, 'name': rec.name, 'precedence': rec.precedence,
+            'mcn': rec.mcn, 'excluded': list(rec.excluded)}
+
+
+class ParquetCableHandler(object):
+    """\
+    `ICableHandler` and `ICableBatchHandler` implementation which writes
+    the cables into a Parquet file.
+
+    The cables are buffered and written as one row group per `row_group_size`
+    cables, so memory usage does not grow with the number of cables.
+
+    An existing file is replaced, so the handler cannot be used for
+    incremental runs (``handle_source(..., manifest=...)``): `handle_source`
+    rejects the handler and ``delete_cable`` raises a ``ValueError``.
+    """
+    implements(ICableHandler, ICableBatchHandler)
+
+    #: Indicates that the handler needs the events of all cables, c.f. `cablemap.core.handler.handle_source`
+    incremental = False
+
+    def __init__(self, filename, row_group_size=10000, include_text=False, compression='zstd'):
+        """\
+
+        `filename`
+            The file to write.
+        `row_group_size`
+            Number of cables per row group (default: ``10000``).
+        `include_text`
+            Indicates if the header and content of the cables should be
+            written as well (default: ``False``).
+        `compression`
+            The Parquet compression codec (default: ``'zstd'``).
+        """
+        _require_pyarrow()
+        self._filename = filename
+        self._row_group_size = row_group_size
+        self._include_text = include_text
+        self._compression = compression
+        self._schema = _schema(include_text)
+        self.batch_size = row_group_size
+        self._writer = None
+        self._cable = None
+        self._reset_columns()
+
+    def _reset_columns(self):
+        self._columns = dict((name, []) for name in self._schema.names)
+        self._count = 0
+
+    def _flush(self):
+        if not self._count:
+            return
+        self._writer.write_table(pa.Table.from_pydict(self._columns, schema=self._schema))
+        self._reset_columns()
+
+    def start(self):
+        self._writer = pq.ParquetWriter(self._filename, self._schema, compression=self._compression)
+
+    def end(self):
+        self._flush()
+        self._writer.close()
+        self._writer = None
+
+    def start_cable(self, reference_id, canonical_id):
+        cable = dict((name, []) for name in _LIST_COLUMNS)
+        cable['reference_id'] = reference_id
+        cable['canonical_id'] = canonical_id
+        self._cable = cable
+
+    def end_cable(self):
+        cable = self._cable
+        for name, column in self._columns.items():
+            column.append(cable.get(name))
+        self._count += 1
+        self._cable = None
+        if self._count >= self._row_group_size:
+            self._flush()
+
+    def handle_batch(self, cables):
+        columns = self._columns
+        text = self._include_text
+        for cable in cables:
+            created, released = cable.created, cable.released
+            columns['reference_id'].append(cable.reference_id)
+            columns['canonical_id'].append(cable.canonical_id)
+            columns['created'].append(datetime.strptime(created, '%Y-%m-%d %H:%M:%S' if created.count(':') == 2 else '%Y-%m-%d %H:%M')
+                                      .replace(tzinfo=timezone.utc))
+            columns['released'].append(released[:10] if released else None)
+            columns['origin'].append(cable.origin)
+            columns['classification'].append(cable.classification)
+            columns['partial'].append(cable.is_partial)
+            columns['subject'].append(cable.subject or None)
+            columns['summary'].append(cable.summary or None)
+            columns['comment'].append(cable.comment or None)
+            columns['transmission_id'].append(cable.transmission_id or None)
+            columns['nondisclosure_deadline'].append(cable.nondisclosure_deadline or None)
+            columns['tags'].append(list(cable.tags))
+            columns['references'].append([_reference(ref) for ref in cable.references])
+            columns['recipients'].append([_recipient(rec) for rec in cable.recipients])
+            columns['info_recipients'].append([_recipient(rec) for rec in cable.info_recipients])
+            columns['signers'].append(list(cable.signed_by))
+            columns['classificationists'].append(list(cable.classified_by))
+            columns['classification_categories'].append(list(cable.classification_categories))
+            columns['media_iris'].append(list(cable.media_uris))
+            if text:
+                columns['header'].append(cable.header)
+                columns['content'].append(cable.content)
+            self._count += 1
+            if self._count >= self._row_group_size:
+                self._flush()
+                columns = self._columns
+
+    def handle_creation_datetime(self, dt):
+        self._cable['created'] = datetime.strptime(dt, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+    def handle_release_date(self, date):
+        self._cable['released'] = date
+
+    def handle_origin(self, origin):
+        self._cable['origin'] = origin
+
+    def handle_classification(self, classification):
+        self._cable['classification'] = classification
+
+    def handle_partial(self, partial):
+        self._cable['partial'] = partial
+
+    def handle_subject(self, subject):
+        self._cable['subject'] = subject
+
+    def handle_summary(self, summary):
+        self._cable['summary'] = summary
+
+    def handle_comment(self, comment):
+        self._cable['comment'] = comment
+
+    def handle_transmission_id(self, tid):
+        self._cable['transmission_id'] = tid
+
+    def handle_nondisclosure_deadline(self, date):
+        self._cable['nondisclosure_deadline'] = date
+
+    def handle_header(self, header):
+        if self._include_text:
+            self._cable['header'] = header
+
+    def handle_content(self, content):
+        if self._include_text:
+            self._cable['content'] = content
+
+    def handle_tag(self, tag):
+        self._cable['tags'].append(tag)
+
+    def handle_reference(self, reference):
+        self._cable['references'].append(_reference(reference))
+
+    def handle_recipient(self, recipient):
+        self._cable['recipients'].append(_recipient(recipient))
+
+    def handle_info_recipient(self, recipient):
+        self._cable['info_recipients'].append(_recipient(recipient))
+
+    def handle_signer(self, signer):
+        self._cable['signers'].append(signer)
+
+    def handle_classificationist(self, classificationist):
+        self._cable['classificationists'].append(classificationist)
+
+    def handle_classification_category(self, category):
+        self._cable['classification_categories'].append(category)
+
+    def handle_media_iri(self, iri):
+        self._cable['media_iris'].append(iri)
+
+    def handle_wikileaks_iri(self, iri):
+        # Can be derived from the creation date and the reference id
+        pass
+
+    def delete_cable(self, reference_id, canonical_id):
+        raise ValueError('The Parquet file cannot be updated incrementally, use a run without manifest')
+
+
+def export_parquet(path, filename, predicate=None, workers=None, **kw):
+    """\
+    Reads all cables from `path` and writes them into the Parquet file `filename`.
+
+    `path`
+        Either a directory with cable files or a CSV file.
+    `filename`
+        The Parquet file to write.
+    `predicate`
+        A predicate that is invoked for each cable reference identifier,
+        c.f. `cablemap.core.handler.handle_source`.
+    `workers`
+        The number of processes which parse the cables,
+        c.f. `cablemap.core.handler.handle_source`.
+    `kw`
+        Further arguments for `ParquetCableHandler`.
+    """
+    handle_source(path, ParquetCableHandler(filename, **kw), predicate, workers=workers)
+
+
+def read_parquet(filename, columns=None):
+    """\
+    Returns a ``pyarrow.Table`` with the provided `columns` (all columns by default).
+
+    Only the requested columns are read from disk.
+
+    `filename`
+        The Parquet file.
+    `columns`
+        An iterable of column names or ``None``.
+    """
+    _require_pyarrow()
+    return pq.read_table(filename, columns=list(columns) if columns else None)
+
+
+def rows_from_parquet(filename, columns=None, batch_size=10000):
+    """\
+    Returns a generator which yields one dict per cable with the
+    provided `columns` (all columns by default).
+
+    The file is read in batches of `batch_size` rows.
+
+    `filename`
+        The Parquet file.
+    `columns`
+        An iterable of column names or ``None``.
+    `batch_size`
+        Number of rows which are read at once (default: ``10000``).
+    """
+    _require_pyarrow()
+    f = pq.ParquetFile(filename)
+    for batch in f.iter_batches(batch_size=batch_size, columns=list(columns) if columns else None):
+        for row in batch.to_pylist():
+            yield row
@@ -142,7 +142,42 @@ _STATIONS = (
     u'ZAGREB'
 )
 
-REFERENCE_ID_PATTERN = re.compile(r'^([0-9]{2})(%s)([0-9]{%d,%d})$' % ('|'.join(_STATIONS), MIN_SERIAL_LENGTH, MAX_SERIAL_LENGTH), re.UNICODE)
+STATIONS = frozenset(_STATIONS)
+
+
+def _trie_pattern(words):
+    """\
+    Returns a regular expression which matches any of the provided `words`.
+
+    Instead of an alternation of all words (which is matched by trying one
+    word after another) the words are arranged in a trie and the alternation
+    is factored by common prefixes, i.e. ``BE(?:IJING|LGRADE|R(?:LIN|N))``.
+    The regex engine examines each character of the input only once per trie
+    level. If a word is a prefix of another word, the longer word is tried
+    first.
+
+    `words`
+        An iterable of strings.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[u''] = None
+
+    def pattern(node):
+        branches = [re.escape(c) + pattern(child) for c, child in sorted(node.items()) if c]
+        if not branches:
+            return u''
+        optional = u'' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return u'(?:%s)%s' % (u'|'.join(branches), u'?' if optional else u'')
+    return pattern(trie)
+
+
+REFERENCE_ID_PATTERN = re.compile(r'^([0-9]{2})(%s)([0-9]{%d,%d})$' % (_trie_pattern(_STATIONS), MIN_SERIAL_LENGTH, MAX_SERIAL_LENGTH), re.UNICODE)
 
 # Wrong WikiLeaks cable identifiers
 # These cable identifiers are cables which exist in two versions: One with the
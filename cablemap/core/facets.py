@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Faceted metadata index.
+
+Each cable of a source gets an integer id. For each facet value (i.e. the
+origin ``BERLIN`` or the TAG ``PREL``) the index keeps a compressed bitmap
+of the ids of the cables with that value. The index is stored in a SQLite
+database.
+
+Supported facets:
+
+    ``origin``          The origin of the cable (as used in the reference id,
+                        i.e. ``BERLIN``)
+    ``year``            The creation year (i.e. ``2009``)
+    ``month``           The creation month (``01`` .. ``12``)
+    ``classification``  The classification (i.e. ``SECRET//NOFORN``)
+    ``tag``             The TAGs of the cable (uppercased)
+    ``tag_kind``        The TAG kinds (c.f. `cablemap.core.utils.tag_kind`)
+    ``signer``          The signers of the cable
+
+Example::
+
+    from cablemap.core import handle_source
+    from cablemap.core.facets import FacetIndex
+    from cablemap.core.predicates import origin_europe
+
+    index = FacetIndex('facets.db')
+    pred = index.predicate(origin=origin_europe, year=2009, classification='SECRET', tag='PREL')
+    handle_source('cables.csv', handler, pred)
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import zlib
+import sqlite3
+from array import array
+from cablemap.core.utils import reference_id_parts, tag_kind
+from cablemap.core.handler import handle_source
+from cablemap.core.interfaces import ICableBatchHandler, implements
+
+__all__ = ['FACETS', 'Bitmap', 'FacetIndex', 'FacetIndexBuilder', 'build_facet_index']
+
+FACETS = ('origin', 'year', 'month', 'classification', 'tag', 'tag_kind', 'signer')
+
+_VERSION = '1'
+
+try:
+    _popcount = int.bit_count
+except AttributeError:
+    # Python < 3.10
+    _popcount = lambda n: bin(n).count('1')
+
+
+class Bitmap(object):
+    """\
+    Immutable set of cable ids.
+
+    Bitmaps support the set operators ``&``, ``|``, ``-`` and ``^``.
+    """
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        """\
+
+        `bits`
+            An integer where bit ``n`` indicates that the cable with
+            the id ``n`` is part of the set.
+        """
+        self.bits = bits
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(int.from_bytes(data, 'little'))
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits)
+
+    def __sub__(self, other):
+        return Bitmap(self.bits & ~other.bits)
+
+    def __xor__(self, other):
+        return Bitmap(self.bits ^ other.bits)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and self.bits == other.bits
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __len__(self):
+        return _popcount(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, n):
+        return n >= 0 and (self.bits >> n) & 1 == 1
+
+    def __iter__(self):
+        bits = self.bits
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        for i, byte in enumerate(data):
+            if byte:
+                base = i * 8
+                for j in range(8):
+                    if byte >> j & 1:
+                        yield base + j
+
+    def __repr__(self):
+        return 'Bitmap(%r)' % list(self)
+
+
+def _facet_values(cable):
+    """\
+    Returns an iterator over ``(facet, value)`` tuples of the provided cable.
+    """
+    try:
+        yield 'origin', reference_id_parts(cable.canonical_id)[1]
+    except ValueError:
+        pass
+    created = cable.created
+    if created:
+        yield 'year', created[:4]
+        yield 'month', created[5:7]
+    if cable.classification:
+        yield 'classification', cable.classification.upper()
+    for tag in cable.tags:
+        yield 'tag', tag.upper()
+        yield 'tag_kind', str(tag_kind(tag))
+    for signer in cable.signed_by:
+        yield 'signer', signer.upper()
+
+
+def _normalize(facet, value):
+    if facet not in FACETS:
+        raise ValueError('Unknown facet "%s", expected one of %s' % (facet, ', '.join(FACETS)))
+    if isinstance(value, int) and not isinstance(value, bool):
+        if facet == 'year':
+            return u'%04d' % value
+        if facet == 'month':
+            return u'%02d' % value
+        if facet == 'tag_kind':
+            return str(value)
+    elif isinstance(value, str):
+        return value if facet == 'tag_kind' else value.upper()
+    raise ValueError('Invalid value %r for facet "%s"' % (value, facet))
+
+
+def _connect(filename):
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS cables (id INTEGER PRIMARY KEY, reference_id TEXT, canonical_id TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS bitmaps (facet TEXT, value TEXT, count INTEGER, bitmap BLOB, '
+                 'PRIMARY KEY (facet, value))')
+    return conn
+
+
+class FacetIndexBuilder(object):
+    """\
+    `ICableBatchHandler` implementation which writes a `FacetIndex` on ``end()``.
+
+    An existing index is replaced. Therefore, the builder cannot be used for
+    incremental runs (``handle_source(..., manifest=...)``) which issue the
+    events of the new and changed cables only: `handle_source` rejects the
+    builder and ``delete_cable`` raises a ``ValueError``.
+    """
+    implements(ICableBatchHandler)
+
+    #: Indicates that the builder needs the events of all cables, c.f. `cablemap.core.handler.handle_source`
+    incremental = False
+
+    def __init__(self, filename):
+        """\
+
+        `filename`
+            The index file.
+        """
+        self._filename = filename
+        self._cables = None
+        self._postings = None
+
+    def start(self):
+        self._cables = []
+        self._postings = {}
+
+    def handle_batch(self, cables):
+        postings = self._postings
+        for cable in cables:
+            n = len(self._cables)
+            self._cables.append((n, cable.reference_id, cable.canonical_id))
+            for key in _facet_values(cable):
+                ids = postings.get(key)
+                if ids is None:
+                    ids = postings[key] = array('I')
+                if not ids or ids[-1] != n:
+                    ids.append(n)
+
+    def delete_cable(self, reference_id, canonical_id):
+        raise ValueError('The facet index cannot be updated incrementally, use a run without manifest')
+
+    def end(self):
+        size = (len(self._cables) + 7) // 8
+        tmp = self._filename + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = _connect(tmp)
+        try:
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (_VERSION,))
+            conn.executemany('INSERT INTO cables VALUES (?, ?, ?)', self._cables)
+            rows = []
+            for (facet, value), ids in self._postings.items():
+                bits = bytearray(size)
+                for n in ids:
+                    bits[n >> 3] |= 1 << (n & 7)
+                rows.append((facet, value, len(ids), zlib.compress(bytes(bits))))
+            conn.executemany('INSERT INTO bitmaps VALUES (?, ?, ?, ?)', rows)
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp, self._filename)
+        self._cables = self._postings = None
+
+
+class FacetIndex(object):
+    """\
+    Read-only view of a facet index, c.f. `build_facet_index`.
+    """
+    def __init__(self, filename):
+        """\
+
+        `filename`
+            A file written by `FacetIndexBuilder`.
+        """
+        if not os.path.exists(filename):
+            raise IOError('The facet index "%s" does not exist' % filename)
+        self._conn = _connect(filename)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if not row or row[0] != _VERSION:
+            self._conn.close()
+            raise ValueError('"%s" is not a facet index' % filename)
+        self._size = self._conn.execute('SELECT COUNT(*) FROM cables').fetchone()[0]
+        self._bitmaps = {}
+        self._values = {}
+        self._reference_ids = None
+
+    def __len__(self):
+        return self._size
+
+    def all(self):
+        """\
+        Returns a bitmap of all cables.
+        """
+        return Bitmap((1 << self._size) - 1)
+
+    def values(self, facet):
+        """\
+        Returns a dict of value -> number of cables for the provided `facet`.
+        """
+        values = self._values.get(facet)
+        if values is None:
+            _normalize(facet, u'')
+            values = self._values[facet] = dict(self._conn.execute(
+                'SELECT value, count FROM bitmaps WHERE facet = ?', (facet,)))
+        return values
+
+    def bitmap(self, facet, value):
+        """\
+        Returns the bitmap of the cables which have the provided value.
+
+        `facet`
+            The facet name, c.f. `FACETS`.
+        `value`
+            The value, i.e. ``'PREL'`` or ``2009``.
+        """
+        key = (facet, _normalize(facet, value))
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            row = self._conn.execute('SELECT bitmap FROM bitmaps WHERE facet = ? AND value = ?', key).fetchone()
+            bitmap = self._bitmaps[key] = Bitmap.from_bytes(zlib.decompress(row[0])) if row else Bitmap()
+        return bitmap
+
+    def select(self, facet, value):
+        """\
+        Returns the bitmap of the cables which match the provided value.
+
+        `facet`
+            The facet name, c.f. `FACETS`.
+        `value`
+            Either a value, an iterable of values (any of the values must
+            match) or a predicate which is invoked for each value of the facet,
+            i.e. ``select('origin', origin_europe)``.
+        """
+        if callable(value):
+            value = [v for v in self.values(facet) if value(v)]
+        elif isinstance(value, (str, int)) or not hasattr(value, '__iter__'):
+            return self.bitmap(facet, value)
+        result = Bitmap()
+        for v in value:
+            result |= self.bitmap(facet, v)
+        return result
+
+    def query(self, **facets):
+        """\
+        Returns the bitmap of the cables which match all provided facets,
+        i.e. ``query(origin=origin_europe, year=2009, tag='PREL')``.
+
+        C.f. `select` for the accepted values.
+        """
+        result = self.all()
+        for facet, value in facets.items():
+            result &= self.select(facet, value)
+            if not result:
+                break
+        return result
+
+    def _ids(self, bitmap, column):
+        ids = list(bitmap)
+        result = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            result.extend(row[0] for row in self._conn.execute(
+                'SELECT %s FROM cables WHERE id IN (%s) ORDER BY id' % (column, ','.join('?' * len(chunk))), chunk))
+        return result
+
+    def reference_ids(self, bitmap):
+        """\
+        Returns the reference identifiers of the cables in the provided bitmap.
+        """
+        return self._ids(bitmap, 'reference_id')
+
+    def canonical_ids(self, bitmap):
+        """\
+        Returns the canonical identifiers of the cables in the provided bitmap.
+        """
+        return self._ids(bitmap, 'canonical_id')
+
+    def predicate(self, bitmap=None, **facets):
+        """\
+        Returns a predicate for cable reference identifiers which can be used
+        with `cablemap.core.handler.handle_source`.
+
+        `bitmap`
+            A bitmap, i.e. the result of `query`. If ``None``, the bitmap
+            is computed by ``query(**facets)``.
+        """
+        if bitmap is None:
+            bitmap = self.query(**facets)
+        return frozenset(self.reference_ids(bitmap)).__contains__
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_facet_index(path, filename, predicate=None, workers=None, cache_dir=None):
+    """\
+    Reads all cables from `path`, writes the facet index into `filename`
+    and returns the `FacetIndex`.
+
+    `path`
+        Either a directory with cable files or a CSV file.
+    `filename`
+        The index file.
+    `predicate`, `workers`, `cache_dir`
+        C.f. `cablemap.core.handler.handle_source`.
+    """
+    handle_source(path, FacetIndexBuilder(filename), predicate, workers=workers, cache_dir=cache_dir)
+    return FacetIndex(filename)
@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Concurrent fetching of cables from WikiLeaks.
+
+In contrast to `cablemap.core.utils.cable_by_id` which opens a new
+connection for each request, the functions of this module keep the
+connections to each host open (HTTP/1.1 keep-alive), run a bounded number
+of requests concurrently, retry failed requests with an exponential backoff
+and try the next mirror if a mirror is not available. Pages which cannot be
+fetched are reported per identifier and do not abort the other requests.
+
+Example::
+
+    from cablemap.core.fetch import cables_by_ids
+
+    for cable in cables_by_ids(['09BERLIN1167', '10MADRID87'], concurrency=8):
+        print(cable.reference_id, cable.subject)
+
+Inside of a running event loop, use the asynchronous generator `fetch_pages`.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import ssl
+import zlib
+import asyncio
+import logging
+from urllib.parse import urlsplit, urljoin
+from cablemap.core.models import cable_from_html, _WL_CABLE_BASE_URIS
+from cablemap.core.utils import _wikileaks_id, _cable_path, _CGSN_BASE, _CGSN_WL_SOURCE_SEARCH
+
+__all__ = ['BASE_URIS', 'FetchError', 'fetch_pages', 'cables_by_ids', 'cables_by_urls']
+
+logger = logging.getLogger('cablemap.core.fetch')
+
+#: The WikiLeaks mirrors which are tried in this order
+BASE_URIS = _WL_CABLE_BASE_URIS[:3]
+
+_USER_AGENT = 'Cablemap/1.2'
+_MAX_REDIRECTS = 5
+_READ_SIZE = 1 << 16
+_REDIRECTS = frozenset([301, 302, 303, 307, 308])
+_MISSING = frozenset([404, 410])
+
+
+class FetchError(IOError):
+    """\
+    Indicates that a page could not be fetched from any mirror.
+    """
+
+
+class _ConnectionPool(object):
+    """\
+    Keeps idle HTTP/1.1 connections per host.
+    """
+    def __init__(self, timeout):
+        self._timeout = timeout
+        self._idle = {}
+        self._ssl = None
+        #: The number of connections opened so far
+        self.connections = 0
+
+    async def _connect(self, scheme, host, port):
+        ssl_context = None
+        if scheme == 'https':
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            ssl_context = self._ssl
+        conn = await asyncio.wait_for(asyncio.open_connection(host, port, ssl=ssl_context), self._timeout)
+        self.connections += 1
+        return conn
+
+    async def get(self, url):
+        """\
+        Returns a ``(status, headers, body)`` tuple.
+
+        `url`
+            An absolute HTTP(S) URL.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError('Unsupported URL "%s"' % url)
+        host = parts.hostname
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, host, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        netloc = host if parts.port is None else '%s:%d' % (host, port)
+        request = ('GET %s HTTP/1.1\r\nHost: %s\r\nUser-Agent: %s\r\n'
+                   'Accept-Encoding: gzip, identity\r\nConnection: keep-alive\r\n\r\n'
+                   % (path, netloc, _USER_AGENT)).encode('latin-1')
+        idle = self._idle.setdefault(key, [])
+        while idle:
+            conn = idle.pop()
+            try:
+                return await self._roundtrip(key, conn, request)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # The server closed the idle connection, try the next one
+                continue
+        return await self._roundtrip(key, await self._connect(*key), request)
+
+    async def _roundtrip(self, key, conn, request):
+        try:
+            result, keep_alive = await asyncio.wait_for(_exchange(conn, request), self._timeout)
+        except ValueError as ex:
+            # Malformed response, i.e. an invalid chunk size
+            conn[1].close()
+            raise ConnectionError('Invalid response: %s' % ex)
+        except BaseException:
+            conn[1].close()
+            raise
+        if keep_alive:
+            self._idle[key].append(conn)
+        else:
+            conn[1].close()
+        return result
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+
+async def _exchange(conn, request):
+    """\
+    Sends the request and returns ``((status, headers, body), keep_alive)``.
+
+    The body is decompressed while it is read.
+    """
+    reader, writer = conn
+    writer.write(request)
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise asyncio.IncompleteReadError(b'', None)
+    try:
+        version, status = line.split(None, 2)[:2]
+        status = int(status)
+    except ValueError:
+        raise ConnectionError('Invalid status line %r' % line)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        if line in (b'\r\n', b'\n'):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if headers.get('content-encoding') == 'gzip' else None
+    chunks = []
+    append = chunks.append if decoder is None else lambda data: chunks.append(decoder.decompress(data))
+    if status in (204, 304) or 100 <= status < 200:
+        pass
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                # Trailer
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    elif 'content-length' in headers:
+        remaining = int(headers['content-length'])
+        while remaining:
+            data = await reader.readexactly(min(remaining, _READ_SIZE))
+            remaining -= len(data)
+            append(data)
+    else:
+        keep_alive = False
+        while True:
+            data = await reader.read(_READ_SIZE)
+            if not data:
+                break
+            append(data)
+    if decoder is not None:
+        chunks.append(decoder.flush())
+    return (status, headers, b''.join(chunks)), keep_alive
+
+
+class _Fetcher(object):
+    """\
+    Fetches pages with retries and mirror failover.
+    """
+    def __init__(self, retries, backoff, timeout):
+        self._retries = retries
+        self._backoff = backoff
+        self.pool = _ConnectionPool(timeout)
+
+    async def _get(self, url):
+        for _ in range(_MAX_REDIRECTS + 1):
+            status, headers, body = await self.pool.get(url)
+            if status not in _REDIRECTS or 'location' not in headers:
+                return status, body
+            url = urljoin(url, headers['location'])
+        raise FetchError('Too many redirects: "%s"' % url)
+
+    async def fetch(self, urls):
+        """\
+        Returns the content of the first URL which is available or ``None``
+        if all URLs report that the page does not exist.
+
+        Network errors are retried. Unsupported URLs are not retried, a
+        `FetchError` is raised at once if none of the URLs is supported.
+
+        `urls`
+            A sequence of URLs of the same page, i.e. on different mirrors.
+        """
+        error = None
+        first, urls = urls[0], list(urls)
+        for attempt in range(self._retries + 1):
+            if attempt:
+                delay = self._backoff * 2 ** (attempt - 1)
+                logger.info('Retrying "%s" in %.2f seconds (%s)', first, delay, error)
+                await asyncio.sleep(delay)
+            missing = 0
+            for url in list(urls):
+                try:
+                    status, body = await self._get(url)
+                except ValueError as ex:
+                    # Unsupported URL (or redirect target)
+                    error = ex
+                    urls.remove(url)
+                    continue
+                except (OSError, EOFError, asyncio.TimeoutError) as ex:
+                    error = ex
+                    continue
+                if status == 200:
+                    return body.decode('utf-8')
+                if status in _MISSING:
+                    missing += 1
+                else:
+                    error = FetchError('HTTP status %d: "%s"' % (status, url))
+            if not urls:
+                break
+            if missing == len(urls):
+                return None
+        raise FetchError('Cannot fetch "%s": %s' % (first, error))
+
+
+async def _cable_page(fetcher, reference_id, base_uris, search_base):
+    wl_id = _wikileaks_id(reference_id)
+    path = _cable_path(wl_id)
+    if path is not None:
+        return await fetcher.fetch([base + path for base in base_uris])
+    if not search_base:
+        return None
+    # The cable reference is not known, try to consult Cablegatesearch.
+    html = await fetcher.fetch([search_base + wl_id])
+    m = _CGSN_WL_SOURCE_SEARCH(html) if html else None
+    return await fetcher.fetch([m.group(1)]) if m else None
+
+
+async def _fetch_all(items, job, concurrency, retries, backoff, timeout):
+    fetcher = _Fetcher(retries, backoff, timeout)
+    items = iter(items)
+    results = asyncio.Queue(concurrency)
+    done = object()
+
+    async def worker():
+        for item in items:
+            try:
+                page = await job(fetcher, item)
+            except Exception as ex:
+                await results.put((item, None, ex))
+            else:
+                await results.put((item, page, None))
+        await results.put(done)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+    try:
+        running = len(workers)
+        while running:
+            result = await results.get()
+            if result is done:
+                running -= 1
+                continue
+            yield result
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        fetcher.pool.close()
+
+
+def fetch_pages(reference_ids, concurrency=32, base_uris=BASE_URIS, retries=3, backoff=0.5, timeout=30,
+                search_base=_CGSN_BASE):
+    """\
+    Returns an asynchronous generator of ``(reference_id, page, error)``
+    tuples in the order the pages arrive. The page is ``None`` if the cable
+    does not exist or if it could not be fetched. In the latter case, `error`
+    provides the exception (usually a `FetchError`), otherwise it is ``None``.
+
+    `reference_ids`
+        An iterable of reference identifiers.
+    `concurrency`
+        The max. number of concurrent requests (default: ``32``).
+    `base_uris`
+        The Cablegate mirrors which are tried in the provided order
+        (default: `BASE_URIS`).
+    `retries`
+        How often a page is requested again after all mirrors failed
+        (default: ``3``). If the page is not available after the last retry,
+        a `FetchError` is reported for the cable.
+    `backoff`
+        The delay in seconds before the first retry (default: ``0.5``).
+        The delay is doubled for each further retry.
+    `timeout`
+        The timeout in seconds for connecting to a host and for each
+        request (default: ``30``).
+    `search_base`
+        The base URI of Cablegatesearch which is consulted if a cable is not
+        part of ``cable2month.csv.gz``. ``None`` disables the lookup.
+    """
+    def job(fetcher, reference_id):
+        return _cable_page(fetcher, reference_id, base_uris, search_base)
+    return _fetch_all(reference_ids, job, concurrency, retries, backoff, timeout)
+
+
+def _iterate(agen):
+    """\
+    Runs the provided asynchronous generator in a new event loop and yields its items.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                item = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            yield item
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+def _cables(results):
+    """\
+    Returns a generator of ``ICable`` instances from ``(item, page, error)`` tuples.
+    Failures are logged and skipped.
+    """
+    for item, page, error in results:
+        if error is not None:
+            logger.error('Cannot fetch "%s": %s', item, error)
+        elif page:
+            yield cable_from_html(page)
+
+
+def cables_by_ids(reference_ids, concurrency=32, base_uris=BASE_URIS, retries=3, backoff=0.5, timeout=30,
+                  search_base=_CGSN_BASE):
+    """\
+    Returns a generator of ``ICable`` instances in the order they arrive.
+    Unknown cables are ignored, cables which cannot be fetched are logged
+    and ignored.
+
+    C.f. `fetch_pages` for the arguments.
+    """
+    return _cables(_iterate(fetch_pages(reference_ids, concurrency, base_uris, retries, backoff, timeout,
+                                        search_base)))
+
+
+def cables_by_urls(urls, concurrency=32, retries=3, backoff=0.5, timeout=30):
+    """\
+    Returns a generator of ``ICable`` instances read from the provided IRIs
+    in the order they arrive. IRIs which do not exist are ignored, IRIs
+    which cannot be fetched are logged and ignored.
+
+    C.f. `fetch_pages` for the arguments.
+    """
+    def job(fetcher, url):
+        return fetcher.fetch([url])
+    return _cables(_iterate(_fetch_all(urls, job, concurrency, retries, backoff, timeout)))
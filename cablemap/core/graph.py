@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Citation index of cable to cable references.
+
+The index is built in one pass over a cable source and stored as
+compressed sparse row (CSR) adjacency lists of integer node ids. The file
+is memory mapped on loading, only the requested adjacency lists are read.
+
+File layout (all integers are unsigned 32 bit little endian values)::
+
+    header          magic "CMRG", version, number of nodes, number of edges,
+                    size of the identifier blob
+    id_offsets      nodes + 1 offsets into the identifier blob
+    id_blob         the sorted canonical identifiers (UTF-8), padded to 4 bytes
+    out_indptr      nodes + 1 offsets into out_indices
+    out_indices     the cited nodes of each node
+    in_indptr       nodes + 1 offsets into in_indices
+    in_indices      the citing nodes of each node
+    known           one byte per node, 1 if the cable is part of the source
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import sys
+import mmap
+import heapq
+import struct
+from array import array
+from bisect import bisect_left
+from cablemap.core.handler import handle_source
+from cablemap.core.interfaces import ICableBatchHandler, implements
+
+__all__ = ['CitationIndex', 'CitationIndexBuilder', 'build_citation_index']
+
+_MAGIC = b'CMRG'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIIII')
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _uint32s(values):
+    a = array('I', values)
+    if not _LITTLE_ENDIAN:
+        a.byteswap()
+    return a.tobytes()
+
+
+def _pad(size):
+    return -size % 4
+
+
+class CitationIndexBuilder(object):
+    """\
+    `ICableBatchHandler` implementation which collects the cable references
+    and writes a `CitationIndex` file on ``end()``.
+
+    Self references and duplicate references are ignored.
+
+    The file contains the cables of one run only, so the builder cannot be
+    used for incremental runs (``handle_source(..., manifest=...)``):
+    `handle_source` rejects the builder and ``delete_cable`` raises a
+    ``ValueError``.
+    """
+    implements(ICableBatchHandler)
+
+    #: Indicates that the builder needs the events of all cables, c.f. `cablemap.core.handler.handle_source`
+    incremental = False
+
+    def __init__(self, filename):
+        """\
+
+        `filename`
+            The file to write.
+        """
+        self._filename = filename
+        self._ids = None
+        self._known = None
+        self._src = None
+        self._dst = None
+
+    def _node(self, canonical_id):
+        ids = self._ids
+        node = ids.get(canonical_id)
+        if node is None:
+            node = ids[canonical_id] = len(ids)
+        return node
+
+    def start(self):
+        self._ids = {}
+        self._known = set()
+        self._src, self._dst = array('I'), array('I')
+
+    def handle_batch(self, cables):
+        node, src, dst = self._node, self._src, self._dst
+        for cable in cables:
+            canonical_id = cable.canonical_id
+            source = node(canonical_id)
+            self._known.add(source)
+            for ref in cable.references:
+                if ref.is_cable() and ref.value != canonical_id:
+                    src.append(source)
+                    dst.append(node(ref.value))
+
+    def delete_cable(self, reference_id, canonical_id):
+        raise ValueError('The citation index cannot be updated incrementally, use a run without manifest')
+
+    def end(self):
+        ids = sorted(self._ids, key=self._ids.get)
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        # Maps the preliminary node ids to the position of the id in the sorted list
+        remap = array('I', bytes(4 * len(ids)))
+        for new, old in enumerate(order):
+            remap[old] = new
+        edges = sorted(set((remap[s], remap[d]) for s, d in zip(self._src, self._dst)))
+        _write(self._filename, [ids[old] for old in order], edges,
+               sorted(remap[old] for old in self._known))
+        self._ids = self._known = self._src = self._dst = None
+
+
+def _csr(count, edges):
+    indptr = array('I', bytes(4 * (count + 1)))
+    for src, _ in edges:
+        indptr[src + 1] += 1
+    for i in range(count):
+        indptr[i + 1] += indptr[i]
+    return indptr, array('I', (dst for _, dst in edges))
+
+
+def _write(filename, ids, edges, known):
+    count = len(ids)
+    blobs = [canonical_id.encode('utf-8') for canonical_id in ids]
+    offsets = array('I', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    blob = b''.join(blobs)
+    out_indptr, out_indices = _csr(count, edges)
+    in_indptr, in_indices = _csr(count, sorted((dst, src) for src, dst in edges))
+    flags = bytearray(count)
+    for node in known:
+        flags[node] = 1
+    tmp = filename + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, count, len(edges), len(blob)))
+        f.write(_uint32s(offsets))
+        f.write(blob + b'\0' * _pad(len(blob)))
+        for values in (out_indptr, out_indices, in_indptr, in_indices):
+            f.write(_uint32s(values))
+        f.write(flags)
+    os.replace(tmp, filename)
+
+
+class _Ids(object):
+    """\
+    Read-only sequence of the canonical identifiers, used for binary searches.
+    """
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+
+class CitationIndex(object):
+    """\
+    Memory mapped citation index, c.f. `build_citation_index`.
+
+    The nodes of the index are canonical cable identifiers of cables which
+    are part of the source and of cables which are cited by these cables.
+    """
+    def __init__(self, filename):
+        """\
+
+        `filename`
+            A file written by `CitationIndexBuilder`.
+        """
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, version, count, edges, blob_size = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION:
+            buf.release()
+            self._mmap.close()
+            raise ValueError('"%s" is not a citation index' % filename)
+        pos = [_HEADER.size]
+
+        def section(size, fmt='I'):
+            start = pos[0]
+            pos[0] += size * (4 if fmt == 'I' else 1)
+            view = buf[start:pos[0]]
+            if fmt != 'I':
+                return view
+            if _LITTLE_ENDIAN:
+                return view.cast('I')
+            a = array('I', view.tobytes())
+            a.byteswap()
+            return a
+        offsets = section(count + 1)
+        blob = section(blob_size + _pad(blob_size), 'B')
+        self._ids = _Ids(offsets, blob)
+        self._out_indptr = section(count + 1)
+        self._out_indices = section(edges)
+        self._in_indptr = section(count + 1)
+        self._in_indices = section(edges)
+        self._known = section(count, 'B')
+        self._views = [buf, offsets, blob, self._out_indptr, self._out_indices,
+                       self._in_indptr, self._in_indices, self._known]
+
+    def _node(self, canonical_id):
+        ids = self._ids
+        i = bisect_left(ids, canonical_id)
+        return i if i < len(ids) and ids[i] == canonical_id else -1
+
+    def _adjacent(self, node, direction):
+        if direction == 'out':
+            indptr, indices = self._out_indptr, self._out_indices
+        elif direction == 'in':
+            indptr, indices = self._in_indptr, self._in_indices
+        elif direction == 'both':
+            return sorted(set(self._adjacent(node, 'out')) | set(self._adjacent(node, 'in')))
+        else:
+            raise ValueError('Unknown direction "%s", expected "out", "in" or "both"' % direction)
+        return indices[indptr[node]:indptr[node + 1]].tolist()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, canonical_id):
+        return self._node(canonical_id) >= 0
+
+    def __iter__(self):
+        ids = self._ids
+        return (ids[i] for i in range(len(ids)))
+
+    def is_known(self, canonical_id):
+        """\
+        Returns if the cable identified by `canonical_id` is part of the
+        source (and not only cited by a cable of the source).
+        """
+        node = self._node(canonical_id)
+        return node >= 0 and self._known[node] == 1
+
+    def cites(self, canonical_id):
+        """\
+        Returns a sorted list of canonical identifiers of the cables which
+        are cited by the provided cable.
+        """
+        return self.neighbours(canonical_id, direction='out')
+
+    def cited_by(self, canonical_id):
+        """\
+        Returns a sorted list of canonical identifiers of the cables which
+        cite the provided cable.
+        """
+        return self.neighbours(canonical_id, direction='in')
+
+    def neighbours(self, canonical_id, hops=1, direction='out'):
+        """\
+        Returns a sorted list of canonical identifiers of the cables which are
+        reachable from the provided cable within `hops` steps.
+
+        `canonical_id`
+            The canonical identifier of the cable to start from.
+        `hops`
+            The maximum number of steps (default: ``1``).
+        `direction`
+            Either ``'out'`` to follow the references of the cables (default),
+            ``'in'`` to follow the citing cables or ``'both'``.
+        """
+        start = self._node(canonical_id)
+        if start < 0:
+            return []
+        seen = set([start])
+        frontier = [start]
+        for _ in range(hops):
+            reached = []
+            for node in frontier:
+                for adjacent in self._adjacent(node, direction):
+                    if adjacent not in seen:
+                        seen.add(adjacent)
+                        reached.append(adjacent)
+            if not reached:
+                break
+            frontier = reached
+        seen.discard(start)
+        return [self._ids[node] for node in sorted(seen)]
+
+    def citation_count(self, canonical_id):
+        """\
+        Returns how often the provided cable is cited.
+        """
+        node = self._node(canonical_id)
+        return self._in_indptr[node + 1] - self._in_indptr[node] if node >= 0 else 0
+
+    def most_cited(self, n=10):
+        """\
+        Returns a list of ``(canonical_id, count)`` tuples of the `n` most
+        cited cables. Cables with the same count are sorted by their identifier.
+        """
+        indptr = self._in_indptr
+        nodes = heapq.nlargest(n, range(len(self._ids)), key=lambda i: indptr[i + 1] - indptr[i])
+        return [(self._ids[i], indptr[i + 1] - indptr[i]) for i in nodes if indptr[i + 1] > indptr[i]]
+
+    def close(self):
+        """\
+        Releases the memory mapped file.
+        """
+        for view in reversed(self._views):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def build_citation_index(path, filename, predicate=None, workers=None, cache_dir=None):
+    """\
+    Reads all cables from `path`, writes the citation index into
+    `filename` and returns the `CitationIndex`.
+
+    `path`
+        Either a directory with cable files or a CSV file.
+    `filename`
+        The index file to write.
+    `predicate`, `workers`, `cache_dir`
+        C.f. `cablemap.core.handler.handle_source`.
+    """
+    handle_source(path, CitationIndexBuilder(filename), predicate, workers=workers, cache_dir=cache_dir)
+    return CitationIndex(filename)
@@ -15,8 +15,20 @@ This module defines a event handlers to process cables.
 from __future__ import absolute_import
 import logging
 import urllib
+from time import perf_counter
+from itertools import islice
 from .utils import cables_from_source, titlefy
-from .interfaces import ICableHandler, implements
+from .interfaces import ICableHandler, ICableBatchHandler, implements
+from .manifest import Manifest
+from .c14n import canonicalize_id
+from .timing import Timings, instrument
+
+
+_BATCH_SIZE = 1000
+
+
+def _noop(*args):
+    pass
 
 
 class NoopCableHandler(object):
@@ -26,8 +38,9 @@ class NoopCableHandler(object):
     implements(ICableHandler)
     
     def __getattr__(self, name):
-        def noop(*args): pass
-        return noop
+        # Events are resolved once, further events are plain attribute lookups
+        setattr(self, name, _noop)
+        return _noop
 
 
 class DelegatingCableHandler(object):
@@ -45,7 +58,9 @@ class DelegatingCableHandler(object):
         self._handler = handler
 
     def __getattr__(self, name):
-        return getattr(self._handler, name)
+        method = getattr(self._handler, name)
+        setattr(self, name, method)
+        return method
 
 
 class LoggingCableHandler(object):
@@ -67,12 +82,132 @@ class LoggingCableHandler(object):
         self.level = level
 
     def __getattr__(self, name):
+        method = getattr(self._handler, name)
         def logme(*args):
-            getattr(logging, self.level)('%s%r' % (name, args))
-            getattr(self._handler, name)(*args)
+            getattr(logging, self.level)('%s%r', name, args)
+            method(*args)
+        setattr(self, name, logme)
         return logme
 
 
+class TimingCableHandler(object):
+    """\
+    A `ICableHandler` which measures where the time of a run goes and delegates
+    the events to an underlying `ICableHandler` instance.
+
+    Between the ``start`` and ``end`` event, the calls of the
+    ``cablemap.core.reader.parse_*`` functions, of ``_clean_html``, of the
+    ``cable_from_*`` functions and of ``titlefy`` are recorded, c.f.
+    `cablemap.core.timing.instrument`. Further, the following stages are
+    recorded:
+
+    ``handler.<event>``
+        The events of the underlying handler.
+    ``source``
+        Reading the next cable from the source (i.e. decoding the CSV row
+        and ``cable_from_row``).
+    ``cable``
+        All events of a cable (from ``start_cable`` to ``end_cable``), including
+        the parser functions which are invoked by accessing the cable properties.
+
+    If `workers` are used, the parser functions are invoked by the worker
+    processes and are not recorded.
+
+    With a `budget`, parsers which take too long for a cable are interrupted
+    and the cable is reported, c.f. `cablemap.core.timing.instrument`.
+    The budget is enforced within the main thread of the calling process
+    only; it cannot be combined with `workers` (c.f. `handle_source`).
+
+    This handler is not thread-safe: the parser functions are instrumented
+    process-wide, so only one `TimingCableHandler` can be active at a time
+    (``start`` raises a ``RuntimeError`` otherwise) and the calls of other
+    threads are recorded as well.
+    """
+    implements(ICableHandler)
+
+    def __init__(self, handler, slowest=10, report=None, json_file=None, budget=None, bounded_size=4096):
+        """\
+
+        `handler`
+            The ICableHandler instance which should receive the events.
+        `slowest`
+            The number of slowest cables which are kept per stage (default: ``10``).
+        `report`
+            An optional file-like object which receives the statistics as
+            text table after the ``end`` event, i.e. ``sys.stderr``.
+        `json_file`
+            An optional filename which receives the statistics as JSON
+            after the ``end`` event.
+        `budget`
+            An optional max. time in seconds per cable and ``reader.parse_*``
+            function. If a parser exceeds the budget, a bounded part of the
+            input is parsed or the property is left unparsed. The parsers
+            are only interrupted if ``start`` is invoked by the main thread,
+            otherwise slow parsers are just reported.
+        `bounded_size`
+            The number of characters which are parsed if a parser exceeds
+            the budget (default: ``4096``).
+        """
+        self._handler = handler
+        self.timings = Timings(slowest)
+        #: The max. time in seconds per parser call or ``None``
+        self.budget = budget
+        self._bounded_size = bounded_size
+        self._report = report
+        self._json_file = json_file
+        self._restore = None
+        self._last = None
+        self._cable_start = None
+
+    def __getattr__(self, name):
+        method = getattr(self._handler, name)
+        add, key = self.timings.add, 'handler.' + name
+        def timed(*args):
+            start = perf_counter()
+            method(*args)
+            add(key, perf_counter() - start)
+        setattr(self, name, timed)
+        return timed
+
+    def _delegate(self, name, *args):
+        start = perf_counter()
+        getattr(self._handler, name)(*args)
+        end = perf_counter()
+        self.timings.add('handler.' + name, end - start)
+        return end
+
+    def start(self):
+        self._restore = instrument(self.timings, self.budget, self._bounded_size)
+        self._last = self._delegate('start')
+
+    def start_cable(self, reference_id, canonical_id):
+        now = perf_counter()
+        if self._last is not None:
+            self.timings.add('source', now - self._last, reference_id)
+        self.timings.reference_id = reference_id
+        self._cable_start = now
+        self._delegate('start_cable', reference_id, canonical_id)
+
+    def end_cable(self):
+        self._last = self._delegate('end_cable')
+        self.timings.add('cable', self._last - self._cable_start)
+        self.timings.reference_id = None
+
+    def end(self):
+        try:
+            self._delegate('end')
+        finally:
+            if self._restore is not None:
+                self._restore()
+                self._restore = None
+        self._last = None
+        if self._report is not None:
+            self._report.write(self.timings.report() + '\n')
+        if self._json_file:
+            with open(self._json_file, 'w') as f:
+                self.timings.dump(f)
+
+
 class TeeCableHandler(object):
     """\
     A `ICableHandler` which delegates the events to two underlying `ICableHandler`
@@ -92,9 +227,11 @@ class TeeCableHandler(object):
         self._second = second
 
     def __getattr__(self, name):
+        first, second = getattr(self._first, name), getattr(self._second, name)
         def delegate(*args):
-            getattr(self._first, name)(*args)
-            getattr(self._second, name)(*args)
+            first(*args)
+            second(*args)
+        setattr(self, name, delegate)
         return delegate
 
 
@@ -114,9 +251,11 @@ class MultipleCableHandler(object):
         self._handlers = tuple(handlers)
 
     def __getattr__(self, name):
+        methods = tuple(getattr(handler, name) for handler in self._handlers)
         def delegate(*args):
-            for handler in self._handlers:
-                getattr(handler, name)(*args)
+            for method in methods:
+                method(*args)
+        setattr(self, name, delegate)
         return delegate
 
 
@@ -154,11 +293,17 @@ class CableIdFilter(DelegatingCableHandler):
         if self._accept:
             self._handler.start_cable(reference_id, canonical_id)
 
+    def delete_cable(self, reference_id, canonical_id):
+        if self._predicate(canonical_id):
+            self._handler.delete_cable(reference_id, canonical_id)
+
     def __getattr__(self, name):
-        def noop(*args): pass
-        if self._accept:
-            return super(CableIdFilter, self).__getattr__(name)
-        return noop
+        method = getattr(self._handler, name)
+        def delegate(*args):
+            if self._accept:
+                method(*args)
+        setattr(self, name, delegate)
+        return delegate
 
 
 class DefaultMetadataOnlyFilter(DelegatingCableHandler):
@@ -231,6 +376,39 @@ class DebitlyFilter(DelegatingCableHandler):
         self._handler.handle_media_iri(iri)
 
 
+class BatchCableHandler(object):
+    """\
+    `ICableBatchHandler` implementation which issues the fine-grained
+    `ICableHandler` events of each cable to an underlying handler.
+    """
+    implements(ICableBatchHandler)
+
+    def __init__(self, handler, batch_size=_BATCH_SIZE):
+        """\
+
+        `handler`
+            The ICableHandler instance which should receive the events.
+        `batch_size`
+            The number of cables per batch (default: ``1000``).
+        """
+        self._handler = handler
+        self.batch_size = batch_size
+
+    def start(self):
+        self._handler.start()
+
+    def end(self):
+        self._handler.end()
+
+    def handle_batch(self, cables):
+        handler = self._handler
+        for cable in cables:
+            handle_cable(cable, handler, False)
+
+    def delete_cable(self, reference_id, canonical_id):
+        self._handler.delete_cable(reference_id, canonical_id)
+
+
 def handle_cable(cable, handler, standalone=True):
     """\
     Emits event from the provided `cable` to the handler.
@@ -273,12 +451,12 @@ def handle_cable(cable, handler, standalone=True):
     handler.handle_content(cable.content)
     handler.handle_origin(cable.origin)
     handler.handle_classification(cable.classification)
-    handler.handle_partial(cable.partial)
+    handler.handle_partial(cable.is_partial)
     for cat in cable.classification_categories:
         handler.handle_classification_category(cat)
-    for classificationist in cable.classificationists:
+    for classificationist in cable.classified_by:
         handler.handle_classificationist(classificationist)
-    for signer in cable.signers:
+    for signer in cable.signed_by:
         handler.handle_signer(signer)
     for tag in cable.tags:
         handler.handle_tag(tag)
@@ -299,18 +477,44 @@ def handle_cables(cables, handler):
     Issues one ``handler.start()`` event, processes all `cables` and
     issues a ``handler.end()`` event.
 
+    If the `handler` is a `ICableBatchHandler`, the cables are delivered
+    by ``handler.handle_batch(cables)`` events.
+
     `cables`
         An iterable of Cable objects.
     `handler`
-        The `ICableHandler` instance which should receive the events.
+        The `ICableHandler` or `ICableBatchHandler` instance which should
+        receive the events.
     """
     handler.start()
-    for cable in cables:
-        handle_cable(cable, handler, False)
+    _handle_cables(cables, handler)
     handler.end()
 
 
-def handle_source(path, handler, predicate=None):
+def _handle_cables(cables, handler):
+    if is_batch_handler(handler):
+        it = iter(cables)
+        size = getattr(handler, 'batch_size', None) or _BATCH_SIZE
+        batch = list(islice(it, size))
+        while batch:
+            handler.handle_batch(batch)
+            batch = list(islice(it, size))
+    else:
+        for cable in cables:
+            handle_cable(cable, handler, False)
+
+
+def is_batch_handler(handler):
+    """\
+    Returns if the provided `handler` implements `ICableBatchHandler`.
+
+    Only the class of the handler is inspected since handlers like the
+    `NoopCableHandler` accept any attribute.
+    """
+    return callable(getattr(type(handler), 'handle_batch', None))
+
+
+def handle_source(path, handler, predicate=None, workers=None, key=None, cache_dir=None, manifest=None):
     """\
     Reads all cables from the provided source and issues events to
     the `handler`.
@@ -318,12 +522,55 @@ def handle_source(path, handler, predicate=None):
     `path`
         Either a directory with cable files or a CSV file.
     `handler`
-        The `ICableHandler` instance which should receive the events.
+        The `ICableHandler` or `ICableBatchHandler` instance which should
+        receive the events.
     `predicate`
         A predicate that is invoked for each cable reference identifier.
         If the predicate evaluates to ``False`` the cable is ignored.
         By default, all cables are used.
         I.e. ``handle_source('cables.csv', handler, lambda r: r.startswith('09'))``
         would return cables where the reference identifier starts with ``09``.
+    `workers`
+        The number of processes which parse the cables (default: ``None``).
+        If `workers` is greater than one, the cables are parsed in parallel
+        and the events are issued in input order by the calling process.
+        Since the parsers run in the worker processes, a `TimingCableHandler`
+        with a budget cannot bound them; this combination raises a ``ValueError``.
+    `key`
+        An optional function which accepts a cable and returns a sort key.
+        If provided, the events are issued in the order of the keys instead
+        of the input order, i.e. ``key=lambda cable: cable.canonical_id``.
+        Note: All cables are kept in memory before the first event is issued.
+    `cache_dir`
+        A directory which keeps a persistent cache of parsed cables (default: ``None``).
+        If provided, cables which did not change since the last run are
+        read from the cache instead of being parsed again.
+    `manifest`
+        A path to a manifest file (default: ``None``), c.f.
+        `cablemap.core.manifest.Manifest`. If provided, only the events of
+        cables which are new or which were changed since the previous
+        run are issued. For each cable which was removed from the source
+        a ``handler.delete_cable(reference_id, canonical_id)`` event is issued.
+        The manifest is updated after the ``handler.end()`` event.
+        A ``ValueError`` is raised if the class of the `handler` has an
+        ``incremental`` attribute which is ``False``, i.e. if the handler
+        writes an index of all cables it receives.
     """
-    handle_cables(cables_from_source(path, predicate), handler)
+    if workers and workers > 1 and isinstance(handler, TimingCableHandler) and handler.budget is not None:
+        raise ValueError('The budget of a TimingCableHandler cannot be enforced with workers')
+    if manifest is not None:
+        if not getattr(type(handler), 'incremental', True):
+            raise ValueError('%s does not support incremental runs' % type(handler).__name__)
+        manifest = Manifest(manifest)
+    cables = cables_from_source(path, predicate, workers=workers, cache_dir=cache_dir, manifest=manifest)
+    if key:
+        cables = sorted(cables, key=key)
+    if manifest is None:
+        handle_cables(cables, handler)
+        return
+    handler.start()
+    _handle_cables(cables, handler)
+    for reference_id in manifest.deleted(predicate):
+        handler.delete_cable(reference_id, canonicalize_id(reference_id))
+    handler.end()
+    manifest.save(predicate)
@@ -19,7 +19,7 @@ except ImportError:
         def __init__(self, descr): pass
     class Attribute(object):
         def __init__(self, descr): pass
-    def implements(i): pass
+    def implements(*i): pass
 
 
 class ICable(Interface):
@@ -85,6 +85,11 @@ class ICable(Interface):
 
     This attribute is read-only.
     """)
+    media_uris = Attribute("""\
+    Returns a maybe empty list of IRIs of media coverage about the cable.
+
+    This attribute is writable.
+    """)
     transmission_id = Attribute("""\
     The transmission identifier (a string) of the cable or ``None``.
 
@@ -313,6 +318,20 @@ class ICableHandler(Interface):
         has been processed.
         """
 
+    def delete_cable(reference_id, canonical_id):
+        """\
+        Indicates that the cable was removed from the source.
+
+        This event is only issued by incremental runs, c.f.
+        `cablemap.core.handler.handle_source`, and it is not
+        enclosed by `start_cable` and `end_cable`.
+
+        `reference_id`
+            The reference identifier of the removed cable.
+        `canonical_id`
+            The canonical identifier of the removed cable.
+        """
+
     def handle_tag(tag):
         """\
         Adds a TAG to the cable.
@@ -483,3 +502,85 @@ class ICableHandler(Interface):
         `iri`
             The IRI to add.
         """
+
+
+class ICableBatchHandler(Interface):
+    """\
+    Defines an interface for classes which process blocks of cables.
+
+    The first event is `start` and the last event must be `end`.
+    Between these events one or more `handle_batch` events occur.
+
+    `cablemap.core.handler.handle_cables` prefers this interface if a
+    handler class defines a ``handle_batch`` method.
+    """
+    batch_size = Attribute("""\
+    Returns the preferred number of cables per batch (an integer).
+
+    This attribute is optional, by default the batches contain up to
+    1000 cables.
+    """)
+
+    def start():
+        """\
+        First event.
+        """
+
+    def end():
+        """\
+        Last event.
+        """
+
+    def handle_batch(cables):
+        """\
+        Processes a block of cables.
+
+        `cables`
+            A list of `ICable` instances.
+        """
+
+    def delete_cable(reference_id, canonical_id):
+        """\
+        Indicates that the cable was removed from the source,
+        c.f. `ICableHandler.delete_cable`.
+        """
+
+
+class IResponseCache(Interface):
+    """\
+    Cache of HTTP responses used by `cablemap.core.utils.cable_by_id` and
+    `cablemap.core.utils.cable_by_url`, c.f. `cablemap.core.utils.set_response_cache`.
+    """
+    offline = Attribute("""\
+    Indicates if responses are served from the cache only (a boolean).
+
+    If ``True``, no requests are sent and an error is raised for URLs
+    which are not cached.
+    """)
+
+    def get(url):
+        """\
+        Returns a ``(body, etag, last_modified, fresh)`` tuple or ``None``
+        if the response is not cached.
+
+        If `fresh` is ``True``, the body is used without asking the server.
+        Otherwise, a conditional request with the `etag` and `last_modified`
+        validators (which may be ``None``) is sent.
+
+        `url`
+            The requested URL.
+        """
+
+    def put(url, body, etag=None, last_modified=None):
+        """\
+        Stores a response.
+
+        `url`
+            The requested URL.
+        `body`
+            The body of the response (a string).
+        `etag`
+            The value of the ``ETag`` header or ``None``.
+        `last_modified`
+            The value of the ``Last-Modified`` header or ``None``.
+        """
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Manifest of the cables which were processed by a previous run.
+
+The manifest is a gzipped CSV file with the columns
+``<reference-id>, <digest>`` where the digest is the hex encoded
+SHA-1 digest of the raw cable (c.f. `cablemap.core.cache.ParseCache`).
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import io
+import csv
+import gzip
+import binascii
+
+__all__ = ['Manifest']
+
+
+class Manifest(object):
+    """\
+    Keeps track of the cables of a source and detects new, changed
+    and deleted cables.
+    """
+    def __init__(self, filename):
+        """\
+
+        `filename`
+            The manifest file. If the file does not exist, all cables are
+            considered as new.
+        """
+        self.filename = filename
+        self._previous = {}
+        self._current = {}
+        if os.path.exists(filename):
+            with io.TextIOWrapper(gzip.open(filename, 'rb'), encoding='utf-8', newline='') as f:
+                for reference_id, digest in csv.reader(f):
+                    self._previous[reference_id] = binascii.unhexlify(digest)
+
+    def changed(self, key):
+        """\
+        Returns if the cable identified by the provided ``(reference_id, digest)``
+        tuple is new or if it was changed since the previous run.
+
+        The cable is recorded as part of the current run.
+        """
+        reference_id, digest = key
+        self._current[reference_id] = digest
+        return self._previous.get(reference_id) != digest
+
+    def deleted(self, predicate=None):
+        """\
+        Returns a sorted list of reference identifiers of cables which
+        were part of the previous run but not of the current run.
+
+        `predicate`
+            The predicate which was used to select the cables (default: ``None``).
+            Cables which are not accepted by the predicate are not reported.
+        """
+        pred = predicate or bool
+        return sorted(reference_id for reference_id in self._previous
+                      if reference_id not in self._current and pred(reference_id))
+
+    def save(self, predicate=None):
+        """\
+        Writes the manifest of the current run.
+
+        `predicate`
+            The predicate which was used to select the cables (default: ``None``).
+            Entries of the previous run which are not accepted by the
+            predicate are kept.
+        """
+        entries = {}
+        if predicate:
+            entries.update((reference_id, digest) for reference_id, digest in self._previous.items()
+                           if not predicate(reference_id))
+        entries.update(self._current)
+        tmp = self.filename + '.tmp'
+        with io.TextIOWrapper(gzip.open(tmp, 'wb'), encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            for reference_id in sorted(entries):
+                writer.writerow((reference_id, binascii.hexlify(entries[reference_id]).decode('ascii')))
+        os.replace(tmp, self.filename)
+        self._previous, self._current = entries, {}
@@ -13,13 +13,14 @@ This module provides models to keep data about cables.
 :license:      BSD license
 """
 from __future__ import absolute_import
-import codecs
+import os
+import mmap
 from itertools import chain
 from operator import itemgetter
 from cablemap.core import reader, c14n, consts
 from cablemap.core.interfaces import ICable, IReference, IRecipient, implements
 
-__all__ = ['cable_from_file', 'cable_from_html', 'cable_from_row']
+__all__ = ['cable_from_file', 'cable_from_html', 'cable_from_row', 'cable_record']
 
 _EMPTY = tuple()
 
@@ -27,12 +28,40 @@ _EMPTY = tuple()
 def cable_from_file(filename):
     """\
     Returns a cable from the provided file.
+
+    The file is memory mapped and only the metadata table and the
+    ``<code><pre>`` sections of the (UTF-8 encoded) page are decoded.
     
     `filename`
         An absolute path to the cable file.
     """
-    html = codecs.open(filename, 'rb', 'utf-8').read()
-    return cable_from_html(html, reader.reference_id_from_filename(filename))
+    reference_id = reader.reference_id_from_filename(filename)
+    with open(filename, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            # Empty files cannot be mapped
+            return cable_from_html(u'', reference_id)
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return _cable_from_buffer(buf, reference_id)
+    finally:
+        buf.close()
+
+
+def _cable_from_buffer(buf, reference_id):
+    """\
+    Returns a cable from the provided bytes (or memory map) of an UTF-8
+    encoded HTML page, c.f. `cable_from_html`.
+    """
+    meta = reader._meta_offsets(buf)
+    if meta is None or not reference_id:
+        return cable_from_html(buf[:].decode('utf-8'), reference_id)
+    cable = Cable(reference_id)
+    start, end = meta
+    reader.parse_meta(buf[start:end].decode('utf-8'), cable)
+    sections = [buf[start:end].decode('utf-8') for start, end in reader._section_offsets(buf)]
+    cable.header = reader._header_from_sections(sections)
+    cable.content = reader._content_from_sections(sections)
+    return cable
 
 
 def cable_from_html(html, reference_id=None):
@@ -108,6 +137,9 @@ class Reference(tuple):
     def __new__(cls, value, kind, bullet=None, title=None):
         return tuple.__new__(cls, (value, kind, bullet.upper() if bullet else None, title.strip('"') if title else None))
 
+    def __getnewargs__(self):
+        return tuple(self)
+
     def is_cable(self):
         return self.kind == consts.REF_KIND_CABLE
 
@@ -127,6 +159,9 @@ class Recipient(tuple):
     def __new__(cls, route, name, precedence=None, mcn=None, excluded=None):
         return tuple.__new__(cls, (route or None, name, precedence or None, mcn or None, excluded or _EMPTY))
 
+    def __getnewargs__(self):
+        return tuple(self)
+
     route = property(itemgetter(0))
     name = property(itemgetter(1))
     excluded = property(itemgetter(4))
@@ -140,12 +175,74 @@ class Recipient(tuple):
     mcn = property(itemgetter(3))
 
 
+_MISSING = object()
+
+
+class _memoized(object):
+    """\
+    Descriptor which caches the result of a parser function in a slot of
+    the `Cable` instance.
+
+    `depends_on` names the attributes (``header``, ``content``,
+    ``created``, ``reference_id``) the result depends on. If one of these
+    attributes is reassigned, the cached value is discarded.
+    """
+    def __init__(self, depends_on):
+        self.depends_on = depends_on
+
+    def __call__(self, func):
+        self.func = func
+        self.slot = '_' + func.__name__
+        self.__doc__ = func.__doc__
+        return self
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot, _MISSING)
+        if value is _MISSING:
+            value = self.func(instance)
+            setattr(instance, self.slot, value)
+        return value
+
+
+def _invalidating(name):
+    """\
+    Returns a property which stores the value in the slot ``_<name>`` and
+    discards all cached values which depend on `name` if the value is changed.
+    """
+    slot = '_' + name
+    def fget(self):
+        return getattr(self, slot)
+    def fset(self, value):
+        setattr(self, slot, value)
+        for cached_slot in _DEPENDENT_SLOTS[name]:
+            try:
+                delattr(self, cached_slot)
+            except AttributeError:
+                pass
+    return property(fget, fset)
+
+
 class Cable(object):
     """\
     Holds data about a cable.
+
+    The properties which are extracted from the header and content are
+    parsed once and cached. Assigning a new `header`, `content`, `created`
+    value or `reference_id` discards the affected cached values.
     """
     implements(ICable)
 
+    __slots__ = ('_reference_id', 'origin', '_header', '_content', '_created',
+                 'released', 'classification', 'media_uris',
+                 # Cached values, c.f. _memoized
+                 '_canonical_id', '_wl_uris', '_transmission_id', '_recipients',
+                 '_info_recipients', '_is_partial', '_subject',
+                 '_classification_categories', '_nondisclosure_deadline',
+                 '_references', '_tags', '_summary', '_comment', '_signed_by',
+                 '_classified_by', '_content_sections')
+
     def __init__(self, reference_id):
         """\
 
@@ -161,8 +258,14 @@ class Cable(object):
         self.created = None
         self.released = None
         self.classification = None
+        self.media_uris = []
 
-    @property
+    reference_id = _invalidating('reference_id')
+    header = _invalidating('header')
+    content = _invalidating('content')
+    created = _invalidating('created')
+
+    @_memoized(depends_on=('reference_id',))
     def canonical_id(self):
         return c14n.canonicalize_id(self.reference_id)
 
@@ -178,7 +281,7 @@ class Cable(object):
     def cabledrum_uri(self):
         return u'http://www.cabledrum.net/cables/' + self.reference_id
 
-    @property
+    @_memoized(depends_on=('reference_id', 'created'))
     def wl_uris(self):
         """\
         Returns cable IRIs to WikiLeaks (mirrors).
@@ -204,60 +307,119 @@ class Cable(object):
     #
     # Header properties
     #
-    @property
+    @_memoized(depends_on=('header',))
     def transmission_id(self):
         return reader.parse_transmission_id(self.header) if not self.is_partial else None
 
-    @property
+    @_memoized(depends_on=('header', 'reference_id'))
     def recipients(self):
         return reader.parse_recipients(self.header, self.reference_id) if not self.is_partial else _EMPTY
 
-    @property
+    @_memoized(depends_on=('header', 'reference_id'))
     def info_recipients(self):
         return reader.parse_info_recipients(self.header, self.reference_id)
 
-    @property
+    @_memoized(depends_on=('header',))
     def is_partial(self):
         return 'This record is a partial extract of the original cable' in self.header
 
     #
     # Content properties
     #
-    @property
+    @_memoized(depends_on=('content',))
+    def content_sections(self):
+        """\
+        Returns the `cablemap.core.reader.ContentSections` of the content.
+        """
+        return reader.ContentSections(self.content)
+
+    @_memoized(depends_on=('content', 'reference_id'))
     def subject(self):
-        return reader.parse_subject(self.content, self.reference_id)
+        return reader.parse_subject(self.content, self.reference_id, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content',))
     def classification_categories(self):
-        return reader.parse_classification_categories(self.content)
+        return reader.parse_classification_categories(self.content, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content',))
     def nondisclosure_deadline(self):
-        return reader.parse_nondisclosure_deadline(self.content)
+        return reader.parse_nondisclosure_deadline(self.content, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content', 'created', 'reference_id'))
     def references(self):
-        return reader.parse_references(self.content, self.created[:4], self.reference_id)
+        return reader.parse_references(self.content, self.created[:4], self.reference_id, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content', 'reference_id'))
     def tags(self):
-        return reader.parse_tags(self.content, self.reference_id)
+        return reader.parse_tags(self.content, self.reference_id, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content', 'reference_id'))
     def summary(self):
-        return reader.parse_summary(self.content, self.reference_id)
+        return reader.parse_summary(self.content, self.reference_id, sections=self.content_sections)
 
-    @property
+    @_memoized(depends_on=('content',))
     def comment(self):
         return reader.parse_comment(self.content)
 
-    @property
+    @_memoized(depends_on=('content',))
     def signed_by(self):
         return reader.parse_signed_by(self.content)
 
-    @property
+    @_memoized(depends_on=('content',))
     def classified_by(self):
-        return reader.parse_classified_by(self.content)
+        return reader.parse_classified_by(self.content, sections=self.content_sections)
+
+
+# Maps an attribute name to the slots of the cached values which depend on it
+_DEPENDENT_SLOTS = dict((name, tuple(d.slot for d in vars(Cable).values()
+                                     if isinstance(d, _memoized) and name in d.depends_on))
+                        for name in ('reference_id', 'header', 'content', 'created'))
+
+
+# All ICable attributes which are copied by `cable_record`
+_RECORD_FIELDS = (
+    'reference_id', 'canonical_id', 'origin', 'header', 'content', 'created',
+    'released', 'classification', 'wl_uris', 'media_uris', 'plusd_canonical_id',
+    'plusd_uri', 'cabledrum_uri', 'transmission_id', 'recipients',
+    'info_recipients', 'is_partial', 'subject', 'classification_categories',
+    'nondisclosure_deadline', 'references', 'tags', 'summary', 'comment',
+    'signed_by', 'classified_by',
+)
+
+
+class CableRecord(object):
+    """\
+    Holds the fully parsed properties of a cable as plain attributes.
+
+    In contrast to `Cable`, a record does not parse anything on demand.
+    Records are picklable and can be sent between processes.
+    """
+    __slots__ = _RECORD_FIELDS
+    implements(ICable)
+
+    def __init__(self, **kw):
+        for name in _RECORD_FIELDS:
+            setattr(self, name, kw.get(name))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in _RECORD_FIELDS)
+
+    def __setstate__(self, state):
+        for name, value in zip(_RECORD_FIELDS, state):
+            setattr(self, name, value)
+
+    def __unicode__(self):
+        return self.reference_id
+
+
+def cable_record(cable):
+    """\
+    Returns a `CableRecord` with all properties of the provided `cable`.
+
+    `cable`
+        An ``ICable`` instance.
+    """
+    return CableRecord(**dict((name, getattr(cable, name)) for name in _RECORD_FIELDS))
 
 
 if __name__ == '__main__':
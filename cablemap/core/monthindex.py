@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Memory mapped index of the cable reference identifier -> month of the
+publication mapping (``cable2month.csv.gz``).
+
+The index is a binary file with fixed width records which are sorted by
+the reference identifier. A lookup is a binary search over the memory
+mapped file, only the touched pages are read into memory and the pages are
+shared by all processes which use the index.
+
+File layout::
+
+    header      magic "CMMI", version, record width, number of records,
+                size and modification time of the source file
+    records     the reference identifier (ASCII, padded with NUL bytes
+                to ``width - 1``) followed by the month (one byte)
+
+The index is created on first use in the user's cache directory
+(``$XDG_CACHE_HOME/cablemap`` or ``~/.cache/cablemap``) or, if this
+directory is not writable, in the temp. directory. The name of the index
+contains the size and the modification time of ``cable2month.csv.gz``, so a
+new version of the CSV file gets a new index.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import io
+import csv
+import gzip
+import mmap
+import struct
+import tempfile
+from bisect import bisect_left
+
+__all__ = ['MonthIndex', 'build_month_index', 'month_index']
+
+_MAGIC = b'CMMI'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHIQd')
+
+_SOURCE = os.path.join(os.path.dirname(__file__), 'cable2month.csv.gz')
+
+_INDEX = None
+
+
+def _source_stat(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime
+
+
+def build_month_index(source, filename):
+    """\
+    Reads the CSV file `source` (``<reference-id>,<month>``, optionally
+    gzipped) and writes the index into `filename`.
+
+    `source`
+        The CSV file.
+    `filename`
+        The index file.
+    """
+    opener = gzip.open if source.endswith('.gz') else io.open
+    with opener(source, 'rt') as f:
+        rows = sorted((reference_id.encode('ascii'), int(month)) for reference_id, month in csv.reader(f) if reference_id)
+    width = max(len(reference_id) for reference_id, _ in rows) + 1 if rows else 1
+    size, mtime = _source_stat(source)
+    tmp = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, width, len(rows), size, mtime))
+        record = struct.Struct('%dsB' % (width - 1))
+        f.write(b''.join(record.pack(reference_id, month) for reference_id, month in rows))
+    os.replace(tmp, filename)
+
+
+class _Keys(object):
+    """\
+    Read-only sequence of the (padded) reference identifiers, used for binary searches.
+    """
+    def __init__(self, buf, width, count):
+        self._buf = buf
+        self._width = width
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        start = _HEADER.size + i * self._width
+        return self._buf[start:start + self._width - 1]
+
+
+class MonthIndex(object):
+    """\
+    Memory mapped reference identifier -> month index, c.f. `build_month_index`.
+    """
+    def __init__(self, filename, source=None):
+        """\
+
+        `filename`
+            A file written by `build_month_index`.
+        `source`
+            The CSV file the index was built from (default: ``None``).
+            If provided, a ``ValueError`` is raised if the index does not
+            reflect the current version of the CSV file.
+        """
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, width, count, size, mtime = _HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic = version = None
+        if magic != _MAGIC or version != _VERSION \
+                or len(self._mmap) != _HEADER.size + width * count:
+            self._mmap.close()
+            raise ValueError('"%s" is not a month index' % filename)
+        if source is not None and (size, mtime) != _source_stat(source):
+            self._mmap.close()
+            raise ValueError('The month index "%s" is outdated' % filename)
+        self._width = width
+        self._keys = _Keys(self._mmap, width, count)
+
+    def _find(self, reference_id):
+        try:
+            key = reference_id.encode('ascii')
+        except UnicodeError:
+            return -1
+        width = self._width
+        if len(key) >= width:
+            return -1
+        key += b'\0' * (width - 1 - len(key))
+        keys = self._keys
+        i = bisect_left(keys, key)
+        return i if i < len(keys) and keys[i] == key else -1
+
+    def get(self, reference_id, default=None):
+        """\
+        Returns the month (i.e. ``u'2'``) when the cable was published by
+        WikiLeaks or `default` if the cable is unknown.
+
+        `reference_id`
+            The WikiLeaks reference identifier of the cable.
+        """
+        i = self._find(reference_id)
+        if i < 0:
+            return default
+        return u'%d' % self._mmap[_HEADER.size + (i + 1) * self._width - 1]
+
+    def __getitem__(self, reference_id):
+        month = self.get(reference_id)
+        if month is None:
+            raise KeyError(reference_id)
+        return month
+
+    def __contains__(self, reference_id):
+        return self._find(reference_id) >= 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _cache_dir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                        'cablemap')
+
+
+def _index_filenames(source):
+    st_size, st_mtime = _source_stat(source)
+    name = '%s-%d-%d.idx' % (os.path.basename(source).split('.')[0], st_size, int(st_mtime))
+    yield os.path.join(_cache_dir(), name)
+    yield os.path.join(tempfile.gettempdir(), 'cablemap-' + name)
+
+
+def month_index():
+    """\
+    Returns the `MonthIndex` of ``cable2month.csv.gz``.
+
+    The index is built on first use and opened once per process.
+    """
+    global _INDEX
+    if _INDEX is None:
+        error = None
+        for filename in _index_filenames(_SOURCE):
+            try:
+                _INDEX = MonthIndex(filename, _SOURCE)
+                break
+            except (IOError, OSError, ValueError):
+                pass
+            try:
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                build_month_index(_SOURCE, filename)
+                _INDEX = MonthIndex(filename, _SOURCE)
+                break
+            except (IOError, OSError) as ex:
+                # Not writable, try the next location
+                error = ex
+        else:
+            raise error
+    return _INDEX
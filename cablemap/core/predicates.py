@@ -19,6 +19,230 @@ from cablemap.core.c14n import canonicalize_id
 
 _YEAR_ORIGIN_PATTERN = re.compile(r'([0-9]{2})([A-Z\-]+)[0-9]+')
 
+# Country -> the origins (stations) located in the country
+_COUNTRIES = {
+    u'afghanistan': (u'KABUL',),
+    u'albania': (u'TIRANA',),
+    u'algeria': (u'ALGIERS',),
+    u'angola': (u'LUANDA',),
+    u'argentinia': (u'BUENOSAIRES',),
+    u'armenia': (u'YEREVAN',),
+    u'australia': (u'MELBOURNE', u'SYDNEY', u'PERTH', u'CANBERRA'),
+    u'austria': (u'UNVIEVIENNA', u'VIENNA'),
+    u'azerbaijan': (u'BAKU',),
+    u'bahamas': (u'NASSAU',),
+    u'bahrain': (u'MANAMA',),
+    u'bangladesh': (u'DHAKA',),
+    u'barbados': (u'BRIDGETOWN',),
+    u'belarus': (u'MINSK',),
+    u'belgium': (u'BRUSSELS', u'USEUBRUSSELS'),
+    u'belize': (u'BELMOPAN',),
+    u'benin': (u'COTONOU',),
+    u'bermuda': (u'HAMILTON',),
+    u'bolivia': (u'LAPAZ',),
+    u'bosnia_and_herzegovina': (u'SARAJEVO',),
+    u'botswana': (u'GABORONE',),
+    u'brazil': (u'BRASILIA', u'SAOPAULO', u'RIODEJANEIRO', u'RECIFE'),
+    u'brunei': (u'BANDARSERIBEGAWAN',),
+    u'bulgaria': (u'SOFIA',),
+    u'burkina_faso': (u'OUAGADOUGOU',),
+    u'burma': (u'RANGOON',),
+    u'burundi': (u'BUJUMBURA',),
+    u'cambodia': (u'PHNOMPENH',),
+    u'cameroon': (u'YAOUNDE',),
+    u'canada': (u'CALGARY', u'HALIFAX', u'MONTREAL', u'QUEBEC', u'OTTAWA', u'TORONTO',
+        u'VANCOUVER'),
+    u'cape_verde': (u'PRAIA',),
+    u'central_african_republic': (u'BANGUI',),
+    u'chad': (u'NDJAMENA',),
+    u'chile': (u'SANTIAGO',),
+    u'china': (u'BEIJING', u'CHENGDU', u'GUANGZHOU', u'HONGKONG', u'SHANGHAI', u'SHENYANG'),
+    u'colombia': (u'BOGOTA',),
+    u'costa_rica': (u'SANJOSE',),
+    u'cote_divoire': (u'ABIDJAN',),
+    u'croatia': (u'ZAGREB',),
+    u'cuba': (u'HAVANA',),
+    u'curacao': (u'CURACAO',),
+    u'cyprus': (u'NICOSIA',),
+    u'czech': (u'PRAGUE',),
+    u'democratic_republic_congo': (u'KINSHASA',),
+    u'denmark': (u'COPENHAGEN',),
+    u'djibouti': (u'DJIBOUTI',),
+    u'dominican_republic': (u'SANTODOMINGO',),
+    u'east_timor': (u'DILI',),
+    u'ecuador': (u'QUITO',),
+    u'egypt': (u'CAIRO', u'ALEXANDRIA'),
+    u'el_salvador': (u'SANSALVADOR',),
+    u'equatorial_guinea': (u'MALABO',),
+    u'eritrea': (u'ASMARA',),
+    u'estonia': (u'TALLINN',),
+    u'ethiopia': (u'ADDISABABA',),
+    u'fiji': (u'SUVA',),
+    u'finland': (u'HELSINKI',),
+    u'france': (u'MARSEILLE', u'PARIS', u'STRASBOURG'),
+    u'gabon': (u'LIBREVILLE',),
+    u'gambia': (u'BANJUL',),
+    u'georgia': (u'TBILISI',),
+    u'germany': (u'BONN', u'BERLIN', u'DUSSELDORF', u'FRANKFURT', u'HAMBURG', u'LEIPZIG',
+        u'MUNICH'),
+    u'ghana': (u'ACCRA',),
+    u'greece': (u'ATHENS', u'THESSALONIKI'),
+    u'grenada': (u'BRIDGETOWN',),
+    u'guatemala': (u'GUATEMALA',),
+    u'guinea': (u'CONAKRY',),
+    u'guyana': (u'GEORGETOWN',),
+    u'haiti': (u'PORTAUPRINCE',),
+    u'honduras': (u'TEGUCIGALPA',),
+    u'hungary': (u'BUDAPEST',),
+    u'iceland': (u'REYKJAVIK',),
+    u'india': (u'CHENNAI', u'KOLKATA', u'MUMBAI', u'NEWDELHI'),
+    u'indonesia': (u'JAKARTA', u'SURABAYA'),
+    u'iran': (u'TEHRAN', u'RPODUBAI'),
+    u'iraq': (u'BAGHDAD', u'BASRAH', u'HILLAH', u'KIRKUK', u'MOSUL'),
+    u'ireland': (u'DUBLIN',),
+    u'israel': (u'JERUSALEM', u'TELAVIV'),
+    u'italy': (u'FLORENCE', u'MILAN', u'NAPLES', u'ROME', u'UNROME'),
+    u'jamaica': (u'KINGSTON',),
+    u'japan': (u'FUKUOKA', u'NAGOYA', u'NAHA', u'OSAKAKOBE', u'SAPPORO', u'TOKYO'),
+    u'jordan': (u'AMMAN',),
+    u'kazakhstan': (u'ASTANA', u'ALMATY'),
+    u'kenya': (u'NAIROBI',),
+    u'kosovo': (u'PRISTINA',),
+    u'kuwait': (u'KUWAIT',),
+    u'kyrgyzstan': (u'BISHKEK',),
+    u'laos': (u'VIENTIANE',),
+    u'latvia': (u'RIGA',),
+    u'lebanon': (u'BEIRUT',),
+    u'lesotho': (u'MASERU',),
+    u'liberia': (u'MONROVIA',),
+    u'libya': (u'TRIPOLI',),
+    u'lithuania': (u'VILNIUS',),
+    u'luxembourg': (u'LUXEMBOURG',),
+    u'macedonia': (u'SKOPJE',),
+    u'madagascar': (u'ANTANANARIVO',),
+    u'majuro': (u'MAJURO',),
+    u'malawi': (u'LILONGWE',),
+    u'malaysia': (u'KUALALUMPUR',),
+    u'mali': (u'BAMAKO',),
+    u'malta': (u'VALLETTA',),
+    u'mauritania': (u'NOUAKCHOTT',),
+    u'mauritius': (u'PORTLOUIS',),
+    u'mexico': (u'CIUDADJUAREZ', u'GUADALAJARA', u'HERMOSILLO', u'MATAMOROS', u'MERIDA', u'MEXICO',
+        u'MONTERREY', u'NOGALES', u'NUEVOLAREDO', u'TIJUANA'),
+    u'micronesia': (u'KOLONIA',),
+    u'moldova': (u'CHISINAU',),
+    u'mongolia': (u'ULAANBAATAR',),
+    u'montenegro': (u'PODGORICA',),
+    u'morocco': (u'CASABLANCA', u'RABAT'),
+    u'mozambique': (u'MAPUTO',),
+    u'namibia': (u'WINDHOEK',),
+    u'nepal': (u'KATHMANDU',),
+    u'netherlands': (u'AMSTERDAM', u'THEHAGUE'),
+    u'new_zealand': (u'AUCKLAND', u'WELLINGTON'),
+    u'nicaragua': (u'MANAGUA',),
+    u'niger': (u'NIAMEY',),
+    u'nigeria': (u'ABUJA', u'KADUNA', u'LAGOS'),
+    u'northern_ireland': (u'BELFAST',),
+    u'norway': (u'OSLO',),
+    u'oman': (u'MUSCAT',),
+    u'pakistan': (u'KARACHI', u'LAHORE', u'PESHAWAR', u'ISLAMABAD'),
+    u'palau': (u'KOROR',),
+    u'panama': (u'PANAMA',),
+    u'papua_new_guinea': (u'PORTMORESBY',),
+    u'paraguay': (u'ASUNCION',),
+    u'peru': (u'LIMA',),
+    u'philippines': (u'MANILA',),
+    u'poland': (u'KRAKOW', u'WARSAW'),
+    u'portugal': (u'LISBON', u'PONTADELGADA'),
+    u'qatar': (u'DOHA',),
+    u'republic_congo': (u'BRAZZAVILLE',),
+    u'romania': (u'BUCHAREST',),
+    u'russia': (u'MOSCOW', u'STPETERSBURG', u'VLADIVOSTOK', u'YEKATERINBURG'),
+    u'rwanda': (u'KIGALI',),
+    u'samoa': (u'APIA',),
+    u'saudi_arabia': (u'DHAHRAN', u'JEDDAH', u'RIYADH'),
+    u'senegal': (u'DAKAR',),
+    u'serbia': (u'BELGRADE',),
+    u'sierra_leone': (u'FREETOWN',),
+    u'singapore': (u'SINGAPORE',),
+    u'slovakia': (u'BRATISLAVA',),
+    u'slovenia': (u'LJUBLJANA',),
+    u'somalia': (u'MOGADISHU',),
+    u'south_africa': (u'CAPETOWN', u'DURBAN', u'JOHANNESBURG', u'PRETORIA'),
+    u'south_korea': (u'SEOUL',),
+    u'spain': (u'MADRID', u'BARCELONA'),
+    u'sri_lanka': (u'COLOMBO',),
+    u'sudan': (u'KHARTOUM',),
+    u'suriname': (u'PARAMARIBO',),
+    u'swaziland': (u'MBABANE',),
+    u'sweden': (u'STOCKHOLM',),
+    u'switzerland': (u'BERN',),
+    u'syria': (u'DAMASCUS',),
+    u'taiwan': (u'AITTAIPEI', u'TAIPEI'),
+    u'tajikistan': (u'DUSHANBE',),
+    u'tanzania': (u'DARESSALAAM',),
+    u'thailand': (u'BANGKOK', u'CHIANGMAI'),
+    u'togo': (u'LOME',),
+    u'trinidad_and_tobago': (u'PORTOFSPAIN',),
+    u'tunisia': (u'TUNIS',),
+    u'turkey': (u'ADANA', u'ANKARA', u'ISTANBUL', u'IZMIR'),
+    u'turkmenistan': (u'ASHGABAT',),
+    u'uganda': (u'KAMPALA',),
+    u'ukraine': (u'KYIV', u'KIEV'),
+    u'united_arab_emirates': (u'ABUDHABI', u'DUBAI'),
+    u'united_kingdom': (u'LONDON',),
+    u'uruguay': (u'MONTEVIDEO',),
+    u'usdel': (u'PARTO',),
+    u'usnato': (u'USNATO',),
+    u'uzbekistan': (u'TASHKENT',),
+    u'vatican': (u'VATICAN',),
+    u'venezuela': (u'CARACAS',),
+    u'vietnam': (u'HANOI', u'HOCHIMINHCITY'),
+    u'yemen': (u'SANAA',),
+    u'zambia': (u'LUSAKA',),
+    u'zimbabwe': (u'HARARE',),
+}
+
+# Region -> the countries of the region
+_REGIONS = {
+    u'central_asia': (u'afghanistan', u'kazakhstan', u'kyrgyzstan', u'tajikistan', u'turkmenistan',
+        u'uzbekistan'),
+    u'east_asia': (u'china', u'japan', u'mongolia', u'south_korea', u'taiwan'),
+    u'europe': (u'albania', u'armenia', u'austria', u'azerbaijan', u'belarus', u'belgium',
+        u'bulgaria', u'bosnia_and_herzegovina', u'croatia', u'cyprus', u'czech', u'denmark',
+        u'estonia', u'finland', u'france', u'georgia', u'germany', u'greece', u'hungary',
+        u'iceland', u'ireland', u'northern_ireland', u'italy', u'kazakhstan', u'latvia',
+        u'lithuania', u'luxembourg', u'macedonia', u'malta', u'moldova', u'montenegro',
+        u'netherlands', u'norway', u'poland', u'portugal', u'romania', u'russia', u'serbia',
+        u'slovakia', u'slovenia', u'spain', u'sweden', u'switzerland', u'turkey', u'ukraine',
+        u'united_kingdom', u'vatican'),
+    u'north_africa': (u'egypt', u'algeria', u'libya', u'morocco', u'sudan', u'tunisia'),
+    u'west_africa': (u'benin', u'burkina_faso', u'cape_verde', u'cote_divoire', u'gambia',
+        u'ghana', u'guinea', u'liberia', u'mali', u'mauritania', u'niger', u'nigeria', u'senegal',
+        u'sierra_leone', u'togo'),
+    u'west_asia': (u'armenia', u'azerbaijan', u'bahrain', u'cyprus', u'georgia', u'iraq',
+        u'israel', u'jordan', u'kuwait', u'lebanon', u'oman', u'qatar', u'saudi_arabia', u'syria',
+        u'turkey', u'united_arab_emirates', u'yemen'),
+}
+
+
+def _origin_countries():
+    origin_countries = {}
+    for country, origins in sorted(_COUNTRIES.items()):
+        for origin in origins:
+            origin_countries[origin] = origin_countries.get(origin, ()) + (country,)
+    return origin_countries
+
+# The lookup tables used by the origin predicates
+_COUNTRY_ORIGINS = dict((country, frozenset(origins)) for country, origins in _COUNTRIES.items())
+_REGION_ORIGINS = dict((region, frozenset(origin for country in countries for origin in _COUNTRY_ORIGINS[country]))
+                       for region, countries in _REGIONS.items())
+_ORIGIN_COUNTRIES = _origin_countries()
+
+# All country and region names, c.f. `origins_for_country` and `origins_for_region`
+COUNTRIES = frozenset(_COUNTRIES)
+REGIONS = frozenset(_REGIONS)
+
 
 def year_origin_filter(year_predicate=None, origin_predicate=None):
     """\
@@ -34,8 +258,11 @@ def year_origin_filter(year_predicate=None, origin_predicate=None):
         year.
     ``origin_predicate`
         A predicate which returns ``True`` or ``False`` for a given
-        cable origin
+        cable origin or a collection of origins,
+        i.e. ``origins_for_region(u'europe')``.
     """
+    if origin_predicate is not None and not callable(origin_predicate):
+        origin_predicate = frozenset(origin_predicate).__contains__
 
     def accept(cable_id, predicate):
         year, origin = _YEAR_ORIGIN_PATTERN.match(
@@ -69,11 +296,113 @@ def origin_filter(predicate):
     `predicate` holds true for the cable's origin.
 
     `predicate`
-        A predicate which checks the origin of a cable.
+        A predicate which checks the origin of a cable or a collection
+        of origins, i.e. ``origins_for_region(u'europe')``.
     """
     return year_origin_filter(origin_predicate=predicate)
 
 
+def origins_for_country(country):
+    """\
+    Returns a frozenset of the origins (stations) located in the provided
+    country.
+
+    `country`
+        The name of the country as used by the ``origin_<country>``
+        predicates, i.e. ``germany`` or ``united_kingdom``, c.f. `COUNTRIES`.
+    """
+    try:
+        return _COUNTRY_ORIGINS[country]
+    except KeyError:
+        raise ValueError('Unknown country "%s"' % country)
+
+
+def origins_for_region(region):
+    """\
+    Returns a frozenset of the origins (stations) located in the provided
+    region.
+
+    The result can be used with `origin_filter` or with an index,
+    i.e. ``facet_index.select('origin', origins_for_region(u'europe'))``.
+
+    `region`
+        The name of the region as used by the ``origin_<region>``
+        predicates, i.e. ``europe`` or ``west_asia``, c.f. `REGIONS`.
+    """
+    try:
+        return _REGION_ORIGINS[region]
+    except KeyError:
+        raise ValueError('Unknown region "%s"' % region)
+
+
+def countries_for_origin(origin):
+    """\
+    Returns a (maybe empty) tuple of the countries of the provided origin.
+
+    Usually an origin belongs to one country, but i.e. the embassy in
+    Bridgetown is accredited to Barbados and Grenada.
+
+    `origin`
+        The origin (station), i.e. ``BERLIN``.
+    """
+    return _ORIGIN_COUNTRIES.get(origin, ())
+
+
+
+class RowPredicate(object):
+    """\
+    Predicate which checks the reference identifier and the classification
+    of a cable.
+
+    A row predicate can be used wherever a predicate for cable reference
+    identifiers is accepted. CSV sources evaluate the predicate against the
+    leading columns of a row before the header and the content of the
+    cable are decoded, cables from other sources are filtered after they
+    were read.
+    """
+    def __init__(self, reference_id_predicate=None, classification_predicate=None):
+        """\
+
+        `reference_id_predicate`
+            A predicate for the cable reference identifier, i.e. the result
+            of `year_filter` or `origin_filter` (default: ``None``).
+        `classification_predicate`
+            A predicate for the classification of the cable (default: ``None``).
+        """
+        self.reference_id_predicate = reference_id_predicate
+        self.classification_predicate = classification_predicate
+
+    def __call__(self, reference_id):
+        """\
+        Returns if the reference identifier predicate holds true. The
+        classification cannot be checked by the reference identifier.
+        """
+        pred = self.reference_id_predicate
+        return pred is None or pred(reference_id)
+
+    def accept_row(self, reference_id, classification):
+        """\
+        Returns if both predicates hold true.
+        """
+        pred = self.classification_predicate
+        return self(reference_id) and (pred is None or pred(classification))
+
+
+def classification_filter(predicate, reference_id_predicate=None):
+    """\
+    Returns a `RowPredicate` where the provided `predicate` holds true
+    for the cable's classification.
+
+    `predicate`
+        A predicate which checks the classification of a cable,
+        i.e. ``lambda c: c.upper().startswith(u'SECRET')``.
+    `reference_id_predicate`
+        An optional predicate for the cable reference identifier,
+        i.e. ``origin_filter(origin_germany)``.
+    """
+    return RowPredicate(reference_id_predicate, predicate)
+
+
 def origin_europe(origin):
     """\
     Returns if the origin is located in Europe.
@@ -130,32 +459,7 @@ def origin_europe(origin):
     `origin`
         The origin to check.
     """
-    return origin_albania(origin) or origin_armenia(origin) \
-           or origin_austria(origin) or origin_azerbaijan(origin) \
-           or origin_belarus(origin) or origin_belgium(origin) \
-           or origin_bulgaria(origin) or origin_bosnia_and_herzegovina(origin) \
-           or origin_bulgaria(origin) \
-           or origin_croatia(origin) or origin_cyprus(origin) \
-           or origin_czech(origin) or origin_denmark(origin) \
-           or origin_estonia(origin) or origin_finland(origin) \
-           or origin_france(origin) or origin_georgia(origin) \
-           or origin_germany(origin) or origin_greece(origin) \
-           or origin_hungary(origin) or origin_iceland(origin) \
-           or origin_ireland(origin) \
-           or origin_northern_ireland(origin) or origin_italy(origin) \
-           or origin_kazakhstan(origin) or origin_latvia(origin) \
-           or origin_lithuania(origin) \
-           or origin_luxembourg(origin) or origin_macedonia(origin) \
-           or origin_malta(origin) or origin_moldova(origin) \
-           or origin_montenegro(origin) or origin_netherlands(origin) \
-           or origin_norway(origin) or origin_poland(origin) \
-           or origin_portugal(origin) or origin_romania(origin) \
-           or origin_russia(origin) or origin_serbia(origin) \
-           or origin_slovakia(origin) or origin_slovenia(origin) \
-           or origin_spain(origin) or origin_sweden(origin) \
-           or origin_switzerland(origin) or origin_turkey(origin) \
-           or origin_ukraine(origin) or origin_united_kingdom(origin) \
-           or origin_vatican(origin)
+    return origin in _REGION_ORIGINS[u'europe']
 
 
 def origin_north_africa(origin):
@@ -173,9 +477,7 @@ def origin_north_africa(origin):
     `origin`
         The origin to check.
     """
-    return origin_egypt(origin) or origin_algeria(origin) \
-           or origin_libya(origin) or origin_morocco(origin) \
-           or origin_sudan(origin) or origin_tunisia(origin)
+    return origin in _REGION_ORIGINS[u'north_africa']
 
 
 def origin_west_africa(origin):
@@ -202,14 +504,7 @@ def origin_west_africa(origin):
     `origin`
         The origin to check.
     """
-    return origin_benin(origin) or origin_burkina_faso(origin) \
-           or origin_cape_verde(origin) or origin_cote_divoire(origin) \
-           or origin_gambia(origin) or origin_ghana(origin) \
-           or origin_guinea(origin) or origin_liberia(origin) \
-           or origin_mali(origin) or origin_mauritania(origin) \
-           or origin_niger(origin) or origin_nigeria(origin) \
-           or origin_senegal(origin) or origin_sierra_leone(origin) \
-           or origin_togo(origin)
+    return origin in _REGION_ORIGINS[u'west_africa']
 
 
 def origin_central_asia(origin):
@@ -227,9 +522,7 @@ def origin_central_asia(origin):
     `origin`
         The origin to check.
     """
-    return origin_afghanistan(origin) or origin_kazakhstan(origin) \
-           or origin_kyrgyzstan(origin) or origin_tajikistan(origin) \
-           or origin_turkmenistan(origin) or origin_uzbekistan(origin)
+    return origin in _REGION_ORIGINS[u'central_asia']
 
 
 def origin_east_asia(origin):
@@ -246,9 +539,7 @@ def origin_east_asia(origin):
     `origin`
         The origin to check.
     """
-    return origin_china(origin) or origin_japan(origin) \
-           or origin_mongolia(origin) or origin_south_korea(origin) \
-           or origin_taiwan(origin)
+    return origin in _REGION_ORIGINS[u'east_asia']
 
 
 def origin_west_asia(origin):
@@ -277,15 +568,7 @@ def origin_west_asia(origin):
     `origin`
         The origin to check.
     """
-    return origin_armenia(origin) or origin_azerbaijan(origin) \
-           or origin_bahrain(origin) or origin_cyprus(origin) \
-           or origin_georgia(origin) or origin_georgia(origin) \
-           or origin_iraq(origin) or origin_israel(origin) \
-           or origin_jordan(origin) or origin_kuwait(origin) \
-           or origin_lebanon(origin) or origin_oman(origin) \
-           or origin_qatar(origin) or origin_saudi_arabia(origin) \
-           or origin_syria(origin) or origin_turkey(origin) \
-           or origin_united_arab_emirates(origin) or origin_yemen(origin)
+    return origin in _REGION_ORIGINS[u'west_asia']
 
 
 def origin_usdel(origin):
@@ -295,7 +578,7 @@ def origin_usdel(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PARTO'
+    return origin in _COUNTRY_ORIGINS[u'usdel']
 
 
 def origin_afghanistan(origin):
@@ -305,7 +588,7 @@ def origin_afghanistan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KABUL'
+    return origin in _COUNTRY_ORIGINS[u'afghanistan']
 
 
 def origin_albania(origin):
@@ -315,7 +598,7 @@ def origin_albania(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TIRANA'
+    return origin in _COUNTRY_ORIGINS[u'albania']
 
 
 def origin_algeria(origin):
@@ -325,7 +608,7 @@ def origin_algeria(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ALGIERS'
+    return origin in _COUNTRY_ORIGINS[u'algeria']
 
 
 def origin_angola(origin):
@@ -335,7 +618,7 @@ def origin_angola(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LUANDA'
+    return origin in _COUNTRY_ORIGINS[u'angola']
 
 
 def origin_argentinia(origin):
@@ -345,7 +628,7 @@ def origin_argentinia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BUENOSAIRES'
+    return origin in _COUNTRY_ORIGINS[u'argentinia']
 
 
 def origin_armenia(origin):
@@ -355,7 +638,7 @@ def origin_armenia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'YEREVAN'
+    return origin in _COUNTRY_ORIGINS[u'armenia']
 
 
 def origin_australia(origin):
@@ -365,7 +648,7 @@ def origin_australia(origin):
     `origin`
         The origin to check.
     """
-    return origin in u'MELBOURNE', u'SYDNEY', u'PERTH', u'CANBERRA'
+    return origin in _COUNTRY_ORIGINS[u'australia']
 
 
 def origin_austria(origin):
@@ -373,7 +656,7 @@ def origin_austria(origin):
 
     """
     # Matches U.S. Mission to Vienna and Vienna
-    return u'VIENNA' in origin
+    return origin in _COUNTRY_ORIGINS[u'austria']
 
 
 def origin_azerbaijan(origin):
@@ -383,13 +666,13 @@ def origin_azerbaijan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BAKU'
+    return origin in _COUNTRY_ORIGINS[u'azerbaijan']
 
 
 def origin_bahamas(origin):
     """\
     """
-    return origin == u'NASSAU'
+    return origin in _COUNTRY_ORIGINS[u'bahamas']
 
 
 def origin_bahrain(origin):
@@ -399,7 +682,7 @@ def origin_bahrain(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MANAMA'
+    return origin in _COUNTRY_ORIGINS[u'bahrain']
 
 
 def origin_bangladesh(origin):
@@ -409,7 +692,7 @@ def origin_bangladesh(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DHAKA'
+    return origin in _COUNTRY_ORIGINS[u'bangladesh']
 
 
 def origin_barbados(origin):
@@ -419,7 +702,7 @@ def origin_barbados(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BRIDGETOWN',
+    return origin in _COUNTRY_ORIGINS[u'barbados']
 
 
 def origin_belarus(origin):
@@ -429,7 +712,7 @@ def origin_belarus(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MINSK'
+    return origin in _COUNTRY_ORIGINS[u'belarus']
 
 
 def origin_belgium(origin):
@@ -437,7 +720,7 @@ def origin_belgium(origin):
 
     """
     # Matches U.S. Mission to EU, Brussels and Brussels
-    return u'BRUSSELS' in origin
+    return origin in _COUNTRY_ORIGINS[u'belgium']
 
 
 def origin_belize(origin):
@@ -447,7 +730,7 @@ def origin_belize(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BELMOPAN'
+    return origin in _COUNTRY_ORIGINS[u'belize']
 
 
 def origin_benin(origin):
@@ -457,7 +740,7 @@ def origin_benin(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'COTONOU'
+    return origin in _COUNTRY_ORIGINS[u'benin']
 
 
 def origin_bermuda(origin):
@@ -467,7 +750,7 @@ def origin_bermuda(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'HAMILTON'
+    return origin in _COUNTRY_ORIGINS[u'bermuda']
 
 
 def origin_bolivia(origin):
@@ -477,7 +760,7 @@ def origin_bolivia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LAPAZ'
+    return origin in _COUNTRY_ORIGINS[u'bolivia']
 
 
 def origin_bosnia_and_herzegovina(origin):
@@ -487,7 +770,7 @@ def origin_bosnia_and_herzegovina(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SARAJEVO'
+    return origin in _COUNTRY_ORIGINS[u'bosnia_and_herzegovina']
 
 
 def origin_botswana(origin):
@@ -497,7 +780,7 @@ def origin_botswana(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'GABORONE'
+    return origin in _COUNTRY_ORIGINS[u'botswana']
 
 
 def origin_brazil(origin):
@@ -507,7 +790,7 @@ def origin_brazil(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'BRASILIA', u'SAOPAULO', u'RIODEJANEIRO', u'RECIFE')
+    return origin in _COUNTRY_ORIGINS[u'brazil']
 
 
 def origin_brunei(origin):
@@ -517,7 +800,7 @@ def origin_brunei(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BANDARSERIBEGAWAN'
+    return origin in _COUNTRY_ORIGINS[u'brunei']
 
 
 def origin_bulgaria(origin):
@@ -527,7 +810,7 @@ def origin_bulgaria(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SOFIA'
+    return origin in _COUNTRY_ORIGINS[u'bulgaria']
 
 
 def origin_burkina_faso(origin):
@@ -537,7 +820,7 @@ def origin_burkina_faso(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'OUAGADOUGOU'
+    return origin in _COUNTRY_ORIGINS[u'burkina_faso']
 
 
 def origin_burma(origin):
@@ -547,7 +830,7 @@ def origin_burma(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'RANGOON'
+    return origin in _COUNTRY_ORIGINS[u'burma']
 
 
 def origin_burundi(origin):
@@ -557,7 +840,7 @@ def origin_burundi(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BUJUMBURA'
+    return origin in _COUNTRY_ORIGINS[u'burundi']
 
 
 def origin_cambodia(origin):
@@ -567,7 +850,7 @@ def origin_cambodia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PHNOMPENH'
+    return origin in _COUNTRY_ORIGINS[u'cambodia']
 
 
 def origin_cameroon(origin):
@@ -577,7 +860,7 @@ def origin_cameroon(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'YAOUNDE'
+    return origin in _COUNTRY_ORIGINS[u'cameroon']
 
 
 def origin_canada(origin):
@@ -587,9 +870,7 @@ def origin_canada(origin):
     `origin`
         The origin to check.
     """
-    return origin in (
-    u'CALGARY', u'HALIFAX', u'MONTREAL', u'QUEBEC', u'OTTAWA', u'TORONTO',
-    u'VANCOUVER')
+    return origin in _COUNTRY_ORIGINS[u'canada']
 
 
 def origin_cape_verde(origin):
@@ -599,7 +880,7 @@ def origin_cape_verde(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PRAIA'
+    return origin in _COUNTRY_ORIGINS[u'cape_verde']
 
 
 def origin_central_african_republic(origin):
@@ -609,7 +890,7 @@ def origin_central_african_republic(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BANGUI'
+    return origin in _COUNTRY_ORIGINS[u'central_african_republic']
 
 
 def origin_chad(origin):
@@ -619,7 +900,7 @@ def origin_chad(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'NDJAMENA'
+    return origin in _COUNTRY_ORIGINS[u'chad']
 
 
 def origin_chile(origin):
@@ -629,7 +910,7 @@ def origin_chile(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SANTIAGO'
+    return origin in _COUNTRY_ORIGINS[u'chile']
 
 
 def origin_china(origin):
@@ -639,8 +920,7 @@ def origin_china(origin):
     `origin`
         The origin to check.
     """
-    return origin in (
-    u'BEIJING', u'CHENGDU', u'GUANGZHOU', u'HONGKONG', u'SHANGHAI', u'SHENYANG')
+    return origin in _COUNTRY_ORIGINS[u'china']
 
 
 def origin_colombia(origin):
@@ -650,7 +930,7 @@ def origin_colombia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BOGOTA'
+    return origin in _COUNTRY_ORIGINS[u'colombia']
 
 
 def origin_costa_rica(origin):
@@ -660,7 +940,7 @@ def origin_costa_rica(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SANJOSE'
+    return origin in _COUNTRY_ORIGINS[u'costa_rica']
 
 
 def origin_cote_divoire(origin):
@@ -670,7 +950,7 @@ def origin_cote_divoire(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ABIDJAN'
+    return origin in _COUNTRY_ORIGINS[u'cote_divoire']
 
 
 def origin_croatia(origin):
@@ -680,7 +960,7 @@ def origin_croatia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ZAGREB'
+    return origin in _COUNTRY_ORIGINS[u'croatia']
 
 
 def origin_cuba(origin):
@@ -690,7 +970,7 @@ def origin_cuba(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'HAVANA'
+    return origin in _COUNTRY_ORIGINS[u'cuba']
 
 
 def origin_curacao(origin):
@@ -700,7 +980,7 @@ def origin_curacao(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'CURACA'
+    return origin in _COUNTRY_ORIGINS[u'curacao']
 
 
 def origin_cyprus(origin):
@@ -710,7 +990,7 @@ def origin_cyprus(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'NICOSIA'
+    return origin in _COUNTRY_ORIGINS[u'cyprus']
 
 
 def origin_czech(origin):
@@ -720,7 +1000,7 @@ def origin_czech(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PRAGUE'
+    return origin in _COUNTRY_ORIGINS[u'czech']
 
 
 def origin_democratic_republic_congo(origin):
@@ -730,7 +1010,7 @@ def origin_democratic_republic_congo(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KINSHASA'
+    return origin in _COUNTRY_ORIGINS[u'democratic_republic_congo']
 
 
 def origin_denmark(origin):
@@ -740,7 +1020,7 @@ def origin_denmark(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'COPENHAGEN'
+    return origin in _COUNTRY_ORIGINS[u'denmark']
 
 
 def origin_djibouti(origin):
@@ -750,7 +1030,7 @@ def origin_djibouti(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DJIBOUTI'
+    return origin in _COUNTRY_ORIGINS[u'djibouti']
 
 
 def origin_dominican_republic(origin):
@@ -760,7 +1040,7 @@ def origin_dominican_republic(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SANTODOMINGO'
+    return origin in _COUNTRY_ORIGINS[u'dominican_republic']
 
 
 def origin_east_timor(origin):
@@ -770,7 +1050,7 @@ def origin_east_timor(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DILI'
+    return origin in _COUNTRY_ORIGINS[u'east_timor']
 
 
 def origin_ecuador(origin):
@@ -780,7 +1060,7 @@ def origin_ecuador(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'QUITO'
+    return origin in _COUNTRY_ORIGINS[u'ecuador']
 
 
 def origin_egypt(origin):
@@ -790,7 +1070,7 @@ def origin_egypt(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'CAIRO', u'ALEXANDRIA')
+    return origin in _COUNTRY_ORIGINS[u'egypt']
 
 
 def origin_el_salvador(origin):
@@ -800,7 +1080,7 @@ def origin_el_salvador(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SANSALVADOR'
+    return origin in _COUNTRY_ORIGINS[u'el_salvador']
 
 
 def origin_equatorial_guinea(origin):
@@ -810,7 +1090,7 @@ def origin_equatorial_guinea(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MALABO'
+    return origin in _COUNTRY_ORIGINS[u'equatorial_guinea']
 
 
 def origin_eritrea(origin):
@@ -820,7 +1100,7 @@ def origin_eritrea(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ASMARA'
+    return origin in _COUNTRY_ORIGINS[u'eritrea']
 
 
 def origin_estonia(origin):
@@ -830,7 +1110,7 @@ def origin_estonia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TALLINN'
+    return origin in _COUNTRY_ORIGINS[u'estonia']
 
 
 def origin_ethiopia(origin):
@@ -840,7 +1120,7 @@ def origin_ethiopia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ADDISABABA'
+    return origin in _COUNTRY_ORIGINS[u'ethiopia']
 
 
 def origin_micronesia(origin):
@@ -850,7 +1130,7 @@ def origin_micronesia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KOLONIA'
+    return origin in _COUNTRY_ORIGINS[u'micronesia']
 
 
 def origin_fiji(origin):
@@ -860,7 +1140,7 @@ def origin_fiji(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SUVA'
+    return origin in _COUNTRY_ORIGINS[u'fiji']
 
 
 def origin_finland(origin):
@@ -870,7 +1150,7 @@ def origin_finland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'HELSINKI'
+    return origin in _COUNTRY_ORIGINS[u'finland']
 
 
 def origin_france(origin):
@@ -880,7 +1160,7 @@ def origin_france(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'MARSEILLE', u'PARIS', u'STRASBOURG')
+    return origin in _COUNTRY_ORIGINS[u'france']
 
 
 def origin_gabon(origin):
@@ -890,7 +1170,7 @@ def origin_gabon(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LIBREVILLE'
+    return origin in _COUNTRY_ORIGINS[u'gabon']
 
 
 def origin_gambia(origin):
@@ -900,7 +1180,7 @@ def origin_gambia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BANJUL'
+    return origin in _COUNTRY_ORIGINS[u'gambia']
 
 
 def origin_georgia(origin):
@@ -910,7 +1190,7 @@ def origin_georgia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TBILISI'
+    return origin in _COUNTRY_ORIGINS[u'georgia']
 
 
 def origin_germany(origin):
@@ -920,8 +1200,7 @@ def origin_germany(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'BONN', u'BERLIN', u'DUSSELDORF', u'FRANKFURT',
-                      u'HAMBURG', u'LEIPZIG', u'MUNICH')
+    return origin in _COUNTRY_ORIGINS[u'germany']
 
 
 def origin_ghana(origin):
@@ -931,7 +1210,7 @@ def origin_ghana(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ACCRA'
+    return origin in _COUNTRY_ORIGINS[u'ghana']
 
 
 def origin_greece(origin):
@@ -941,7 +1220,7 @@ def origin_greece(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'ATHENS', u'THESSALONIKI')
+    return origin in _COUNTRY_ORIGINS[u'greece']
 
 
 def origin_grenada(origin):
@@ -951,7 +1230,7 @@ def origin_grenada(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BRIDGETOWN'
+    return origin in _COUNTRY_ORIGINS[u'grenada']
 
 
 def origin_guatemala(origin):
@@ -961,7 +1240,7 @@ def origin_guatemala(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'GUATEMALA'
+    return origin in _COUNTRY_ORIGINS[u'guatemala']
 
 
 def origin_guinea(origin):
@@ -971,7 +1250,7 @@ def origin_guinea(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'CONAKRY'
+    return origin in _COUNTRY_ORIGINS[u'guinea']
 
 
 def origin_guyana(origin):
@@ -981,7 +1260,7 @@ def origin_guyana(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'GEORGETOWN'
+    return origin in _COUNTRY_ORIGINS[u'guyana']
 
 
 def origin_haiti(origin):
@@ -991,7 +1270,7 @@ def origin_haiti(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PORTAUPRINCE'
+    return origin in _COUNTRY_ORIGINS[u'haiti']
 
 
 def origin_honduras(origin):
@@ -1001,7 +1280,7 @@ def origin_honduras(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TEGUCIGALPA'
+    return origin in _COUNTRY_ORIGINS[u'honduras']
 
 
 def origin_hungary(origin):
@@ -1011,7 +1290,7 @@ def origin_hungary(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BUDAPEST'
+    return origin in _COUNTRY_ORIGINS[u'hungary']
 
 
 def origin_iceland(origin):
@@ -1021,7 +1300,7 @@ def origin_iceland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'REYKJAVIK'
+    return origin in _COUNTRY_ORIGINS[u'iceland']
 
 
 def origin_india(origin):
@@ -1031,7 +1310,7 @@ def origin_india(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'CHENNAI', u'KOLKATA', u'MUMBAI', u'NEWDELHI')
+    return origin in _COUNTRY_ORIGINS[u'india']
 
 
 def origin_indonesia(origin):
@@ -1041,7 +1320,7 @@ def origin_indonesia(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'JAKARTA', u'SURABAYA')
+    return origin in _COUNTRY_ORIGINS[u'indonesia']
 
 
 def origin_iran(origin):
@@ -1051,7 +1330,7 @@ def origin_iran(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'TEHRAN', u'RPODUBAI')
+    return origin in _COUNTRY_ORIGINS[u'iran']
 
 
 def origin_iraq(origin):
@@ -1061,11 +1340,7 @@ def origin_iraq(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BAGHDAD' \
-           or u'BASRAH' in origin \
-           or u'HILLAH' in origin \
-           or u'KIRKUK' in origin \
-           or u'MOSUL' in origin
+    return origin in _COUNTRY_ORIGINS[u'iraq']
 
 
 def origin_ireland(origin):
@@ -1075,7 +1350,7 @@ def origin_ireland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DUBLIN'
+    return origin in _COUNTRY_ORIGINS[u'ireland']
 
 
 def origin_israel(origin):
@@ -1085,7 +1360,7 @@ def origin_israel(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'JERUSALEM', u'TELAVIV')
+    return origin in _COUNTRY_ORIGINS[u'israel']
 
 
 def origin_italy(origin):
@@ -1095,7 +1370,7 @@ def origin_italy(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'FLORENCE', u'MILAN', u'NAPLES') or u'ROME' in origin
+    return origin in _COUNTRY_ORIGINS[u'italy']
 
 
 def origin_jamaica(origin):
@@ -1105,7 +1380,7 @@ def origin_jamaica(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KINGSTON'
+    return origin in _COUNTRY_ORIGINS[u'jamaica']
 
 
 def origin_japan(origin):
@@ -1115,8 +1390,7 @@ def origin_japan(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'FUKUOKA', u'NAGOYA', u'NAHA', u'OSAKAKOBE',
-                      u'SAPPORO', u'TOKYO')
+    return origin in _COUNTRY_ORIGINS[u'japan']
 
 
 def origin_jordan(origin):
@@ -1126,7 +1400,7 @@ def origin_jordan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'AMMAN'
+    return origin in _COUNTRY_ORIGINS[u'jordan']
 
 
 def origin_kazakhstan(origin):
@@ -1136,7 +1410,7 @@ def origin_kazakhstan(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'ASTANA', u'ALMATY')
+    return origin in _COUNTRY_ORIGINS[u'kazakhstan']
 
 
 def origin_kenya(origin):
@@ -1146,7 +1420,7 @@ def origin_kenya(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'NAIROBI'
+    return origin in _COUNTRY_ORIGINS[u'kenya']
 
 
 def origin_kosovo(origin):
@@ -1156,7 +1430,7 @@ def origin_kosovo(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PRISTINA'
+    return origin in _COUNTRY_ORIGINS[u'kosovo']
 
 
 def origin_kuwait(origin):
@@ -1166,7 +1440,7 @@ def origin_kuwait(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KUWAIT'
+    return origin in _COUNTRY_ORIGINS[u'kuwait']
 
 
 def origin_kyrgyzstan(origin):
@@ -1176,7 +1450,7 @@ def origin_kyrgyzstan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BISHKEK'
+    return origin in _COUNTRY_ORIGINS[u'kyrgyzstan']
 
 
 def origin_laos(origin):
@@ -1186,7 +1460,7 @@ def origin_laos(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'VIENTIANE'
+    return origin in _COUNTRY_ORIGINS[u'laos']
 
 
 def origin_latvia(origin):
@@ -1196,7 +1470,7 @@ def origin_latvia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'RIGA'
+    return origin in _COUNTRY_ORIGINS[u'latvia']
 
 
 def origin_lebanon(origin):
@@ -1206,7 +1480,7 @@ def origin_lebanon(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BEIRUT'
+    return origin in _COUNTRY_ORIGINS[u'lebanon']
 
 
 def origin_lesotho(origin):
@@ -1216,7 +1490,7 @@ def origin_lesotho(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MASERU'
+    return origin in _COUNTRY_ORIGINS[u'lesotho']
 
 
 def origin_liberia(origin):
@@ -1226,7 +1500,7 @@ def origin_liberia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MONROVIA'
+    return origin in _COUNTRY_ORIGINS[u'liberia']
 
 
 def origin_libya(origin):
@@ -1236,7 +1510,7 @@ def origin_libya(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TRIPOLI'
+    return origin in _COUNTRY_ORIGINS[u'libya']
 
 
 def origin_lithuania(origin):
@@ -1246,7 +1520,7 @@ def origin_lithuania(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'VILNIUS'
+    return origin in _COUNTRY_ORIGINS[u'lithuania']
 
 
 def origin_luxembourg(origin):
@@ -1256,7 +1530,7 @@ def origin_luxembourg(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LUXEMBOURG'
+    return origin in _COUNTRY_ORIGINS[u'luxembourg']
 
 
 def origin_macedonia(origin):
@@ -1266,7 +1540,7 @@ def origin_macedonia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SKOPJE'
+    return origin in _COUNTRY_ORIGINS[u'macedonia']
 
 
 def origin_madagascar(origin):
@@ -1276,7 +1550,7 @@ def origin_madagascar(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ANTANANARIVO'
+    return origin in _COUNTRY_ORIGINS[u'madagascar']
 
 
 def origin_majuro(origin):
@@ -1286,7 +1560,7 @@ def origin_majuro(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MAJURO'
+    return origin in _COUNTRY_ORIGINS[u'majuro']
 
 
 def origin_malawi(origin):
@@ -1296,7 +1570,7 @@ def origin_malawi(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LILONGWE'
+    return origin in _COUNTRY_ORIGINS[u'malawi']
 
 
 def origin_malaysia(origin):
@@ -1306,7 +1580,7 @@ def origin_malaysia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KUALALUMPUR'
+    return origin in _COUNTRY_ORIGINS[u'malaysia']
 
 
 def origin_mali(origin):
@@ -1316,7 +1590,7 @@ def origin_mali(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BAMAKO'
+    return origin in _COUNTRY_ORIGINS[u'mali']
 
 
 def origin_malta(origin):
@@ -1326,7 +1600,7 @@ def origin_malta(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'VALLETTA'
+    return origin in _COUNTRY_ORIGINS[u'malta']
 
 
 def origin_mauritania(origin):
@@ -1336,7 +1610,7 @@ def origin_mauritania(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'NOUAKCHOTT'
+    return origin in _COUNTRY_ORIGINS[u'mauritania']
 
 
 def origin_mauritius(origin):
@@ -1346,7 +1620,7 @@ def origin_mauritius(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PORTLOUIS'
+    return origin in _COUNTRY_ORIGINS[u'mauritius']
 
 
 def origin_mexico(origin):
@@ -1356,10 +1630,7 @@ def origin_mexico(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'CIUDADJUAREZ', u'GUADALAJARA', u'HERMOSILLO',
-                      u'MATAMOROS', u'MERIDA', u'MEXICO', u'MONTERREY',
-                      u'NOGALES',
-                      u'NUEVOLAREDO', u'TIJUANA')
+    return origin in _COUNTRY_ORIGINS[u'mexico']
 
 
 def origin_moldova(origin):
@@ -1369,7 +1640,7 @@ def origin_moldova(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'CHISINAU'
+    return origin in _COUNTRY_ORIGINS[u'moldova']
 
 
 def origin_mongolia(origin):
@@ -1379,7 +1650,7 @@ def origin_mongolia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ULAANBAATAR'
+    return origin in _COUNTRY_ORIGINS[u'mongolia']
 
 
 def origin_montenegro(origin):
@@ -1389,7 +1660,7 @@ def origin_montenegro(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PODGORICA'
+    return origin in _COUNTRY_ORIGINS[u'montenegro']
 
 
 def origin_morocco(origin):
@@ -1399,7 +1670,7 @@ def origin_morocco(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'CASABLANCA', u'RABAT')
+    return origin in _COUNTRY_ORIGINS[u'morocco']
 
 
 def origin_mozambique(origin):
@@ -1409,7 +1680,7 @@ def origin_mozambique(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MAPUTO'
+    return origin in _COUNTRY_ORIGINS[u'mozambique']
 
 
 def origin_namibia(origin):
@@ -1419,7 +1690,7 @@ def origin_namibia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'WINDHOEK'
+    return origin in _COUNTRY_ORIGINS[u'namibia']
 
 
 def origin_nepal(origin):
@@ -1429,7 +1700,7 @@ def origin_nepal(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KATHMANDU'
+    return origin in _COUNTRY_ORIGINS[u'nepal']
 
 
 def origin_netherlands(origin):
@@ -1439,7 +1710,7 @@ def origin_netherlands(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'AMSTERDAM', u'THEHAGUE')
+    return origin in _COUNTRY_ORIGINS[u'netherlands']
 
 
 def origin_new_zealand(origin):
@@ -1449,7 +1720,7 @@ def origin_new_zealand(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'AUCKLAND', u'WELLINGTON')
+    return origin in _COUNTRY_ORIGINS[u'new_zealand']
 
 
 def origin_nicaragua(origin):
@@ -1459,7 +1730,7 @@ def origin_nicaragua(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MANAGUA'
+    return origin in _COUNTRY_ORIGINS[u'nicaragua']
 
 
 def origin_niger(origin):
@@ -1469,7 +1740,7 @@ def origin_niger(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'NIAMEY'
+    return origin in _COUNTRY_ORIGINS[u'niger']
 
 
 def origin_nigeria(origin):
@@ -1479,7 +1750,7 @@ def origin_nigeria(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'ABUJA', u'KADUNA', u'LAGOS')
+    return origin in _COUNTRY_ORIGINS[u'nigeria']
 
 
 def origin_usnato(origin):
@@ -1489,7 +1760,7 @@ def origin_usnato(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'USNATO'
+    return origin in _COUNTRY_ORIGINS[u'usnato']
 
 
 def origin_northern_ireland(origin):
@@ -1499,7 +1770,7 @@ def origin_northern_ireland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BELFAST'
+    return origin in _COUNTRY_ORIGINS[u'northern_ireland']
 
 
 def origin_norway(origin):
@@ -1509,7 +1780,7 @@ def origin_norway(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'OSLO'
+    return origin in _COUNTRY_ORIGINS[u'norway']
 
 
 def origin_oman(origin):
@@ -1519,7 +1790,7 @@ def origin_oman(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MUSCAT'
+    return origin in _COUNTRY_ORIGINS[u'oman']
 
 
 def origin_pakistan(origin):
@@ -1529,7 +1800,7 @@ def origin_pakistan(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'KARACHI', u'LAHORE', u'PESHAWAR', u'ISLAMABAD')
+    return origin in _COUNTRY_ORIGINS[u'pakistan']
 
 
 def origin_palau(origin):
@@ -1539,7 +1810,7 @@ def origin_palau(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KOROR'
+    return origin in _COUNTRY_ORIGINS[u'palau']
 
 
 def origin_panama(origin):
@@ -1549,7 +1820,7 @@ def origin_panama(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PANAMA'
+    return origin in _COUNTRY_ORIGINS[u'panama']
 
 
 def origin_papua_new_guinea(origin):
@@ -1559,7 +1830,7 @@ def origin_papua_new_guinea(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PORTMORESBY'
+    return origin in _COUNTRY_ORIGINS[u'papua_new_guinea']
 
 
 def origin_paraguay(origin):
@@ -1569,7 +1840,7 @@ def origin_paraguay(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ASUNCION'
+    return origin in _COUNTRY_ORIGINS[u'paraguay']
 
 
 def origin_peru(origin):
@@ -1579,7 +1850,7 @@ def origin_peru(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LIMA'
+    return origin in _COUNTRY_ORIGINS[u'peru']
 
 
 def origin_philippines(origin):
@@ -1589,7 +1860,7 @@ def origin_philippines(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MANILA'
+    return origin in _COUNTRY_ORIGINS[u'philippines']
 
 
 def origin_poland(origin):
@@ -1599,7 +1870,7 @@ def origin_poland(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'KRAKOW', u'WARSAW')
+    return origin in _COUNTRY_ORIGINS[u'poland']
 
 
 def origin_portugal(origin):
@@ -1609,7 +1880,7 @@ def origin_portugal(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'LISBON', u'PONTADELGADA')
+    return origin in _COUNTRY_ORIGINS[u'portugal']
 
 
 def origin_qatar(origin):
@@ -1619,7 +1890,7 @@ def origin_qatar(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'QATAR'
+    return origin in _COUNTRY_ORIGINS[u'qatar']
 
 
 def origin_republic_congo(origin):
@@ -1629,7 +1900,7 @@ def origin_republic_congo(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BRAZZAVILLE'
+    return origin in _COUNTRY_ORIGINS[u'republic_congo']
 
 
 def origin_romania(origin):
@@ -1639,7 +1910,7 @@ def origin_romania(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BUCHAREST'
+    return origin in _COUNTRY_ORIGINS[u'romania']
 
 
 def origin_russia(origin):
@@ -1649,8 +1920,7 @@ def origin_russia(origin):
     `origin`
         The origin to check.
     """
-    return origin in (
-    u'MOSCOW', u'STPETERSBURG', u'VLADIVOSTOK', u'YEKATERINBURG')
+    return origin in _COUNTRY_ORIGINS[u'russia']
 
 
 def origin_rwanda(origin):
@@ -1660,7 +1930,7 @@ def origin_rwanda(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KIGALI'
+    return origin in _COUNTRY_ORIGINS[u'rwanda']
 
 
 def origin_samoa(origin):
@@ -1670,7 +1940,7 @@ def origin_samoa(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'APIA'
+    return origin in _COUNTRY_ORIGINS[u'samoa']
 
 
 def origin_saudi_arabia(origin):
@@ -1680,7 +1950,7 @@ def origin_saudi_arabia(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'DHAHRAN', u'JEDDAH', u'RIYADH')
+    return origin in _COUNTRY_ORIGINS[u'saudi_arabia']
 
 
 def origin_senegal(origin):
@@ -1690,7 +1960,7 @@ def origin_senegal(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DAKAR'
+    return origin in _COUNTRY_ORIGINS[u'senegal']
 
 
 def origin_serbia(origin):
@@ -1700,7 +1970,7 @@ def origin_serbia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BELGRADE'
+    return origin in _COUNTRY_ORIGINS[u'serbia']
 
 
 def origin_sierra_leone(origin):
@@ -1710,7 +1980,7 @@ def origin_sierra_leone(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'FREETOWN'
+    return origin in _COUNTRY_ORIGINS[u'sierra_leone']
 
 
 def origin_singapore(origin):
@@ -1720,7 +1990,7 @@ def origin_singapore(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SINGAPORE'
+    return origin in _COUNTRY_ORIGINS[u'singapore']
 
 
 def origin_slovakia(origin):
@@ -1730,7 +2000,7 @@ def origin_slovakia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BRATISLAVA'
+    return origin in _COUNTRY_ORIGINS[u'slovakia']
 
 
 def origin_slovenia(origin):
@@ -1740,7 +2010,7 @@ def origin_slovenia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LJUBLJANA'
+    return origin in _COUNTRY_ORIGINS[u'slovenia']
 
 
 def origin_somalia(origin):
@@ -1750,7 +2020,7 @@ def origin_somalia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MOGADISHU'
+    return origin in _COUNTRY_ORIGINS[u'somalia']
 
 
 def origin_south_africa(origin):
@@ -1760,7 +2030,7 @@ def origin_south_africa(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'CAPETOWN', u'DURBAN', u'JOHANNESBURG', u'PRETORIA')
+    return origin in _COUNTRY_ORIGINS[u'south_africa']
 
 
 def origin_south_korea(origin):
@@ -1770,7 +2040,7 @@ def origin_south_korea(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SEOUL'
+    return origin in _COUNTRY_ORIGINS[u'south_korea']
 
 
 def origin_spain(origin):
@@ -1780,7 +2050,7 @@ def origin_spain(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'MADRID', u'BARCELONA')
+    return origin in _COUNTRY_ORIGINS[u'spain']
 
 
 def origin_sri_lanka(origin):
@@ -1790,7 +2060,7 @@ def origin_sri_lanka(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'COLOMBO'
+    return origin in _COUNTRY_ORIGINS[u'sri_lanka']
 
 
 def origin_sudan(origin):
@@ -1800,7 +2070,7 @@ def origin_sudan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KHARTOUM'
+    return origin in _COUNTRY_ORIGINS[u'sudan']
 
 
 def origin_suriname(origin):
@@ -1810,7 +2080,7 @@ def origin_suriname(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PARAMARIBO'
+    return origin in _COUNTRY_ORIGINS[u'suriname']
 
 
 def origin_swaziland(origin):
@@ -1820,7 +2090,7 @@ def origin_swaziland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MBABANE'
+    return origin in _COUNTRY_ORIGINS[u'swaziland']
 
 
 def origin_sweden(origin):
@@ -1830,7 +2100,7 @@ def origin_sweden(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'STOCKHOLM'
+    return origin in _COUNTRY_ORIGINS[u'sweden']
 
 
 def origin_switzerland(origin):
@@ -1840,7 +2110,7 @@ def origin_switzerland(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'BERN'
+    return origin in _COUNTRY_ORIGINS[u'switzerland']
 
 
 def origin_syria(origin):
@@ -1850,7 +2120,7 @@ def origin_syria(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DAMASCUS'
+    return origin in _COUNTRY_ORIGINS[u'syria']
 
 
 def origin_taiwan(origin):
@@ -1860,7 +2130,7 @@ def origin_taiwan(origin):
     `origin`
         The origin to check.
     """
-    return u'TAIPEI' in origin
+    return origin in _COUNTRY_ORIGINS[u'taiwan']
 
 
 def origin_tajikistan(origin):
@@ -1870,7 +2140,7 @@ def origin_tajikistan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DUSHANBE'
+    return origin in _COUNTRY_ORIGINS[u'tajikistan']
 
 
 def origin_tanzania(origin):
@@ -1880,7 +2150,7 @@ def origin_tanzania(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'DARESSALAAM'
+    return origin in _COUNTRY_ORIGINS[u'tanzania']
 
 
 def origin_thailand(origin):
@@ -1890,7 +2160,7 @@ def origin_thailand(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'BANGKOK', u'CHIANGMAI')
+    return origin in _COUNTRY_ORIGINS[u'thailand']
 
 
 def origin_togo(origin):
@@ -1900,7 +2170,7 @@ def origin_togo(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LOME'
+    return origin in _COUNTRY_ORIGINS[u'togo']
 
 
 def origin_trinidad_and_tobago(origin):
@@ -1910,7 +2180,7 @@ def origin_trinidad_and_tobago(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'PORTOFSPAIN'
+    return origin in _COUNTRY_ORIGINS[u'trinidad_and_tobago']
 
 
 def origin_tunisia(origin):
@@ -1920,7 +2190,7 @@ def origin_tunisia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TUNIS'
+    return origin in _COUNTRY_ORIGINS[u'tunisia']
 
 
 def origin_turkey(origin):
@@ -1930,7 +2200,7 @@ def origin_turkey(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'ADANA', u'ANKARA', u'ISTANBUL', u'IZMIR')
+    return origin in _COUNTRY_ORIGINS[u'turkey']
 
 
 def origin_turkmenistan(origin):
@@ -1940,7 +2210,7 @@ def origin_turkmenistan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'ASHGABAT'
+    return origin in _COUNTRY_ORIGINS[u'turkmenistan']
 
 
 def origin_uganda(origin):
@@ -1950,7 +2220,7 @@ def origin_uganda(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'KAMPALA'
+    return origin in _COUNTRY_ORIGINS[u'uganda']
 
 
 def origin_ukraine(origin):
@@ -1960,7 +2230,7 @@ def origin_ukraine(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'KYIV', u'KIEV')
+    return origin in _COUNTRY_ORIGINS[u'ukraine']
 
 
 def origin_united_arab_emirates(origin):
@@ -1970,7 +2240,7 @@ def origin_united_arab_emirates(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'ABUDHABI', u'DUBAI')
+    return origin in _COUNTRY_ORIGINS[u'united_arab_emirates']
 
 
 def origin_united_kingdom(origin):
@@ -1980,7 +2250,7 @@ def origin_united_kingdom(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LONDON'
+    return origin in _COUNTRY_ORIGINS[u'united_kingdom']
 
 
 def origin_uruguay(origin):
@@ -1990,7 +2260,7 @@ def origin_uruguay(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'MONTEVIDEO'
+    return origin in _COUNTRY_ORIGINS[u'uruguay']
 
 
 def origin_uzbekistan(origin):
@@ -2000,7 +2270,7 @@ def origin_uzbekistan(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'TASHKENT'
+    return origin in _COUNTRY_ORIGINS[u'uzbekistan']
 
 
 def origin_vatican(origin):
@@ -2010,7 +2280,7 @@ def origin_vatican(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'VATICAN'
+    return origin in _COUNTRY_ORIGINS[u'vatican']
 
 
 def origin_venezuela(origin):
@@ -2020,7 +2290,7 @@ def origin_venezuela(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'CARACAS'
+    return origin in _COUNTRY_ORIGINS[u'venezuela']
 
 
 def origin_vietnam(origin):
@@ -2030,7 +2300,7 @@ def origin_vietnam(origin):
     `origin`
         The origin to check.
     """
-    return origin in (u'HANOI', u'HOCHIMINHCITY')
+    return origin in _COUNTRY_ORIGINS[u'vietnam']
 
 
 def origin_yemen(origin):
@@ -2040,7 +2310,7 @@ def origin_yemen(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'SANAA'
+    return origin in _COUNTRY_ORIGINS[u'yemen']
 
 
 def origin_zambia(origin):
@@ -2050,7 +2320,7 @@ def origin_zambia(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'LUSAKA'
+    return origin in _COUNTRY_ORIGINS[u'zambia']
 
 
 def origin_zimbabwe(origin):
@@ -2060,7 +2330,7 @@ def origin_zimbabwe(origin):
     `origin`
         The origin to check.
     """
-    return origin == u'HARARE'
+    return origin in _COUNTRY_ORIGINS[u'zimbabwe']
 
 
 if __name__ == '__main__':
@@ -130,7 +130,7 @@ _C14N_FIXES = {
     u'AITTAIPEI': u'TAIPEI',
               
 }
-_C14N_PATTERN = re.compile(r'[0-9]{2}(%s)[0-9]+' % '|'.join(_C14N_FIXES.keys()))
+_C14N_PATTERN = re.compile(r'[0-9]{2}(%s)[0-9]+' % consts._trie_pattern(_C14N_FIXES))
 
 def canonicalize_id(reference_id):
     """\
@@ -183,7 +183,7 @@ def get_content_as_text(file_content, reference_id):
     `reference_id`
         The reference identifier of the cable.
     """
-    return _clean_html(_CONTENT_PATTERN.findall(file_content)[-1])
+    return _content_from_sections(_CONTENT_PATTERN.findall(file_content))
 
 
 def get_header_as_text(file_content, reference_id):
@@ -193,7 +193,20 @@ def get_header_as_text(file_content, reference_id):
     `file_content`
         The HTML file content, c.f. `get_file_content`.
     """
-    res = _CONTENT_PATTERN.findall(file_content)
+    return _header_from_sections(_CONTENT_PATTERN.findall(file_content))
+
+
+def _content_from_sections(res):
+    """\
+    Returns the cable content from the ``<code><pre>`` sections of a cable.
+    """
+    return _clean_html(res[-1])
+
+
+def _header_from_sections(res):
+    """\
+    Returns the cable's header from the ``<code><pre>`` sections of a cable.
+    """
     if len(res) == 2:
         content = res[0]
     elif len(res) == 1:
@@ -203,8 +216,54 @@ def get_header_as_text(file_content, reference_id):
     return _clean_html(content)
 
 
+_SECTION_START = b'<code><pre>'
+_SECTION_END = b'</pre></code>'
+
+def _section_offsets(buf):
+    """\
+    Returns a list of ``(start, end)`` offsets of the ``<code><pre>`` sections
+    within the provided bytes (or memory map) of an UTF-8 encoded HTML page.
+
+    The offsets are the same as the group spans of `_CONTENT_PATTERN`.
+    """
+    offsets = []
+    find = buf.find
+    start = find(_SECTION_START)
+    while start >= 0:
+        start += len(_SECTION_START)
+        # The pattern requires at least one character
+        end = find(_SECTION_END, start + 1)
+        if end < 0:
+            break
+        offsets.append((start, end))
+        start = find(_SECTION_START, end + len(_SECTION_END))
+    return offsets
+
+
+_TABLE_START = b"<table class='cable'>"
+_TABLE_END = b'</table>'
+
+def _meta_offsets(buf):
+    """\
+    Returns the ``(start, end)`` offsets of the metadata table (including
+    the closing ``</table>``) within the provided bytes (or memory map) of an
+    UTF-8 encoded HTML page or ``None`` if the table was not found.
+
+    The table is found in the same way as by `parse_meta`.
+    """
+    end = buf.rfind(_TABLE_END)
+    if end < 0:
+        return None
+    start = buf.rfind(_TABLE_START, 0, end)
+    if start < 0:
+        return None
+    return start, end + len(_TABLE_END)
+
+
 _LINK_PATTERN = re.compile(r'<a[^>]*>', re.UNICODE)
 _HTML_TAG_PATTERN = re.compile(r'</?[a-zA-Z]+>')
+# Removes links and tags in one pass, c.f. `_clean_html`
+_MARKUP_PATTERN = re.compile(r'<a[^>]*>|</?[a-zA-Z]+>', re.UNICODE)
 _BACKSLASH_PATTERN = re.compile(r'\\[ ]*\n|\\[ ]*$')
 
 def _clean_html(html):
@@ -212,18 +271,147 @@ def _clean_html(html):
     Removes links (``<a href="...">...</a>``) from the provided HTML input.
     Further, it replaces "&#x000A;" with ``\n`` and removes "¶" from the texts.
     """
-    content = html.replace(u'&#x000A;', u'\n').replace(u'¶', '')
-    content = _LINK_PATTERN.sub(u'', content)
-    content = _HTML_TAG_PATTERN.sub(u'', content)
-    content = _BACKSLASH_PATTERN.sub(u'\n', content)
+    content = html.replace(u'&#x000A;', u'\n')
+    if u'¶' in content:
+        content = content.replace(u'¶', u'')
+    if u'<' in content:
+        # Links and tags are removed in one pass. If a "<" is left, removing
+        # a link may have formed a new tag, so remove links and tags one
+        # after another.
+        stripped = _MARKUP_PATTERN.sub(u'', content)
+        if u'<' in stripped:
+            stripped = _HTML_TAG_PATTERN.sub(u'', _LINK_PATTERN.sub(u'', content))
+        content = stripped
+    if u'\\' in content:
+        content = _BACKSLASH_PATTERN.sub(u'\n', content)
     return content
 
 
+class _section(object):
+    """\
+    Descriptor which computes a `ContentSections` value on first access and
+    keeps it in the slot ``_<name>``.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.slot = '_' + func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.func(instance)
+            setattr(instance, self.slot, value)
+            return value
+
+
+# Every "Classified By" pattern starts with this
+_CLASSIFIED_BY_START_PATTERN = re.compile(r'Classified\s+By', re.IGNORECASE)
+
+class ContentSections(object):
+    """\
+    Locates the sections of a cable's content (SUBJECT, TAGS, REF,
+    "Classified By", E.O. 12958 DECL, END SUMMARY, first paragraph).
+
+    Each section is searched at most once, the results are shared by the
+    parsers which accept a `sections` argument. Sections which are never
+    requested are not searched at all.
+    """
+    __slots__ = ('content', '_header_max_idx', '_subject_match', '_tags_match',
+                 '_ref_offset', '_classified_by_idx', '_deadline_match',
+                 '_end_summary_match', '_first_paragraph_idx')
+
+    def __init__(self, content):
+        """\
+
+        `content`
+            The cable's content.
+        """
+        self.content = content
+
+    def __reduce__(self):
+        # Match objects cannot be pickled, the sections are searched again on demand
+        return ContentSections, (self.content,)
+
+    @_section
+    def header_max_idx(self):
+        """\
+        The max. index where SUBJECT/TAGS are searched.
+        """
+        m = _SUBJECT_MAX_PATTERN.search(self.content)
+        return m.start() if m else _MAX_HEADER_IDX
+
+    @_section
+    def subject_match(self):
+        """\
+        The match of `_SUBJECT_PATTERN` or ``None``.
+        """
+        return _SUBJECT_PATTERN.search(self.content, 0, self.header_max_idx)
+
+    @property
+    def tags_max_idx(self):
+        """\
+        The max. index where the TAGS are searched (TAGS precede the subject).
+        """
+        m = self.subject_match
+        return min(self.header_max_idx, m.start()) if m else self.header_max_idx
+
+    @_section
+    def tags_match(self):
+        """\
+        The match of `_TAGS_PATTERN` or ``None``.
+        """
+        return _TAGS_PATTERN.search(self.content, 0, self.tags_max_idx)
+
+    @_section
+    def ref_offset(self):
+        """\
+        The index where the search for the REF section starts.
+        """
+        m = _REF_OFFSET_PATTERN.search(self.content)
+        return m.end() if m else 0
+
+    @_section
+    def classified_by_idx(self):
+        """\
+        The index of the first "Classified By" or ``-1``.
+        """
+        m = _CLASSIFIED_BY_START_PATTERN.search(self.content)
+        return m.start() if m else -1
+
+    @_section
+    def deadline_match(self):
+        """\
+        The match of the E.O. 12958 DECL date pattern or ``None``.
+        """
+        return _DEADLINE_PATTERN.search(self.content)
+
+    @_section
+    def end_summary_match(self):
+        """\
+        The match of the "END SUMMARY" marker or ``None``.
+        """
+        return _END_SUMMARY_PATTERN.search(self.content)
+
+    @_section
+    def first_paragraph_idx(self):
+        """\
+        The index of the first line which starts with ``1`` or ``-1``.
+
+        Every pattern of a numbered paragraph starts with ``\\n1``, so the
+        patterns need not be searched before this index.
+        """
+        return self.content.find(u'\n1')
+
+
 _CLASSIFIED_BY_PATTERN = re.compile(r'Classified[ ]+by[^\n]+', re.IGNORECASE)
 _FIRST_PARAGRAPH_PATTERN = re.compile(r'\n1. ')
 _SUMMARY_PATTERN = re.compile(r'(BEGIN SUMMARY[ ])|(SUMMARY: )')
 
-def header_body_from_content(content):
+def header_body_from_content(content, sections=None):
     """\
     Tries to extract the header and the message from the cable content.
 
@@ -244,12 +432,17 @@ def header_body_from_content(content):
     
     `content`
         The "content" part of a cable.
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
-    m = _CLASSIFIED_BY_PATTERN.search(content)
+    sections = sections or ContentSections(content)
+    idx = sections.classified_by_idx
+    m = _CLASSIFIED_BY_PATTERN.search(content, idx) if idx != -1 else None
     idx = m and m.end() or 0
     m = _SUMMARY_PATTERN.search(content)
     summary_idx = m and m.start() or None
-    m = _FIRST_PARAGRAPH_PATTERN.search(content)
+    para_idx = sections.first_paragraph_idx
+    m = _FIRST_PARAGRAPH_PATTERN.search(content, para_idx) if para_idx != -1 else None
     para_idx = m and m.start() or None
     if summary_idx and para_idx:
         idx = max(idx, min(summary_idx, para_idx))
@@ -394,16 +587,21 @@ _CLIST_CONTENT_PATTERN = re.compile(r'''Classified\s+By:?\s*[0-9\.\s]*
     re.IGNORECASE|re.UNICODE|re.DOTALL|re.VERBOSE)
 _CLSIST_PATTERN = re.compile(r"[\s\.,]*([A-Z][^,;]+(?:\s*,\s*(?:JR\.?|II+))?)\s*", re.IGNORECASE|re.UNICODE)
 
-def parse_classified_by(content, normalize=True):
+def parse_classified_by(content, normalize=True, sections=None):
     """\
     Returns the classificationist or ``None`` if the classificationist
     cannot be extracted.
 
     `content`
         The cable's content.
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
     names = []
-    m = _CLIST_CONTENT_PATTERN.search(content)
+    idx = sections.classified_by_idx if sections is not None else 0
+    if idx < 0:
+        return ()
+    m = _CLIST_CONTENT_PATTERN.search(content, idx)
     if not m:
         return ()
     m = _CLSIST_PATTERN.search(m.group(1))
@@ -420,6 +618,37 @@ def parse_classified_by(content, normalize=True):
     return names
 
 
+# Reasons like "1.4 (b) and (d)", "1.4b/d" or "1.5 (B), (D)"
+_CLASSIFICATION_CATEGORIES_PATTERN = re.compile(r'1\.[45][\s:]*((?:\(?[a-h]\)?(?:[\s,;&/\.]|and|or)*)+)', re.IGNORECASE|re.UNICODE)
+_CLASSIFICATION_CATEGORY_PATTERN = re.compile(r'(?<![a-z])\(?([a-h])\)?(?![a-z])', re.IGNORECASE|re.UNICODE)
+
+def parse_classification_categories(content, sections=None):
+    """\
+    Returns a maybe empty list of classification categories (uppercased
+    chars ``[A-H]``) which are provided as reason for the classification.
+
+    `content`
+        The cable's content.
+    `sections`
+        Optional `ContentSections` of the `content`.
+    """
+    idx = sections.classified_by_idx if sections is not None else 0
+    if idx < 0:
+        return []
+    m = _CLASSIFIED_BY_PATTERN.search(content, idx)
+    if not m:
+        return []
+    m = _CLASSIFICATION_CATEGORIES_PATTERN.search(content, m.start(), m.start() + 400)
+    if not m:
+        return []
+    res = []
+    for cat in _CLASSIFICATION_CATEGORY_PATTERN.findall(m.group(1)):
+        cat = cat.upper()
+        if cat not in res:
+            res.append(cat)
+    return res
+
+
 _SIGNER_PATTERN = re.compile(r'(?:[\-\?\"/]|\)(?!\s+END)'
                              r'|\.(?!\s+The\b)'
                              r'|[\sA-Z]*QUOTE)(?:\s+[GP\-3EXEMPT]+'
@@ -461,7 +690,7 @@ def parse_signed_by(content, canonicalize=True):
     return [c14n.canonicalize_surname(s) for s in signers] if canonicalize else signers
 
 
-# Caution: _SUBJECT_PATTERN/_SUBJECT_MAX_PATTERN is reused by "parse_tags"
+# Caution: _SUBJECT_PATTERN/_SUBJECT_MAX_PATTERN is reused by "parse_tags" (c.f. ContentSections)
 _SUBJECT_PATTERN = re.compile(r'(?:^|[ ]+)S?UBJ(?:ECT)?(?:(?::\s*)|(?::?\s+))(?!LINE[/]*)(.+?)(?:\Z|(C O N)|(SENSI?TIVE BUT)|([ ]+REFS?:[ ]+)|(\n[ ]*\n|[\s]*[\n][\s]*[\s]*REFS?:?\s)|(REF:\s)|(REF\(S\):?)|(\s*Classified\s)|([1-9]\.?[ ]+Classified By)|([1-9]\.?[ ]*\([^\)]+\))|((?:1\.?[ ]|\r?\n)Summary)|([A-Z]+\s+[0-9]+\s+[0-9]+\.?[0-9]*\s+OF)|(\-\-\-\-\-*\s+)|(Friday)|(PAGE [0-9]+)|(This is a?n Action Req))', re.DOTALL|re.IGNORECASE|re.UNICODE|re.MULTILINE)
 _SUBJECT_MAX_PATTERN = re.compile(r'^1\.?[ ]*(?:\([^\)]+\)|SUMMARY)|"CANCEL THIS', re.IGNORECASE|re.MULTILINE)
 _NL_PATTERN = re.compile(r'[\r\n]+')
@@ -470,7 +699,7 @@ _WS_PATTERN = re.compile(r'[ ]{2,}', re.UNICODE)
 _BRACES_PATTERN = re.compile(r'^\([^\)]+\)[ ]+| \([A-Z]+\)$')
 _HTML_ENTITIES_PATTERN = re.compile(r'&#([0-9]+);')
 
-def parse_subject(content, reference_id=None, clean=True):
+def parse_subject(content, reference_id=None, clean=True, sections=None):
     """\
     Parses and returns the subject of a cable. If the cable has no subject, an
     empty string is returned.
@@ -492,12 +721,12 @@ def parse_subject(content, reference_id=None, clean=True):
         U.S. Department of State Foreign Affairs Handbook Volume 5 Handbook 1 — Correspondence Handbook
         5 FAH-1 H-210 -- HOW TO USE TELEGRAMS; page 2
         <http://www.state.gov/documents/organization/89319.pdf>
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
     def to_unicodechar(match):
         return unichr(int(match.group(1)))
-    m = _SUBJECT_MAX_PATTERN.search(content)
-    max_idx = m.start() if m else _MAX_HEADER_IDX
-    m = _SUBJECT_PATTERN.search(content, 0, max_idx)
+    m = (sections or ContentSections(content)).subject_match
     if not m:
         return u''
     res = m.group(1).strip()
@@ -513,15 +742,17 @@ def parse_subject(content, reference_id=None, clean=True):
 # Commonly month/day/year is used, but sometimes year/month/day
 _DEADLINE_PATTERN = re.compile(r'(?:E.?O.?\s*12958:?\s*DECL\s*:?\s*)([0-9]{1,2}/[0-9]{1,2}/[0-9]{2,4})|([0-9]{4}/[0-9]{2}/[0-9]{2})', re.IGNORECASE|re.UNICODE)
 
-def parse_nondisclosure_deadline(content):
+def parse_nondisclosure_deadline(content, sections=None):
     """\
     Returns the non-disclosure deadline if provided, otherwise ``None``.
     Format of the returned string: ``YYYY-MM-DD``.
 
     `content`
         The cable's content.
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
-    m = _DEADLINE_PATTERN.search(content)
+    m = sections.deadline_match if sections is not None else _DEADLINE_PATTERN.search(content)
     if not m:
         return None
     p1, p2 = m.groups()
@@ -549,7 +780,7 @@ _REF_ORIGIN_PATTERN = re.compile('[0-9]+([A-Z]+)[0-9]+')
 #TODO: The following works for all references which contain something like 02ROME1196, check with other cables
 _CLEAN_REFS_PATTERN = re.compile(r'(PAGE [0-9]+ [A-Z]+ [0-9]+ [0-9]+ OF [0-9]+ [A-Z0-9]+)|([A-Z]+\s+[0-9]+\s+[0-9]+(?:\.[0-9]+)?\s+OF)', re.UNICODE)
 
-def parse_references(content, year, reference_id=None, canonicalize=True):
+def parse_references(content, year, reference_id=None, canonicalize=True, sections=None):
     """\
     Returns the references to other cables as (maybe empty) list.
     
@@ -562,6 +793,8 @@ def parse_references(content, year, reference_id=None, canonicalize=True):
     `canonicalize`
         Indicates if the cable reference origin should be canonicalized.
         (enabled by default)
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
     from cablemap.core.models import Reference
     def format_year(y):
@@ -573,10 +806,7 @@ def parse_references(content, year, reference_id=None, canonicalize=True):
         elif len(y) == 3 and y[0] == '0':
             return y[1:]
         return y
-    offset = 0
-    m_offset = _REF_OFFSET_PATTERN.search(content)
-    if m_offset:
-        offset = m_offset.end()
+    offset = (sections or ContentSections(content)).ref_offset
     # 1. Try to find "Classified By:"
     m_stop = _REF_STOP_PATTERN.search(content, offset)
     # If found, use it as maximum index to search for references, otherwise use a constant
@@ -733,7 +963,7 @@ _TAG_FIXES = {
     u'IZPREL': (u'IZ', u'PREL'), # 03ROME2045 and others
 }
 
-def parse_tags(content, reference_id=None, canonicalize=True):
+def parse_tags(content, reference_id=None, canonicalize=True, sections=None):
     """\
     Returns the TAGS of a cable.
     
@@ -748,15 +978,12 @@ def parse_tags(content, reference_id=None, canonicalize=True):
         TAGs like "ECONEFIN" should be corrected (becomes "ECON", "EFIN").
         ``False`` indicates that the TAGs should be returned as found in
         cable.
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
-    max_idx = _MAX_HEADER_IDX
-    m = _SUBJECT_MAX_PATTERN.search(content)
-    if m:
-        max_idx = m.start()
-    m = _SUBJECT_PATTERN.search(content, 0, max_idx)
-    if m:
-        max_idx = min(max_idx, m.start())
-    m = _TAGS_PATTERN.search(content, 0, max_idx)
+    sections = sections or ContentSections(content)
+    max_idx = sections.tags_max_idx
+    m = sections.tags_match
     if not m:
         if reference_id not in _CABLES_WITHOUT_TAGS:
             logger.debug('No TAGS found in cable ID "%r", content: "%s"' % (reference_id, content))
@@ -795,7 +1022,7 @@ _CLEAN_SUMMARY_CLS_PATTERN = re.compile(r'^[ ]*\([SBU/NTSC]+\)[ ]*')
 _CLEAN_SUMMARY_WS_PATTERN = re.compile('[ \n]+')
 _CLEAN_SUMMARY_PATTERN = re.compile(r'(===+)|(---+)|(((^[1-9])|(\n[1-9]))\.[ ]+\([^\)]+\)[ ]+)|(^[1-2]. Summary:)|(^[1-2]\.[ ]+)|(^and action request. )|(^and comment. )|(2. (C) Summary, continued:)', re.UNICODE|re.IGNORECASE)
 
-def parse_summary(content, reference_id=None):
+def parse_summary(content, reference_id=None, sections=None):
     """\
     Extracts the summary from the `content` of the cable.
     
@@ -805,12 +1032,17 @@ def parse_summary(content, reference_id=None):
         The content of the cable.
     `reference_id`
         The reference identifier of the cable.
+    `sections`
+        Optional `ContentSections` of the `content`.
     """
     summary = None
-    m = _END_SUMMARY_PATTERN.search(content)
+    sections = sections or ContentSections(content)
+    m = sections.end_summary_match
     if m:
         end_of_summary = m.start()
-        m = _START_SUMMARY_PATTERN.search(content, 0, end_of_summary) or _ALTERNATIVE_START_SUMMARY_PATTERN.search(content, 0, end_of_summary)
+        m = _START_SUMMARY_PATTERN.search(content, 0, end_of_summary)
+        if not m and -1 < sections.first_paragraph_idx < end_of_summary:
+            m = _ALTERNATIVE_START_SUMMARY_PATTERN.search(content, sections.first_paragraph_idx, end_of_summary)
         if m:
             summary = content[m.end():end_of_summary]
         elif reference_id not in _CABLES_WITH_MALFORMED_SUMMARY:
@@ -827,6 +1059,24 @@ def parse_summary(content, reference_id=None):
     return summary
 
 
+_COMMENT_PATTERN = re.compile(r'(?<!END\s)(?:BEGIN\s+)?COMMENT\s*[:\.\-]\s*(.+?)\s*END\s+COMMENT', re.DOTALL|re.IGNORECASE|re.UNICODE)
+
+def parse_comment(content):
+    """\
+    Extracts the comment of the author of the cable.
+
+    If no comment can be found, ``None`` is returned.
+
+    `content`
+        The content of the cable.
+    """
+    m = _COMMENT_PATTERN.search(content)
+    if not m:
+        return None
+    comment = _CLEAN_SUMMARY_WS_PATTERN.sub(u' ', m.group(1)).strip(u' .')
+    return comment + u'.' if comment else None
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -0,0 +1,682 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Full-text index of the cable contents.
+
+The content of the cables is cleaned by `cablemap.core.utils.clean_content`,
+lowercased and split into word tokens. The index keeps positional postings,
+so phrase queries are supported.
+
+An index is a directory of immutable segments and a ``segments`` file
+which lists the active segments (oldest first). If a cable is indexed again,
+the newer segment wins. Small segments are merged into larger ones
+(``merge_factor`` segments of the same level become one segment of the
+next level).
+
+Segment layout (little endian)::
+
+    header      magic "CMFT", version, level, number of documents,
+                number of terms, number of deleted cables, size of the postings
+    postings    per term and document: doc id delta, term frequency,
+                position deltas (all unsigned varints), padded to 8 bytes
+    documents   canonical cable ids (string table), an empty id marks a
+                document which was replaced or deleted before the segment
+                was written
+    deleted     canonical ids of cables which were deleted from older
+                segments (string table)
+    terms       the sorted terms (string table)
+    offsets     number of terms + 1 unsigned 64 bit offsets into the postings
+
+A string table consists of count + 1 unsigned 32 bit offsets followed
+by the UTF-8 encoded strings, padded to 8 bytes.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import os
+import re
+import sys
+import mmap
+import heapq
+import struct
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from operator import itemgetter
+from cablemap.core.utils import clean_content
+from cablemap.core.handler import handle_source
+from cablemap.core.interfaces import ICableBatchHandler, implements
+
+__all__ = ['tokenize', 'FullTextIndex', 'IndexWriter', 'build_fulltext_index']
+
+_MAGIC = b'CMFT'
+_VERSION = 1
+_HEADER = struct.Struct('<4sHHIIIQ')
+_SEGMENTS = 'segments'
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+_QUERY_PATTERN = re.compile(r'"[^"]*"?|[()]|[^\s()"]+', re.UNICODE)
+
+
+def tokenize(content):
+    """\
+    Returns a list of the lowercased word tokens of the provided content.
+
+    `content`
+        The content of the cable.
+    """
+    return _TOKEN_PATTERN.findall(clean_content(content).lower())
+
+
+def _put_varints(out, values):
+    append = out.append
+    for v in values:
+        while v > 0x7f:
+            append(v & 0x7f | 0x80)
+            v >>= 7
+        append(v)
+
+
+def _get_varints(data):
+    values = []
+    append = values.append
+    v = shift = 0
+    for b in data:
+        if b & 0x80:
+            v |= (b & 0x7f) << shift
+            shift += 7
+        else:
+            append(v | (b << shift))
+            v = shift = 0
+    return values
+
+
+def _pack(typecode, values):
+    a = array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        a.byteswap()
+    return a.tobytes()
+
+
+def _unpack(view, typecode):
+    if _LITTLE_ENDIAN:
+        return view.cast(typecode)
+    a = array(typecode, view.tobytes())
+    a.byteswap()
+    return a
+
+
+def _pad(f, size):
+    f.write(b'\0' * (-size % 8))
+
+
+def _write_strings(f, strings):
+    blobs = [s.encode('utf-8') for s in strings]
+    offsets = array('I', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    f.write(_pack('I', offsets))
+    _pad(f, len(offsets) * 4)
+    f.write(b''.join(blobs))
+    _pad(f, offsets[-1])
+
+
+def _write_segment(filename, level, docs, deleted, terms):
+    """\
+    Writes a segment.
+
+    `terms`
+        An iterable of ``(term, postings)`` tuples, sorted by term.
+    """
+    tmp = filename + '.tmp'
+    names, offsets = [], array('Q', [0])
+    with open(tmp, 'wb') as f:
+        f.write(b'\0' * _HEADER.size)
+        for term, postings in terms:
+            f.write(postings)
+            names.append(term)
+            offsets.append(offsets[-1] + len(postings))
+        _pad(f, offsets[-1])
+        _write_strings(f, docs)
+        _write_strings(f, deleted)
+        _write_strings(f, names)
+        f.write(_pack('Q', offsets))
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, _VERSION, level, len(docs), len(names), len(deleted), offsets[-1]))
+    os.replace(tmp, filename)
+
+
+class _Strings(object):
+    """\
+    Read-only sequence view of a string table.
+    """
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class _Segment(object):
+    """\
+    Memory mapped segment.
+    """
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, version, self.level, ndocs, nterms, ndeleted, size = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION:
+            buf.release()
+            self._mmap.close()
+            raise ValueError('"%s" is not an index segment' % filename)
+        self._views = [buf]
+        pos = _HEADER.size
+        self._postings = buf[pos:pos + size]
+        pos += size + (-size % 8)
+
+        def view(size, typecode=None):
+            start = pos[0]
+            pos[0] += size + (-size % 8)
+            v = buf[start:start + size]
+            if typecode:
+                v = _unpack(v, typecode)
+            self._views.append(v)
+            return v
+
+        def strings(count):
+            offsets = view((count + 1) * 4, 'I')
+            return _Strings(offsets, view(offsets[-1]))
+        pos = [pos]
+        self.docs = list(strings(ndocs))
+        self.deleted = list(strings(ndeleted))
+        self._terms = strings(nterms)
+        self._offsets = view((nterms + 1) * 8, 'Q')
+        self._views.append(self._postings)
+
+    def terms(self):
+        """\
+        Returns an iterator over ``(term, term number)`` tuples.
+        """
+        return ((term, i) for i, term in enumerate(self._terms))
+
+    def _term_number(self, term):
+        terms = self._terms
+        i = bisect_left(terms, term)
+        return i if i < len(terms) and terms[i] == term else -1
+
+    def raw_postings(self, number):
+        """\
+        Returns the decoded varints of the postings of the term with the
+        provided number.
+        """
+        return _get_varints(self._postings[self._offsets[number]:self._offsets[number + 1]].tobytes())
+
+    def postings(self, term, positions=False):
+        """\
+        Returns a dict of document number -> list of positions if
+        `positions` is ``True``, otherwise a set of document numbers.
+        """
+        number = self._term_number(term)
+        if number < 0:
+            return {} if positions else set()
+        values = self.raw_postings(number)
+        result = {} if positions else set()
+        i, doc, count = 0, 0, len(values)
+        while i < count:
+            doc += values[i]
+            tf = values[i + 1]
+            i += 2
+            if positions:
+                p, ps = 0, []
+                for delta in values[i:i + tf]:
+                    p += delta
+                    ps.append(p)
+                result[doc] = ps
+            else:
+                result.add(doc)
+            i += tf
+        return result
+
+    def close(self):
+        for v in reversed(self._views):
+            if isinstance(v, memoryview):
+                v.release()
+        self._views = []
+        self._mmap.close()
+
+
+def _read_segments(directory):
+    filename = os.path.join(directory, _SEGMENTS)
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r', encoding='ascii') as f:
+        return [(name, int(level)) for name, level in (line.split() for line in f if line.strip())]
+
+
+def _write_segments(directory, segments):
+    filename = os.path.join(directory, _SEGMENTS)
+    with open(filename + '.tmp', 'w', encoding='ascii') as f:
+        for name, level in segments:
+            f.write('%s %d\n' % (name, level))
+    os.replace(filename + '.tmp', filename)
+
+
+def _live_docs(segments):
+    """\
+    Returns a list of sets of dead document numbers for the provided segments
+    (oldest first). A document is dead if it has no id or if a newer segment
+    contains or deletes the cable.
+    """
+    superseded, dead = set(), []
+    for seg in reversed(segments):
+        dead.append(set(i for i, doc in enumerate(seg.docs) if not doc or doc in superseded))
+        superseded.update(seg.docs)
+        superseded.update(seg.deleted)
+    dead.reverse()
+    return dead
+
+
+class IndexWriter(object):
+    """\
+    Adds cables to a full-text index.
+
+    The writer is a `ICableBatchHandler`, so it can be used with
+    `cablemap.core.handler.handle_source`. If the handler receives
+    ``delete_cable`` events (incremental runs), the cables are removed
+    from the index.
+    """
+    implements(ICableBatchHandler)
+
+    def __init__(self, directory, segment_size=20000, merge_factor=10):
+        """\
+
+        `directory`
+            The index directory. It is created if it does not exist.
+        `segment_size`
+            The number of cables which are kept in memory before a segment
+            is written (default: ``20000``).
+        `merge_factor`
+            The number of segments of the same level which are merged
+            into one segment (default: ``10``).
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._directory = directory
+        self.segment_size = segment_size
+        self._merge_factor = merge_factor
+        self._segments = _read_segments(directory)
+        self._reset()
+
+    def _reset(self):
+        self._docs = []
+        # Maps the canonical ids of the buffered cables to their document numbers
+        self._buffered = {}
+        self._deleted = set()
+        self._postings = {}
+
+    def _new_segment_name(self):
+        names = [name for name, _ in self._segments]
+        number = max([int(name[4:10]) for name in names] or [0]) + 1
+        return 'seg-%06d.idx' % number
+
+    def add(self, canonical_id, content):
+        """\
+        Adds the cable content to the index.
+
+        `canonical_id`
+            The canonical identifier of the cable.
+        `content`
+            The content of the cable.
+        """
+        self._discard(canonical_id)
+        doc = len(self._docs)
+        self._docs.append(canonical_id)
+        self._buffered[canonical_id] = doc
+        positions = {}
+        for i, token in enumerate(tokenize(content or u'')):
+            ps = positions.get(token)
+            if ps is None:
+                positions[token] = [i]
+            else:
+                ps.append(i)
+        index = self._postings
+        for token, ps in positions.items():
+            entry = index.get(token)
+            if entry is None:
+                entry = index[token] = [bytearray(), 0]
+            out = entry[0]
+            deltas = [doc - entry[1], len(ps), ps[0]]
+            deltas.extend(b - a for a, b in zip(ps, ps[1:]))
+            _put_varints(out, deltas)
+            entry[1] = doc
+        if len(self._docs) >= self.segment_size:
+            self.flush()
+
+    def delete(self, canonical_id):
+        """\
+        Removes the cable from the index.
+        """
+        self._discard(canonical_id)
+        self._deleted.add(canonical_id)
+
+    def _discard(self, canonical_id):
+        """\
+        Marks the buffered document of the cable (if any) as removed, so the
+        last ``add`` or ``delete`` of a cable wins.
+        """
+        doc = self._buffered.pop(canonical_id, None)
+        if doc is not None:
+            self._docs[doc] = u''
+
+    def flush(self):
+        """\
+        Writes the cables added so far into a new segment.
+        """
+        if not self._docs and not self._deleted:
+            return
+        name = self._new_segment_name()
+        postings = self._postings
+        _write_segment(os.path.join(self._directory, name), 0, self._docs, sorted(self._deleted),
+                       ((term, bytes(postings[term][0])) for term in sorted(postings)))
+        self._segments.append((name, 0))
+        self._reset()
+        _write_segments(self._directory, self._segments)
+        self._maybe_merge()
+
+    def _maybe_merge(self):
+        while len(self._segments) >= self._merge_factor:
+            level = self._segments[-1][1]
+            tail = 0
+            for _, l in reversed(self._segments):
+                if l != level:
+                    break
+                tail += 1
+            if tail < self._merge_factor:
+                break
+            self._merge(len(self._segments) - tail)
+
+    def optimize(self):
+        """\
+        Merges all segments into one segment.
+        """
+        self.flush()
+        if len(self._segments) > 1:
+            self._merge(0)
+
+    def _merge(self, start):
+        """\
+        Merges the segments from `start` to the newest segment into one segment.
+        """
+        directory = self._directory
+        run = self._segments[start:]
+        segments = [_Segment(os.path.join(directory, name)) for name, _ in run]
+        try:
+            dead = _live_docs(segments)
+            docs, remaps = [], []
+            for seg, seg_dead in zip(segments, dead):
+                remap = []
+                for i, doc in enumerate(seg.docs):
+                    if i in seg_dead:
+                        remap.append(-1)
+                    else:
+                        remap.append(len(docs))
+                        docs.append(doc)
+                remaps.append(remap)
+            # Deletions are only relevant if there are older segments
+            deleted = sorted(set().union(*(seg.deleted for seg in segments))) if start else []
+            level = max(l for _, l in run) + 1
+            name = self._new_segment_name()
+            _write_segment(os.path.join(directory, name), level, docs, deleted,
+                           self._merged_terms(segments, remaps))
+        finally:
+            for seg in segments:
+                seg.close()
+        self._segments[start:] = [(name, level)]
+        _write_segments(directory, self._segments)
+        for old, _ in run:
+            os.remove(os.path.join(directory, old))
+
+    def _merged_terms(self, segments, remaps):
+        def terms(i, seg):
+            for term, number in seg.terms():
+                yield term, i, number
+        streams = [terms(i, seg) for i, seg in enumerate(segments)]
+        for term, group in groupby(heapq.merge(*streams), itemgetter(0)):
+            out, last = bytearray(), 0
+            for _, i, number in group:
+                values, remap = segments[i].raw_postings(number), remaps[i]
+                j, doc, count = 0, 0, len(values)
+                while j < count:
+                    doc += values[j]
+                    tf = values[j + 1]
+                    new = remap[doc]
+                    if new >= 0:
+                        _put_varints(out, [new - last])
+                        _put_varints(out, values[j + 1:j + 2 + tf])
+                        last = new
+                    j += 2 + tf
+            if out:
+                yield term, bytes(out)
+
+    def close(self):
+        """\
+        Writes the pending cables into a segment.
+        """
+        self.flush()
+
+    def start(self):
+        pass
+
+    def handle_batch(self, cables):
+        for cable in cables:
+            self.add(cable.canonical_id, cable.content)
+
+    def delete_cable(self, reference_id, canonical_id):
+        self.delete(canonical_id)
+
+    def end(self):
+        self.close()
+
+
+class FullTextIndex(object):
+    """\
+    Read-only view of a full-text index, c.f. `IndexWriter`.
+
+    All queries return sorted lists of canonical cable identifiers.
+    """
+    def __init__(self, directory):
+        """\
+
+        `directory`
+            The index directory.
+        """
+        self._segments = [_Segment(os.path.join(directory, name)) for name, _ in _read_segments(directory)]
+        self._dead = _live_docs(self._segments)
+
+    def __len__(self):
+        return sum(len(seg.docs) - len(dead) for seg, dead in zip(self._segments, self._dead))
+
+    def _collect(self, func):
+        result = set()
+        for seg, dead in zip(self._segments, self._dead):
+            docs = seg.docs
+            result.update(docs[i] for i in func(seg) if i not in dead)
+        return sorted(result)
+
+    def term(self, word):
+        """\
+        Returns the cables which contain the provided word.
+        """
+        return self._collect(lambda seg: _eval(('term', word.lower()), seg))
+
+    def phrase(self, text):
+        """\
+        Returns the cables which contain the words of `text` in the same order.
+        """
+        return self._collect(lambda seg: _eval(('phrase', _TOKEN_PATTERN.findall(text.lower())), seg))
+
+    def search(self, query):
+        """\
+        Returns the cables which match the provided boolean query.
+
+        Words are combined by ``AND`` (the default) and ``OR``, ``NOT word``
+        or ``-word`` excludes cables, ``"a phrase"`` matches phrases and
+        parentheses group expressions, i.e.
+        ``nuclear (iran OR "north korea") -sanctions``.
+        """
+        node = _parse_query(query)
+        return self._collect(lambda seg: _eval(node, seg))
+
+    def close(self):
+        for seg in self._segments:
+            seg.close()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _word(text):
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) == 1:
+        return ('term', tokens[0])
+    return ('phrase', tokens)
+
+
+def _parse_query(query):
+    tokens = _QUERY_PATTERN.findall(query)
+    pos = [0]
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def next_token():
+        token = peek()
+        pos[0] += 1
+        return token
+
+    def parse_or():
+        nodes = [parse_and()]
+        while peek() == 'OR':
+            next_token()
+            nodes.append(parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and():
+        nodes = []
+        while peek() not in (None, ')', 'OR'):
+            if peek() == 'AND':
+                next_token()
+                continue
+            nodes.append(parse_unary())
+        if not nodes:
+            raise ValueError('Invalid query: "%s"' % query)
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_unary():
+        token = next_token()
+        if token in (None, ')'):
+            raise ValueError('Invalid query: "%s"' % query)
+        if token == 'NOT':
+            return ('not', parse_unary())
+        if token.startswith('-') and len(token) > 1:
+            return ('not', _word(token[1:]))
+        if token == '(':
+            node = parse_or()
+            if next_token() != ')':
+                raise ValueError('Invalid query, missing ")": "%s"' % query)
+            return node
+        if token.startswith('"'):
+            return ('phrase', _TOKEN_PATTERN.findall(token.strip('"').lower()))
+        return _word(token)
+
+    node = parse_or()
+    if peek() is not None:
+        raise ValueError('Invalid query: "%s"' % query)
+    return node
+
+
+def _eval(node, seg):
+    kind = node[0]
+    if kind == 'term':
+        return seg.postings(node[1])
+    if kind == 'phrase':
+        return _phrase(node[1], seg)
+    if kind == 'or':
+        return set().union(*(_eval(n, seg) for n in node[1]))
+    if kind == 'not':
+        return set(range(len(seg.docs))) - _eval(node[1], seg)
+    positive = [n for n in node[1] if n[0] != 'not']
+    if positive:
+        result = _eval(positive[0], seg)
+        for n in positive[1:]:
+            if not result:
+                break
+            result &= _eval(n, seg)
+    else:
+        result = set(range(len(seg.docs)))
+    for n in node[1]:
+        if n[0] == 'not' and result:
+            result -= _eval(n[1], seg)
+    return result
+
+
+def _phrase(tokens, seg):
+    if not tokens:
+        return set()
+    if len(tokens) == 1:
+        return seg.postings(tokens[0])
+    postings = [seg.postings(token, positions=True) for token in tokens]
+    docs = set(postings[0])
+    for p in postings[1:]:
+        docs &= set(p)
+    result = set()
+    for doc in docs:
+        starts = set(postings[0][doc])
+        for offset, p in enumerate(postings[1:], 1):
+            starts &= set(pos - offset for pos in p[doc])
+            if not starts:
+                break
+        if starts:
+            result.add(doc)
+    return result
+
+
+def build_fulltext_index(path, directory, predicate=None, workers=None, cache_dir=None, manifest=None, **kw):
+    """\
+    Reads all cables from `path`, adds them to the full-text index in
+    `directory` and returns the `FullTextIndex`.
+
+    `path`
+        Either a directory with cable files or a CSV file.
+    `directory`
+        The index directory.
+    `predicate`, `workers`, `cache_dir`, `manifest`
+        C.f. `cablemap.core.handler.handle_source`. If a `manifest` is
+        provided, only new and changed cables are indexed and deleted cables
+        are removed from the index.
+    `kw`
+        Further arguments for `IndexWriter`.
+    """
+    handle_source(path, IndexWriter(directory, **kw), predicate, workers=workers,
+                  cache_dir=cache_dir, manifest=manifest)
+    return FullTextIndex(directory)
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Compact in-memory store of parsed cables.
+
+In contrast to a list of `cablemap.core.models.Cable` instances, the
+`CableStore` keeps the properties column-wise:
+
+* origins and classifications as small integer codes,
+* the creation dates as 64-bit timestamps,
+* TAGs, references, recipients etc. as offset arrays into value arrays
+  which hold codes of a shared table of strings,
+* texts (subject, summary, ...) as UTF-8 encoded contiguous buffers
+  with offsets.
+
+The header and the content of the cables are not kept by default since
+they make up the bulk of the memory: with the texts, a store of all
+~250,000 cables needs about 2 GB, without the texts about 350 MB.
+
+Items of the store are `CableView` instances which provide the same
+attributes as a cable and which read the values on demand.
+
+Example::
+
+    from cablemap.core.store import store_from_source
+
+    store = store_from_source('cables.csv')
+    codes, origins = store.codes('origin')
+    for cable in store:
+        print(cable.reference_id, cable.subject)
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import sys
+import time
+import calendar
+from array import array
+from cablemap.core.models import Cable, Reference, Recipient, _RECORD_FIELDS
+from cablemap.core.handler import handle_source
+from cablemap.core.interfaces import ICable, ICableBatchHandler, implements
+
+__all__ = ['CableStore', 'CableView', 'CableStoreHandler', 'store_from_source']
+
+# Timestamp of cables without creation date
+_NO_TIMESTAMP = -(1 << 63)
+
+
+class _Table(object):
+    """\
+    Interned values, the code ``0`` is reserved for ``None``.
+    """
+    def __init__(self):
+        self.values = [None]
+        self._codes = {None: 0}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sys.getsizeof(self._codes) \
+                + sum(sys.getsizeof(value) for value in self.values)
+
+
+class _TextColumn(object):
+    """\
+    Strings (or ``None``) as one UTF-8 encoded buffer with offsets.
+    """
+    def __init__(self):
+        self._buf = bytearray()
+        self._offsets = array('Q', [0])
+        self._nulls = bytearray()
+
+    def append(self, text):
+        self._nulls.append(text is None)
+        if text:
+            self._buf += text.encode('utf-8')
+        self._offsets.append(len(self._buf))
+
+    def __getitem__(self, i):
+        if self._nulls[i]:
+            return None
+        return self._buf[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+
+    def nbytes(self):
+        return len(self._buf) + self._offsets.itemsize * len(self._offsets) + len(self._nulls)
+
+
+class _ListColumn(object):
+    """\
+    Lists of tuples. Each item of a tuple is stored as code of the
+    shared `_Table` in the array of its position.
+    """
+    def __init__(self, table, width=1):
+        self._table = table
+        self._offsets = array('Q', [0])
+        self._values = tuple(array('I') for _ in range(width))
+
+    def append(self, items):
+        code = self._table.code
+        values = self._values
+        for item in items:
+            for column, value in zip(values, item):
+                column.append(code(value))
+        self._offsets.append(len(values[0]))
+
+    def __getitem__(self, i):
+        table = self._table.values
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return list(zip(*[[table[code] for code in column[start:end]] for column in self._values]))
+
+    def nbytes(self):
+        return self._offsets.itemsize * len(self._offsets) \
+                + sum(column.itemsize * len(column) for column in self._values)
+
+
+def _timestamp(created):
+    if not created:
+        return _NO_TIMESTAMP
+    return calendar.timegm(time.strptime(created, '%Y-%m-%d %H:%M:%S' if created.count(':') == 2 else '%Y-%m-%d %H:%M'))
+
+
+def _created(timestamp, seconds):
+    if timestamp == _NO_TIMESTAMP:
+        return None
+    return time.strftime('%Y-%m-%d %H:%M:%S' if seconds else '%Y-%m-%d %H:%M', time.gmtime(timestamp))
+
+
+# Text properties
+_TEXT_FIELDS = ('reference_id', 'subject', 'summary', 'comment', 'transmission_id',
+                'nondisclosure_deadline')
+
+# List properties of strings
+_STRING_LIST_FIELDS = ('tags', 'signed_by', 'classified_by', 'classification_categories', 'media_uris')
+
+# Properties which are stored as codes of a table
+_CODE_FIELDS = ('origin', 'classification', 'released')
+
+
+class CableStore(object):
+    """\
+    Column-wise store of parsed cables.
+
+    The items are `CableView` instances. Cables are appended as rows,
+    deleted cables keep their row (and its index) but are skipped by
+    iterations and lookups.
+    """
+    def __init__(self, include_text=False):
+        """\
+
+        `include_text`
+            Indicates if the header and content of the cables should be
+            kept as well (default: ``False``). The texts increase the size
+            of the store about six-fold. If they are not kept, the
+            ``header`` and ``content`` of the views are ``None``.
+        """
+        self.include_text = include_text
+        self._strings = _Table()
+        self._tables = dict((name, _Table()) for name in _CODE_FIELDS)
+        self._codes = {'origin': array('H'), 'classification': array('B'), 'released': array('H')}
+        self._created = array('q')
+        # Indicates if the creation date was provided with seconds
+        self._seconds = bytearray()
+        self._partial = bytearray()
+        self._deleted = bytearray()
+        self._live = 0
+        self._texts = dict((name, _TextColumn()) for name in _TEXT_FIELDS + (('header', 'content') if include_text else ()))
+        self._lists = dict((name, _ListColumn(self._strings)) for name in _STRING_LIST_FIELDS)
+        self._lists['references'] = _ListColumn(self._strings, 4)
+        self._lists['recipients'] = _ListColumn(self._strings, 5)
+        self._lists['info_recipients'] = _ListColumn(self._strings, 5)
+        # Maps the index of a cable to its canonical id if it is not equal to the reference id
+        self._canonical_ids = {}
+        self._index = None
+
+    def append(self, cable):
+        """\
+        Adds the properties of the provided cable and returns its index.
+
+        `cable`
+            An ``ICable`` instance.
+        """
+        i = len(self._created)
+        for name, table in self._tables.items():
+            codes = self._codes[name]
+            code = table.code(getattr(cable, name))
+            if code >= 1 << (8 * codes.itemsize):
+                # Widen the array
+                codes = self._codes[name] = array('I', codes)
+            codes.append(code)
+        self._created.append(_timestamp(cable.created))
+        self._seconds.append(bool(cable.created) and cable.created.count(':') == 2)
+        self._partial.append(bool(cable.is_partial))
+        self._deleted.append(False)
+        self._live += 1
+        for name, column in self._texts.items():
+            column.append(getattr(cable, name))
+        for name in _STRING_LIST_FIELDS:
+            self._lists[name].append((value,) for value in getattr(cable, name))
+        self._lists['references'].append(cable.references)
+        for name in ('recipients', 'info_recipients'):
+            self._lists[name].append((rec.route, rec.name, rec.precedence, rec.mcn, tuple(rec.excluded))
+                                     for rec in getattr(cable, name))
+        if cable.canonical_id != cable.reference_id:
+            self._canonical_ids[i] = cable.canonical_id
+        if self._index is not None:
+            self._index[cable.reference_id] = i
+        return i
+
+    def extend(self, cables):
+        """\
+        Adds the provided cables.
+
+        `cables`
+            An iterable of ``ICable`` instances.
+        """
+        for cable in cables:
+            self.append(cable)
+
+    def delete(self, reference_id):
+        """\
+        Deletes the cable with the provided reference identifier.
+
+        Returns ``True`` if the cable was deleted, ``False`` if the store
+        does not contain the cable.
+        """
+        i = self._lookup(reference_id)
+        if i < 0:
+            return False
+        self._deleted[i] = True
+        self._live -= 1
+        del self._index[reference_id]
+        return True
+
+    def __len__(self):
+        """\
+        Returns the number of cables (without the deleted cables).
+        """
+        return self._live
+
+    def _rows(self):
+        deleted = self._deleted
+        return (i for i in range(len(deleted)) if not deleted[i])
+
+    def __getitem__(self, i):
+        """\
+        Returns the `CableView` of the row `i`.
+
+        Raises an ``IndexError`` if the row does not exist or if its cable was deleted.
+        """
+        rows = len(self._deleted)
+        if i < 0:
+            i += rows
+        if not 0 <= i < rows or self._deleted[i]:
+            raise IndexError('Cable index out of range')
+        return CableView(self, i)
+
+    def __iter__(self):
+        for i in self._rows():
+            yield CableView(self, i)
+
+    def _lookup(self, reference_id):
+        if self._index is None:
+            column = self._texts['reference_id']
+            self._index = dict((column[i], i) for i in self._rows())
+        return self._index.get(reference_id, -1)
+
+    def get(self, reference_id, default=None):
+        """\
+        Returns the `CableView` of the cable with the provided reference
+        identifier or `default`.
+
+        The first lookup creates an index of the reference identifiers.
+        """
+        i = self._lookup(reference_id)
+        return CableView(self, i) if i >= 0 else default
+
+    def __contains__(self, reference_id):
+        return self._lookup(reference_id) >= 0
+
+    def column(self, name):
+        """\
+        Returns a generator which yields the value of the property `name`
+        of each cable.
+
+        `name`
+            An ``ICable`` property name, i.e. ``'subject'``.
+        """
+        getter = _GETTERS[name]
+        for i in self._rows():
+            yield getter(self, i)
+
+    def codes(self, name):
+        """\
+        Returns a tuple ``(codes, values)`` of the property `name`.
+        The codes (an ``array.array``) hold one index into `values` per
+        row. The code ``0`` represents ``None``. C.f. `deleted`.
+
+        `name`
+            ``'origin'``, ``'classification'`` or ``'released'``.
+        """
+        return self._codes[name], tuple(self._tables[name].values)
+
+    @property
+    def timestamps(self):
+        """\
+        An ``array.array`` of the creation dates of the cables as seconds
+        since the epoch (UTC). Cables without creation date have the value
+        ``-2**63``. C.f. `deleted`.
+        """
+        return self._created
+
+    @property
+    def deleted(self):
+        """\
+        A ``bytearray`` which holds ``1`` for each row of a deleted cable.
+        The arrays returned by `codes` and `timestamps` contain these rows as well.
+        """
+        return self._deleted
+
+    def nbytes(self):
+        """\
+        Returns the approx. size of the store in bytes.
+        """
+        size = sum(codes.itemsize * len(codes) for codes in self._codes.values()) \
+                + self._created.itemsize * len(self._created) + len(self._partial) + len(self._deleted) \
+                + len(self._seconds) \
+                + sum(column.nbytes() for column in self._texts.values()) \
+                + sum(column.nbytes() for column in self._lists.values()) \
+                + sum(table.nbytes() for table in self._tables.values()) \
+                + self._strings.nbytes() + sys.getsizeof(self._canonical_ids) \
+                + sum(sys.getsizeof(value) for value in self._canonical_ids.values())
+        if self._index is not None:
+            size += sys.getsizeof(self._index) + sum(sys.getsizeof(key) for key in self._index)
+        return size
+
+    def _get_reference_id(self, i):
+        return self._texts['reference_id'][i]
+
+    def _get_canonical_id(self, i):
+        return self._canonical_ids.get(i) or self._texts['reference_id'][i]
+
+    def _get_created(self, i):
+        return _created(self._created[i], self._seconds[i])
+
+    def _get_is_partial(self, i):
+        return bool(self._partial[i])
+
+    def _get_header(self, i):
+        column = self._texts.get('header')
+        return column[i] if column is not None else None
+
+    def _get_content(self, i):
+        column = self._texts.get('content')
+        return column[i] if column is not None else None
+
+    def _get_references(self, i):
+        return [Reference(*values) for values in self._lists['references'][i]]
+
+    def _get_recipients(self, i):
+        return [Recipient(*values) for values in self._lists['recipients'][i]]
+
+    def _get_info_recipients(self, i):
+        return [Recipient(*values) for values in self._lists['info_recipients'][i]]
+
+    def _derived(self, name, i):
+        cable = Cable(self._get_reference_id(i))
+        cable.created = self._get_created(i)
+        return getattr(cable, name)
+
+
+def _code_getter(name):
+    def get(store, i):
+        return store._tables[name].values[store._codes[name][i]]
+    return get
+
+
+def _text_getter(name):
+    def get(store, i):
+        return store._texts[name][i]
+    return get
+
+
+def _list_getter(name):
+    def get(store, i):
+        return [value for value, in store._lists[name][i]]
+    return get
+
+
+def _derived_getter(name):
+    def get(store, i):
+        return store._derived(name, i)
+    return get
+
+
+# Maps the ICable property names to functions which accept the store and the index of a cable
+_GETTERS = {}
+for _name in _RECORD_FIELDS:
+    if hasattr(CableStore, '_get_' + _name):
+        _GETTERS[_name] = getattr(CableStore, '_get_' + _name)
+    elif _name in _CODE_FIELDS:
+        _GETTERS[_name] = _code_getter(_name)
+    elif _name in _TEXT_FIELDS:
+        _GETTERS[_name] = _text_getter(_name)
+    elif _name in _STRING_LIST_FIELDS:
+        _GETTERS[_name] = _list_getter(_name)
+    else:
+        _GETTERS[_name] = _derived_getter(_name)
+del _name
+
+
+def _view_property(name):
+    getter = _GETTERS[name]
+    return property(lambda self: getter(self._store, self._index))
+
+
+class CableView(object):
+    """\
+    Read-only ``ICable`` view of a cable in a `CableStore`.
+
+    The properties are read from the store on each access.
+    """
+    __slots__ = ('_store', '_index')
+    implements(ICable)
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __eq__(self, other):
+        return isinstance(other, CableView) and self._store is other._store and self._index == other._index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._store), self._index))
+
+    def __unicode__(self):
+        return self.reference_id
+
+for _name in _RECORD_FIELDS:
+    setattr(CableView, _name, _view_property(_name))
+del _name
+
+
+class CableStoreHandler(object):
+    """\
+    `ICableBatchHandler` implementation which adds the cables to a `CableStore`.
+
+    If the store is not empty, cables which are already in the store are
+    replaced. Supports the ``delete_cable`` event of incremental runs,
+    c.f. `cablemap.core.handler.handle_source`.
+    """
+    implements(ICableBatchHandler)
+
+    def __init__(self, store):
+        """\
+
+        `store`
+            The `CableStore` which receives the cables.
+        """
+        self.store = store
+        self._replace = False
+
+    def start(self):
+        self._replace = len(self.store) > 0
+
+    def end(self):
+        pass
+
+    def handle_batch(self, cables):
+        store = self.store
+        for cable in cables:
+            if self._replace:
+                store.delete(cable.reference_id)
+            store.append(cable)
+
+    def delete_cable(self, reference_id, canonical_id):
+        self.store.delete(reference_id)
+
+
+def store_from_source(path, predicate=None, workers=None, include_text=False, store=None, **kw):
+    """\
+    Reads all cables from `path` and returns a `CableStore`.
+
+    `path`
+        Either a directory with cable files or a CSV file.
+    `predicate`
+        A predicate that is invoked for each cable reference identifier,
+        c.f. `cablemap.core.handler.handle_source`.
+    `workers`
+        The number of processes which parse the cables,
+        c.f. `cablemap.core.handler.handle_source`.
+    `include_text`
+        Indicates if the header and content should be kept (default: ``False``),
+        c.f. `CableStore`. Ignored if a `store` is provided.
+    `store`
+        An existing `CableStore` which should be updated (default: ``None``).
+        Together with a ``manifest`` (c.f. `cablemap.core.handler.handle_source`),
+        only new and changed cables are parsed, the removed cables are
+        deleted from the store.
+    `kw`
+        Further arguments for `cablemap.core.handler.handle_source`.
+    """
+    if store is None:
+        store = CableStore(include_text)
+    handle_source(path, CableStoreHandler(store), predicate, workers=workers, **kw)
+    return store
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Per-stage timing of the parsing pipeline.
+
+`Timings` collects the number of calls, the cumulative time and the slowest
+cables of each stage. `instrument` temporarily replaces the parser functions
+by timed wrappers, so there is no overhead if no instrumentation is active.
+Since the functions are replaced process-wide, only one instrumentation can
+be active at a time.
+
+Optionally, the ``reader.parse_*`` functions get a time budget per call.
+If a parser exceeds the budget, the cable is logged and the parser is
+invoked again with a bounded part of the input. If the bounded scan exceeds
+the budget as well, the property is reported as unparsed, i.e. it gets the
+value the parser returns for an empty input.
+
+Usually, this module is used through `cablemap.core.handler.TimingCableHandler`.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from __future__ import absolute_import
+import json
+import signal
+import logging
+import threading
+from time import perf_counter
+from heapq import heappush, heapreplace
+from functools import wraps
+from cablemap.core import reader, models, utils
+
+__all__ = ['Timings', 'instrument']
+
+logger = logging.getLogger('cablemap.core.timing')
+
+#: Names of the timed functions of `cablemap.core.reader`
+READER_FUNCTIONS = tuple(sorted(name for name in dir(reader) if name.startswith('parse_'))) \
+                    + ('get_header_as_text', 'get_content_as_text', '_clean_html')
+
+_CABLE_FACTORIES = ('cable_from_row', 'cable_from_html', 'cable_from_file')
+
+#: Parsers which get a time budget. ``parse_meta`` is not part of it since it
+#: initializes the cable and has no sensible fallback.
+BUDGETED_FUNCTIONS = tuple(name for name in READER_FUNCTIONS if name.startswith('parse_') and name != 'parse_meta')
+
+# Parsers which look at the end of the content
+_TAIL_PARSERS = frozenset(['parse_signed_by'])
+
+# Outcomes of calls which exceeded the budget
+BOUNDED = 'bounded'
+UNPARSED = 'unparsed'
+SLOW = 'slow'
+
+# Held while an instrumentation is active
+_ACTIVE = threading.Lock()
+
+
+class Timings(object):
+    """\
+    Collects call counts, cumulative times and the slowest cables per stage.
+
+    The times of nested stages are included in the time of the outer stage,
+    i.e. the time of ``reader._clean_html`` is part of ``reader.get_content_as_text``.
+    """
+    def __init__(self, slowest=10):
+        """\
+
+        `slowest`
+            The number of slowest cables which are kept per stage (default: ``10``).
+        """
+        self.slowest = slowest
+        #: The reference identifier of the cable which is currently processed
+        self.reference_id = None
+        #: List of ``(name, reference_id, seconds, outcome)`` tuples of the
+        #: calls which exceeded the budget, c.f. `instrument`
+        self.exceeded = []
+        self._stats = {}
+
+    def add(self, name, elapsed, reference_id=None):
+        """\
+        Records a call.
+
+        `name`
+            The name of the stage.
+        `elapsed`
+            The time of the call in seconds.
+        `reference_id`
+            The reference identifier of the cable (default: the current
+            `reference_id`).
+        """
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats[name] = [0, 0.0, []]
+        stat[0] += 1
+        stat[1] += elapsed
+        slowest = stat[2]
+        if len(slowest) < self.slowest:
+            heappush(slowest, (elapsed, reference_id or self.reference_id or u''))
+        elif slowest and elapsed > slowest[0][0]:
+            heapreplace(slowest, (elapsed, reference_id or self.reference_id or u''))
+
+    def timed(self, name, func, reference_id=None):
+        """\
+        Returns a wrapper of `func` which records its calls as `name`.
+
+        `reference_id`
+            An optional function which returns the reference identifier of
+            the cable from the arguments and the result of `func`.
+        """
+        add = self.add
+        @wraps(func)
+        def wrapper(*args, **kw):
+            start = perf_counter()
+            result = func(*args, **kw)
+            add(name, perf_counter() - start, reference_id(args, result) if reference_id else None)
+            return result
+        return wrapper
+
+    def stats(self):
+        """\
+        Returns a list of dicts with the keys ``name``, ``calls``, ``total``,
+        ``mean`` and ``slowest`` (a list of ``(reference_id, seconds)`` tuples),
+        sorted by the cumulative time.
+        """
+        result = []
+        for name, (calls, total, slowest) in self._stats.items():
+            result.append({'name': name, 'calls': calls, 'total': total, 'mean': total / calls,
+                           'slowest': [(reference_id, elapsed) for elapsed, reference_id in sorted(slowest, reverse=True)]})
+        result.sort(key=lambda stat: stat['total'], reverse=True)
+        return result
+
+    def report(self, slowest=3):
+        """\
+        Returns the statistics as text table.
+
+        `slowest`
+            The number of slowest cables which are listed per stage (default: ``3``).
+        """
+        lines = ['%-36s %9s %11s %10s  %s' % ('stage', 'calls', 'total (s)', 'mean (ms)', 'slowest (ms)')]
+        for stat in self.stats():
+            lines.append('%-36s %9d %11.3f %10.3f  %s' % (stat['name'], stat['calls'], stat['total'], stat['mean'] * 1000,
+                                                         ', '.join('%s %.2f' % (reference_id, elapsed * 1000)
+                                                                   for reference_id, elapsed in stat['slowest'][:slowest])))
+        if self.exceeded:
+            lines.append('')
+            lines.append('%-36s %-24s %10s  %s' % ('exceeded budget', 'reference id', 'time (ms)', 'outcome'))
+            for name, reference_id, elapsed, outcome in self.exceeded:
+                lines.append('%-36s %-24s %10.2f  %s' % (name, reference_id, elapsed * 1000, outcome))
+        return '\n'.join(lines)
+
+    def dump(self, fileobj):
+        """\
+        Writes the statistics as JSON into the provided file-like object, c.f. `stats`.
+
+        The calls which exceeded the budget are written as ``exceeded`` list.
+        """
+        json.dump({'stages': self.stats(),
+                   'exceeded': [{'name': name, 'reference_id': reference_id, 'elapsed': elapsed, 'outcome': outcome}
+                                for name, reference_id, elapsed, outcome in self.exceeded]},
+                  fileobj, indent=2)
+
+    def __len__(self):
+        return len(self._stats)
+
+
+class _BudgetExceeded(Exception):
+    """\
+    Raised by the timer if a parser exceeds the budget.
+    """
+
+
+class _Budget(object):
+    """\
+    Runs the parser functions with a time budget.
+
+    Within the main thread, a parser which exceeds the budget is interrupted
+    by ``SIGALRM`` (the regular expression engine checks for signals while
+    matching). Within other threads or on platforms without ``setitimer``,
+    the time is checked after the call and the result is kept.
+    """
+    def __init__(self, timings, budget, bounded_size):
+        self._timings = timings
+        self._budget = budget
+        self._bounded_size = bounded_size
+        self._armed = False
+        self._previous = None
+        self._main_thread = threading.main_thread().ident
+        self._interrupt = hasattr(signal, 'setitimer') and threading.get_ident() == self._main_thread
+
+    def install(self):
+        if self._interrupt:
+            self._previous = signal.signal(signal.SIGALRM, self._alarm)
+
+    def uninstall(self):
+        if self._interrupt:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous)
+
+    def _alarm(self, signum, frame):
+        if self._armed:
+            self._armed = False
+            raise _BudgetExceeded()
+
+    def _run(self, func, args, kw):
+        if not self._interrupt or threading.get_ident() != self._main_thread:
+            return func(*args, **kw)
+        self._armed = True
+        signal.setitimer(signal.ITIMER_REAL, self._budget)
+        try:
+            return func(*args, **kw)
+        finally:
+            self._armed = False
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def wrap(self, name, func):
+        """\
+        Returns a wrapper of the parser `func` which records its calls as
+        ``reader.<name>`` and enforces the budget.
+        """
+        key = 'reader.' + name
+        tail = name in _TAIL_PARSERS
+        timings, budget, size, run = self._timings, self._budget, self._bounded_size, self._run
+        @wraps(func)
+        def wrapper(content, *args, **kw):
+            if self._armed:
+                # Called by another parser, the budget of the outer call applies
+                return func(content, *args, **kw)
+            start = perf_counter()
+            outcome = None
+            try:
+                result = run(func, (content,) + args, kw)
+            except _BudgetExceeded:
+                # The sections refer to the whole content
+                kw.pop('sections', None)
+                result = None
+                if content and len(content) > size:
+                    try:
+                        result = run(func, ((content[-size:] if tail else content[:size]),) + args, kw)
+                        outcome = BOUNDED
+                    except _BudgetExceeded:
+                        pass
+                if outcome is None:
+                    result = func(content[:0], *args, **kw)
+                    outcome = UNPARSED
+            elapsed = perf_counter() - start
+            timings.add(key, elapsed)
+            if outcome is None and elapsed > budget:
+                outcome = SLOW
+            if outcome is not None:
+                reference_id = timings.reference_id or u''
+                logger.warning('%s exceeded the budget of %.3f s for cable "%s" (%.3f s): %s',
+                               key, budget, reference_id, elapsed, outcome)
+                timings.exceeded.append((key, reference_id, elapsed, outcome))
+            return result
+        return wrapper
+
+
+def _reference_id_from_result(args, cable):
+    return cable.reference_id
+
+
+def instrument(timings, budget=None, bounded_size=4096):
+    """\
+    Replaces the `READER_FUNCTIONS` of `cablemap.core.reader`, the functions
+    ``cable_from_row``, ``cable_from_html``, ``cable_from_file`` and
+    `cablemap.core.utils.titlefy` by wrappers which record their calls into
+    `timings`.
+
+    Returns a function which restores the original functions.
+
+    Only calls within the current process are recorded, i.e. cables which
+    are parsed by worker processes are not taken into account.
+
+    This function is not thread-safe: the functions are replaced within
+    the whole process and the calls of all threads are recorded into
+    `timings` (and attributed to ``timings.reference_id``). Therefore, a
+    ``RuntimeError`` is raised if the functions are already instrumented,
+    i.e. if the returned function of a previous call was not invoked yet.
+
+    `timings`
+        A `Timings` instance.
+    `budget`
+        An optional max. time in seconds per call of the `BUDGETED_FUNCTIONS`.
+        If a parser exceeds the budget, it is invoked again with the first
+        `bounded_size` characters of its input (the last characters for
+        ``parse_signed_by``). If this fails as well, the parser's result for
+        an empty input is returned. These calls are logged and appended to
+        ``timings.exceeded``. The parsers can only be interrupted within the
+        main thread (``SIGALRM`` is used for this). If this function is
+        invoked by another thread or on a platform without ``setitimer``,
+        a warning is logged and slow calls are just reported.
+    `bounded_size`
+        The number of characters used for the bounded scan (default: ``4096``).
+    """
+    from cablemap.core import handler
+    if not _ACTIVE.acquire(False):
+        raise RuntimeError('The parser functions are already instrumented')
+    guard = None
+    if budget is not None:
+        guard = _Budget(timings, budget, bounded_size)
+        if not guard._interrupt:
+            logger.warning('The budget of %.3f s cannot be enforced outside of the main thread, '
+                           'slow parsers are reported only', budget)
+    patches = []
+    for name in READER_FUNCTIONS:
+        if guard is not None and name in BUDGETED_FUNCTIONS:
+            patches.append((reader, name, lambda func, name=name: guard.wrap(name, func)))
+        else:
+            patches.append((reader, name, lambda func, name=name: timings.timed('reader.' + name, func)))
+    for module in (models, utils):
+        patches.extend((module, name, lambda func, name=name: timings.timed(name, func, _reference_id_from_result))
+                       for name in _CABLE_FACTORIES)
+    for module in (utils, handler):
+        patches.append((module, 'titlefy', lambda func: timings.timed('titlefy', func)))
+    originals = []
+
+    def restore():
+        if not originals:
+            return
+        if guard is not None:
+            guard.uninstall()
+        for module, attr, func in reversed(originals):
+            setattr(module, attr, func)
+        del originals[:]
+        _ACTIVE.release()
+    try:
+        for module, attr, wrap in patches:
+            func = getattr(module, attr)
+            originals.append((module, attr, func))
+            setattr(module, attr, wrap(func))
+        if guard is not None:
+            guard.install()
+    except:
+        if originals:
+            restore()
+        else:
+            _ACTIVE.release()
+        raise
+    return restore
@@ -14,54 +14,136 @@ Utility functions for cables.
 """
 from __future__ import absolute_import, with_statement
 import os
+import io
 import re
 import csv
+import mmap
 import codecs
 import string
+import multiprocessing
+from collections import deque
+from itertools import islice
 try:
     from itertools import imap
 except ImportError:
     # Python 3...
     imap=map
 
-from io import StringIO
 import gzip
 import urllib
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
-from cablemap.core import cable_from_file, cable_from_html, cable_from_row, consts
+from cablemap.core import cable_from_file, cable_from_html, cable_from_row, consts, reader, c14n
+from cablemap.core.models import cable_record
+from cablemap.core.cache import ParseCache
+from cablemap.core.monthindex import month_index
 import sys
 csv.field_size_limit(sys.maxsize)
 del sys
 
-_CABLEID2MONTH = None
+_RESPONSE_CACHE = None
 
 
 class _Request(Request):
-    def __init__(self, url):
+    def __init__(self, url, headers=None):
         Request.__init__(self, url,
-                                 headers={'User-Agent': 'Cablemap/1.2',
-                                          'Accept-Encoding': 'gzip, identity'})
+                                 headers=dict({'User-Agent': 'Cablemap/1.2',
+                                               'Accept-Encoding': 'gzip, identity'}, **(headers or {})))
+
+
+def set_response_cache(cache):
+    """\
+    Sets the cache which is used by `cable_by_id`, `cable_by_url` and
+    `cable_page_by_id` and returns the previous cache.
+
+    `cache`
+        An `cablemap.core.interfaces.IResponseCache` implementation,
+        i.e. `cablemap.core.cache.ResponseCache`, or ``None`` to
+        disable caching.
+    """
+    global _RESPONSE_CACHE
+    previous, _RESPONSE_CACHE = _RESPONSE_CACHE, cache
+    return previous
+
+
+def _urlopen(url, headers):
+    try:
+        return urlopen(_Request(url, headers))
+    except URLError as ex:
+        if getattr(ex, 'code', None) == 304 or 'wikileaks.org' not in url:
+            raise
+        return urlopen(_Request(url.replace('wikileaks.org', 'wikileaks.ch'), headers))
 
 
 def _fetch_url(url):
     """\
     Returns the content of the provided URL.
     """
+    cache = _RESPONSE_CACHE
+    cached = cache.get(url) if cache is not None else None
+    headers = {}
+    if cached is not None:
+        body, etag, last_modified, fresh = cached
+        if fresh or cache.offline:
+            return body
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+    elif cache is not None and cache.offline:
+        raise URLError('"%s" is not cached (offline mode)' % url)
     try:
-        resp = urlopen(_Request(url))
-    except URLError:
-        if 'wikileaks.org' in url:
-            resp = urlopen(_Request(url.replace('wikileaks.org', 'wikileaks.ch')))
-        else:
+        resp = _urlopen(url, headers)
+    except HTTPError as ex:
+        if ex.code != 304 or cached is None:
             raise
-    if resp.info().get('Content-Encoding') == 'gzip':
-        return gzip.GzipFile(fileobj=StringIO(resp.read())).read().decode('utf-8')
-    return resp.read().decode('utf-8')
-    
+        # Not modified
+        info, body = ex.headers, cached[0]
+    else:
+        info = resp.info()
+        body = resp.read()
+        if info.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        body = body.decode('utf-8')
+    if cache is not None:
+        etag, last_modified = cached[1:3] if cached is not None else (None, None)
+        cache.put(url, body, info.get('ETag') or etag, info.get('Last-Modified') or last_modified)
+    return body
+
 
 _CGSN_BASE = u'https://cablegatesearch.wikileaks.org/cable.php?id='
 _CGSN_WL_SOURCE_SEARCH = re.compile(r'''<td.*?>Source.+?<a.*?href=["']([^"']+)''').search
+_WL_BASE = u'https://wikileaks.org/cable/'
+
+
+def _wikileaks_id(reference_id):
+    """\
+    Returns the reference identifier WikiLeaks uses for the provided
+    (canonical) reference identifier.
+    """
+    if reference_id in consts.INVALID_CABLE_IDS.values():
+        for k, v in consts.INVALID_CABLE_IDS.items():
+            if v == reference_id:
+                return k
+    return reference_id
+
+
+def _cable_path(wl_id):
+    """\
+    Returns the path (``<year>/<month>/<reference-id>``) of the cable page
+    relative to a WikiLeaks Cablegate base URI or ``None`` if the cable
+    is unknown.
+
+    `wl_id`
+        The WikiLeaks reference identifier of the cable, c.f. `_wikileaks_id`.
+    """
+    m = month_index().get(wl_id)
+    if m is None:
+        return None
+    y = wl_id[:2]
+    y = u'19' + y if int(y) > 10 else u'20' + y
+    return u'%s/%s/%s' % (y, m.zfill(2), wl_id)
+
 
 def cable_page_by_id(reference_id):
     """\
@@ -78,28 +160,9 @@ def cable_page_by_id(reference_id):
     >>> cable_page_by_id('10MUSCAT103') is not None
     True
     """
-    global _CABLEID2MONTH
-    def wikileaks_id(reference_id):
-        if reference_id in consts.INVALID_CABLE_IDS.values():
-            for k, v in consts.INVALID_CABLE_IDS.iteritems():
-                if v == reference_id:
-                    return k
-        return reference_id
-
-    def wikileaks_url(wl_id):
-        m = _CABLEID2MONTH.get(wl_id)
-        if m is None:
-            return None
-        y = wl_id[:2]
-        y = u'19' + y if int(y) > 10 else u'20' + y
-        return u'https://wikileaks.org/cable/%s/%s/%s' % (y, m.zfill(2), wl_id)
-
-    if _CABLEID2MONTH is None:
-        with gzip.open(os.path.join(os.path.dirname(__file__), 'cable2month.csv.gz'), 'r') as f:
-            reader = csv.reader(line.decode() for line in f)
-            _CABLEID2MONTH = dict(reader)
-    wl_id = wikileaks_id(reference_id)
-    wl_url = wikileaks_url(wl_id)
+    wl_id = _wikileaks_id(reference_id)
+    path = _cable_path(wl_id)
+    wl_url = _WL_BASE + path if path else None
     if wl_url is None:
         # The cable reference is not known, try to consult Cablegatesearch.
         html = _fetch_url(_CGSN_BASE + wl_id)
@@ -133,7 +196,7 @@ def cable_by_url(url):
     return cable_from_html(page) if page else None
 
 
-def cables_from_source(path, predicate=None):
+def cables_from_source(path, predicate=None, workers=None, chunksize=32, cache_dir=None, manifest=None):
     """\
     Returns a generator with ``ICable`` instances.
 
@@ -145,10 +208,147 @@ def cables_from_source(path, predicate=None):
         By default, all cables are used.
         I.e. ``cables_from_source('cables.csv', lambda r: r.startswith('09'))``
         would return cables where the reference identifier starts with ``09``.
+        C.f. `cablemap.core.predicates.RowPredicate` for predicates which
+        check the classification as well. A row predicate cannot be used
+        together with a `manifest`.
+    `workers`
+        The number of processes which should parse the cables (default: ``None``).
+        If `workers` is greater than one, the cables are parsed by a process
+        pool and fully parsed `cablemap.core.models.CableRecord` instances are
+        returned in the same order as they occur in the source.
+    `chunksize`
+        The number of cables which are sent to a worker process at once
+        (default: ``32``). Only used if `workers` is greater than one or if
+        a `cache_dir` is provided.
+    `cache_dir`
+        A directory which keeps a persistent cache of parsed cables
+        (default: ``None``), c.f. `cablemap.core.cache.ParseCache`.
+        If provided, `cablemap.core.models.CableRecord` instances are
+        returned and unchanged cables are not parsed again.
+    `manifest`
+        A `cablemap.core.manifest.Manifest` instance (default: ``None``).
+        If provided, only `cablemap.core.models.CableRecord` instances of
+        cables which are new or which were changed since the run which
+        wrote the manifest are returned. All cables of the source are
+        recorded in the manifest.
     """
+    if manifest is not None and getattr(predicate, 'accept_row', None) is not None:
+        raise ValueError('A manifest cannot be used with a row predicate')
+    if (workers and workers > 1) or cache_dir or manifest is not None:
+        records = _records_from_source(path, predicate, workers, chunksize, cache_dir, manifest)
+        return _filter_rows(records, predicate) if os.path.isdir(path) else records
     return cables_from_directory(path, predicate) if os.path.isdir(path) else cables_from_csv(path, predicate)
 
 
+def _filter_rows(cables, predicate):
+    """\
+    Applies the ``accept_row`` method of the predicate (if any) to cables
+    which were not read from a CSV source.
+    """
+    accept_row = getattr(predicate, 'accept_row', None)
+    if accept_row is None:
+        return cables
+    return (cable for cable in cables if accept_row(cable.reference_id, cable.classification))
+
+
+def _record_from_row(row):
+    return cable_record(cable_from_row(row))
+
+
+def _record_from_file(filename):
+    return cable_record(cable_from_file(filename))
+
+
+def _record_from_html(item):
+    return cable_record(cable_from_html(*item))
+
+
+def _html_from_file(filename):
+    with codecs.open(filename, 'rb', 'utf-8') as f:
+        return f.read(), reader.reference_id_from_filename(filename)
+
+
+def _parse_chunk(func, chunk):
+    return [func(item) for item in chunk]
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    chunk = list(islice(it, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(it, size))
+
+
+def _records_from_source(path, predicate, workers, chunksize, cache_dir=None, manifest=None):
+    """\
+    Returns a generator which yields `cablemap.core.models.CableRecord`
+    instances which were parsed by `workers` processes or read from the
+    cache in `cache_dir`. If a `manifest` is provided, unchanged cables
+    are skipped.
+
+    Only a bounded number of chunks is in flight, so memory usage does not
+    depend on the size of the source. The records are returned in input order.
+    """
+    cache = ParseCache(cache_dir) if cache_dir else None
+    if os.path.isdir(path):
+        files = cablefiles_from_directory(path, predicate)
+        if cache is not None or manifest is not None:
+            func, items, key = _record_from_html, imap(_html_from_file, files), lambda item: ParseCache.key_from_html(*item)
+        else:
+            func, items = _record_from_file, files
+    else:
+        func, items, key = _record_from_row, rows_from_csv(path, predicate), ParseCache.key_from_row
+    pool = multiprocessing.Pool(workers) if workers and workers > 1 else None
+    max_pending = workers * 2 if pool else 1
+    pending = deque()
+
+    def finish(keys, records, result):
+        parsed = iter(result.get() if pool else result)
+        misses = []
+        for i, record in enumerate(records):
+            if record is None:
+                records[i] = next(parsed)
+                if cache is not None:
+                    misses.append((keys[i], records[i]))
+        if misses:
+            cache.put_many(misses)
+        return records
+
+    try:
+        for chunk in _chunks(items, chunksize):
+            keys = None
+            if cache is not None or manifest is not None:
+                keys = [key(item) for item in chunk]
+            if manifest is not None:
+                changed = [manifest.changed(k) for k in keys]
+                keys = [k for k, c in zip(keys, changed) if c]
+                chunk = [item for item, c in zip(chunk, changed) if c]
+                if not chunk:
+                    continue
+            if cache is not None:
+                records = cache.get_many(keys)
+                chunk = [item for item, record in zip(chunk, records) if record is None]
+            else:
+                records = [None] * len(chunk)
+            if pool:
+                result = pool.apply_async(_parse_chunk, (func, chunk))
+            else:
+                result = _parse_chunk(func, chunk)
+            pending.append((keys, records, result))
+            if len(pending) >= max_pending:
+                for record in finish(*pending.popleft()):
+                    yield record
+        while pending:
+            for record in finish(*pending.popleft()):
+                yield record
+    finally:
+        if pool:
+            pool.terminate()
+        if cache is not None:
+            cache.close()
+
+
 def cables_from_csv(filename, predicate=None, encoding='utf-8'):
     """\
     Returns a generator with ``ICable`` instances.
@@ -187,47 +387,177 @@ def rows_from_csv(filename, predicate=None, encoding='utf-8'):
         By default, all cables are used.
         I.e. ``cables_from_csv('cables.csv', lambda r: r.startswith('09'))``
         would return cables where the reference identifier starts with ``09``.
+        If the predicate provides an ``accept_row(reference_id, classification)``
+        method (c.f. `cablemap.core.predicates.RowPredicate`), the method
+        is used instead.
+        The predicate is evaluated before the header and the body of a
+        row are decoded, rejected rows are skipped at almost no cost.
     `encoding`
         The file encoding (``UTF-8`` by default).
     """
+    accept = _row_acceptor(predicate)
+    if _is_ascii_compatible(encoding):
+        return _scan_csv(filename, accept, encoding)
+    return _read_csv(filename, accept, encoding)
+
+
+def _row_acceptor(predicate):
+    """\
+    Returns a function ``(reference_id, classification) -> bool`` for the
+    provided predicate.
+    """
+    accept_row = getattr(predicate, 'accept_row', None)
+    if accept_row is not None:
+        return accept_row
     pred = predicate or bool
-    with open(filename, 'rb') as f:
-        for row in csv.reader((line.decode() for line in f.readlines()), delimiter=',', quotechar='"', escapechar='\\'):
-        # for row in _UnicodeReader(f, encoding=encoding, delimiter=',', quotechar='"', escapechar='\\'):
-            ident, created, reference_id, origin, classification, references, header, body = row
-            if row and pred(reference_id):
-                yield ident, created, reference_id, origin, classification, references, header, body
+    return lambda reference_id, classification: pred(reference_id)
+
+
+def _is_ascii_compatible(encoding):
+    return u'",\\\r\n'.encode(encoding) == b'",\\\r\n'
+
+
+def _read_csv(filename, accept, encoding, offset=0):
+    # The file is handed to the CSV parser as-is, rows are produced on demand
+    # and the file is closed as soon as the consumer stops iterating
+    with open(filename, 'rb') as raw:
+        raw.seek(offset)
+        with io.TextIOWrapper(raw, encoding=encoding, newline='') as f:
+            reader = csv.reader(f, delimiter=',', quotechar='"', escapechar='\\')
+            while True:
+                try:
+                    row = next(reader, None)
+                except csv.Error as ex:
+                    raise ValueError('Malformed row in "%s": %s' % (filename, ex))
+                if row is None:
+                    break
+                if not row:
+                    continue
+                if len(row) != 8:
+                    raise ValueError('Malformed row in "%s": expected 8 fields, got %d' % (filename, len(row)))
+                ident, created, reference_id, origin, classification, references, header, body = row
+                if accept(reference_id, classification):
+                    yield ident, created, reference_id, origin, classification, references, header, body
+
+
+# The leading columns of a row: <identifier>, <creation-date>, <reference-id>,
+# <origin>, <classification-level>, <references-to-other-cables>
+# Each column is either a quoted value (group 2n + 1) or an unquoted value (group 2n + 2).
+# Unquoted values with escape characters or quotes are left to the CSV parser.
+_CSV_LEADING_COLUMNS = re.compile(b'[\r\n]*' + 6 * (br'(?:"([^"\\]*(?:(?:\\.|"")[^"\\]*)*)"|([^",\\\r\n]*)),'),
+                                  re.DOTALL)
+_CSV_UNESCAPE = re.compile(br'\\(.)|""', re.DOTALL)
+
+
+def _csv_unescape(value):
+    if b'\\' in value or b'""' in value:
+        return _CSV_UNESCAPE.sub(lambda m: m.group(1) or b'"', value)
+    return value
+
+
+def _csv_field_end(buf, pos, last):
+    """\
+    Returns the end position of the CSV field which starts at `pos`.
+
+    Quoted fields are skipped by searching the closing quote which avoids
+    any per-character work in Python.
+    """
+    if buf[pos:pos + 1] != b'"':
+        if not last:
+            end = buf.find(b',', pos)
+        else:
+            end = buf.find(b'\n', pos)
+            if end < 0:
+                end = len(buf)
+            if end > pos and buf[end - 1:end] == b'\r':
+                end -= 1
+        return end
+    find = buf.find
+    i = pos + 1
+    while True:
+        i = find(b'"', i)
+        if i < 0:
+            return -1
+        j = i
+        while buf[j - 1] == 0x5c:  # Backslash
+            j -= 1
+        if (i - j) % 2:
+            # Escaped quote
+            i += 1
+        elif buf[i + 1:i + 2] == b'"':
+            # Doubled quote
+            i += 2
+        else:
+            return i + 1
 
 
-class _UTF8Recoder:
+def _csv_plain(buf, start, end):
     """\
-    Iterator that reads an encoded stream and reencodes the input to UTF-8
+    Returns if the field ``buf[start:end]`` is quoted or if the unquoted
+    field contains neither separators, escape characters nor quotes.
     """
-    def __init__(self, f, encoding):
-        self.reader = codecs.getreader(encoding)(f)
+    if buf[start:start + 1] == b'"':
+        return True
+    field = buf[start:end]
+    return b',' not in field and b'\\' not in field and b'"' not in field
 
-    def __iter__(self):
-        return iter(self.reader)
 
-    def next(self):
-        return self.reader.next().encode("utf-8")
+def _csv_value(buf, start, end, encoding):
+    if buf[start:start + 1] == b'"':
+        return _csv_unescape(buf[start + 1:end - 1]).decode(encoding)
+    return buf[start:end].decode(encoding)
 
 
-class _UnicodeReader:
+def _scan_csv(filename, accept, encoding):
     """\
-    A CSV reader which will iterate over lines in the CSV file "f",
-    which is encoded in the given encoding.
-    """
-    def __init__(self, f, dialect=csv.excel, encoding="utf-8", **kwds):
-        f = _UTF8Recoder(f, encoding)
-        self.reader = csv.reader(f, dialect=dialect, **kwds)
+    Returns a generator over the rows of the CSV `filename`.
 
-    def next(self):
-        row = self.reader.next()
-        return [s.decode("utf-8") for s in row]
+    The file is memory mapped. Only the leading columns of a row are decoded
+    before `accept` is invoked, the header and the body are skipped if the
+    row is rejected.
 
-    def __iter__(self):
-        return self
+    Rows which the scanner does not handle (i.e. unquoted values with
+    escape characters or rows with too many fields) and all following rows
+    are read by the CSV parser, c.f. `_read_csv`.
+    """
+    with open(filename, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        match = _CSV_LEADING_COLUMNS.match
+        size = len(buf)
+        pos = 0
+        while pos < size:
+            m = match(buf, pos)
+            if m is None or m.end() == size:
+                if not buf[pos:].strip(b'\r\n'):
+                    break
+                yield from _read_csv(filename, accept, encoding, pos)
+                return
+            header_start = m.end()
+            header_end = _csv_field_end(buf, header_start, False)
+            if header_end < 0:
+                raise ValueError('Malformed row at offset %d in "%s"' % (pos, filename))
+            body_end = -1
+            if buf[header_end:header_end + 1] == b',' and _csv_plain(buf, header_start, header_end):
+                body_end = _csv_field_end(buf, header_end + 1, True)
+                if body_end < 0:
+                    raise ValueError('Malformed row at offset %d in "%s"' % (pos, filename))
+            if body_end < 0 or buf[body_end:body_end + 1] not in (b'', b'\r', b'\n') \
+                    or not _csv_plain(buf, header_end + 1, body_end):
+                yield from _read_csv(filename, accept, encoding, pos)
+                return
+            groups = m.groups()
+            values = [_csv_unescape(groups[i] if groups[i] is not None else groups[i + 1]).decode(encoding)
+                      for i in range(0, 12, 2)]
+            if accept(values[2], values[4]):
+                values.append(_csv_value(buf, header_start, header_end, encoding))
+                values.append(_csv_value(buf, header_end + 1, body_end, encoding))
+                yield tuple(values)
+            pos = body_end
+    finally:
+        buf.close()
 
 
 def cables_from_directory(directory, predicate=None):
@@ -246,7 +576,7 @@ def cables_from_directory(directory, predicate=None):
         I.e. ``cables_from_directory('./cables/', lambda f: f.startswith('09'))``
         would return cables where the filename starts with ``09``. 
     """
-    return imap(cable_from_file, cablefiles_from_directory(directory, predicate))
+    return _filter_rows(imap(cable_from_file, cablefiles_from_directory(directory, predicate)), predicate)
 
 
 def cablefiles_from_directory(directory, predicate=None):
@@ -283,6 +613,42 @@ def reference_id_parts(reference_id):
     raise ValueError('Illegal reference identifier: "%s"' % reference_id)
 
 
+def validate_ids(reference_ids, canonicalize=True):
+    """\
+    Validates the provided reference identifiers and splits them into
+    their parts.
+
+    Returns a tuple of four lists (columns) with the same length as
+    `reference_ids`::
+
+        (identifiers, YEARs, ORIGINs, S/Ns)
+
+    The YEAR, ORIGIN and S/N of an invalid identifier are ``None``.
+
+    This is equivalent to calling `cablemap.core.c14n.canonicalize_id`
+    and `reference_id_parts` for each identifier but much faster for large
+    lists of identifiers.
+
+    `reference_ids`
+        An iterable of cable reference identifiers.
+    `canonicalize`
+        Indicates if the identifiers should be canonicalized before they
+        are validated (enabled by default). If disabled, the first column
+        contains the provided identifiers.
+    """
+    reference_ids, years, origins, serials = c14n._id_columns(reference_ids, canonicalize)
+    stations = consts.STATIONS
+    match = consts.REFERENCE_ID_PATTERN.match
+    for i, origin in enumerate(origins):
+        serial = serials[i]
+        if origin in stations and serial.isdigit() and serial.isascii() and len(serial) <= consts.MAX_SERIAL_LENGTH:
+            continue
+        # Identifiers which cannot be validated by the split, i.e. 09BERLIN0123
+        m = match(reference_ids[i])
+        years[i], origins[i], serials[i] = m.groups() if m else (None, None, None)
+    return reference_ids, years, origins, serials
+
+
 _TAGS_SUBJECT = [l.upper().rstrip() for l in codecs.open(os.path.join(os.path.dirname(__file__), 'subject-tags.txt'), 'rb', 'utf-8')]
 _TAGS_ORG = [l.upper().rstrip() for l in codecs.open(os.path.join(os.path.dirname(__file__), 'organization-tags.txt'), 'rb', 'utf-8')]
 
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Utility functions shared by the tests.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import shutil
+import tempfile
+
+
+def _quote(value):
+    return u'"%s"' % value.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+
+
+def write_csv(filename, rows, encoding='utf-8', line_end=u'\n'):
+    """\
+    Writes the rows in the dialect of the Cablegate ``cables.csv`` and
+    returns the filename.
+
+    `filename`
+        The file to write.
+    `rows`
+        An iterable of rows (tuples of strings).
+    `encoding`
+        The encoding of the file (default: ``utf-8``).
+    `line_end`
+        The string which is written after each row (default: ``\\n``).
+    """
+    with open(filename, 'w', encoding=encoding, newline='') as f:
+        for row in rows:
+            f.write(u','.join(_quote(value) for value in row))
+            f.write(line_end)
+    return filename
+
+
+def with_tempdir(test, setup=None):
+    """\
+    Decorator which invokes `test` within a temp. directory. The directory
+    is removed after the test.
+
+    `test`
+        The test function.
+    `setup`
+        An optional function which accepts the directory and returns a
+        tuple of arguments of `test`. By default, the directory is provided
+        as first argument. Arguments with a ``close`` method are closed
+        after the test.
+    """
+    def run(*args):
+        directory = tempfile.mkdtemp()
+        try:
+            values = setup(directory) if setup else (directory,)
+            try:
+                test(*(values + args))
+            finally:
+                for value in values:
+                    if hasattr(value, 'close'):
+                        value.close()
+        finally:
+            shutil.rmtree(directory)
+    run.__name__ = test.__name__
+    run.__module__ = test.__module__
+    return run
@@ -14,7 +14,7 @@ Tests identifier c14n parsing.
 """
 from nose.tools import eq_
 from cablemap.core.consts import INVALID_CABLE_IDS, MALFORMED_CABLE_IDS
-from cablemap.core.c14n import canonicalize_id
+from cablemap.core.c14n import canonicalize_id, canonicalize_ids
 
 _TEST_DATA = (
     # input reference, expected id c14n
@@ -97,6 +97,14 @@ def test_c14n_illegal_ids():
         yield check, incorrect_id, correct_id
 
 
+def test_c14n_ids():
+    ids = [r for r, _ in _TEST_DATA] + list(MALFORMED_CABLE_IDS) + list(INVALID_CABLE_IDS)
+    ids += [u'', u'09', u'09BERLIN', u'foo', u'09STATE1\n09RIO1', u'05RIO123']
+    eq_([canonicalize_id(reference_id) for reference_id in ids], canonicalize_ids(ids))
+    eq_([c for _, c in _TEST_DATA], canonicalize_ids(r for r, _ in _TEST_DATA))
+    eq_([], canonicalize_ids([]))
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the persistent parse cache.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, ok_
+from helpers import write_csv, with_tempdir
+from cablemap.core import utils, cables_from_source
+from cablemap.core.cache import ParseCache, parser_version
+from cablemap.core.models import cable_from_row
+
+_CONTENT = u'''CONFIDENTIAL SECTION 01 OF 02 %(origin)s %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV
+SUBJECT: MEETING NUMBER %(sn)d
+
+REF: 08 STATE 1234
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+
+1. (C) SUMMARY: The minister said something. END SUMMARY.
+'''
+
+
+def _rows(subject_offset=0):
+    for i, origin in enumerate((u'BERLIN', u'MADRID', u'ROME') * 3):
+        sn = i + 100
+        yield (str(i), u'3/5/2009 12:34', u'09%s%d' % (origin, sn), u'Embassy', u'CONFIDENTIAL',
+               u'', u'FM AMEMBASSY %s' % origin, _CONTENT % {'origin': origin, 'sn': sn + subject_offset})
+
+
+def _summary(cables):
+    return [(c.reference_id, c.subject, c.references, c.classified_by, c.summary) for c in cables]
+
+
+def _fail(*args):
+    raise AssertionError('Unexpected parsing')
+
+
+def _with_source(test):
+    return with_tempdir(test, lambda directory: (write_csv(os.path.join(directory, 'cables.csv'), _rows()),
+                                                 os.path.join(directory, 'cache')))
+
+
+@_with_source
+def test_same_results(filename, cache_dir):
+    expected = _summary(cables_from_source(filename))
+    eq_(expected, _summary(cables_from_source(filename, cache_dir=cache_dir)))
+    eq_(expected, _summary(cables_from_source(filename, cache_dir=cache_dir)))
+    eq_(expected, _summary(cables_from_source(filename, workers=2, chunksize=2, cache_dir=cache_dir)))
+
+
+@_with_source
+def test_cached_cables_not_parsed(filename, cache_dir):
+    expected = _summary(cables_from_source(filename, cache_dir=cache_dir))
+    func = utils._record_from_row
+    utils._record_from_row = _fail
+    try:
+        eq_(expected, _summary(cables_from_source(filename, cache_dir=cache_dir)))
+    finally:
+        utils._record_from_row = func
+
+
+@_with_source
+def test_changed_cables_parsed(filename, cache_dir):
+    list(cables_from_source(filename, cache_dir=cache_dir))
+    write_csv(filename, _rows(subject_offset=1))
+    expected = _summary(cables_from_source(filename))
+    eq_(expected, _summary(cables_from_source(filename, cache_dir=cache_dir)))
+    eq_(u'MEETING NUMBER 101', expected[0][1])
+
+
+@_with_source
+def test_renumbered_cables_not_parsed(filename, cache_dir):
+    expected = _summary(cables_from_source(filename, cache_dir=cache_dir))
+    write_csv(filename, (('9%s' % row[0],) + row[1:5] + (u'09STATE1',) + row[6:] for row in _rows()))
+    func = utils._record_from_row
+    utils._record_from_row = _fail
+    try:
+        eq_(expected, _summary(cables_from_source(filename, cache_dir=cache_dir)))
+    finally:
+        utils._record_from_row = func
+
+
+@_with_source
+def test_version_change(filename, cache_dir):
+    row = next(_rows())
+    cache = ParseCache(cache_dir)
+    record = cache.record_from_row(row)
+    eq_(cable_from_row(row).subject, record.subject)
+    eq_(1, len(cache))
+    cache.close()
+    cache = ParseCache(cache_dir)
+    eq_(1, len(cache))
+    cache.close()
+    cache = ParseCache(cache_dir, version=parser_version() + u'-changed')
+    eq_(0, len(cache))
+    ok_(cache.get(ParseCache.key_from_row(row)) is None)
+    cache.close()
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the Parquet export.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from datetime import datetime, timezone
+from unittest import SkipTest
+from nose.tools import eq_, raises
+from helpers import write_csv, with_tempdir
+from cablemap.core import columnar, handle_source
+from cablemap.core.handler import DelegatingCableHandler
+from cablemap.core.models import cable_from_row
+
+_CONTENT = u'''CONFIDENTIAL BERLIN %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV, GM
+SUBJECT: MEETING NUMBER %(sn)d
+
+REF: A. 08 STATE 1234
+     B. 09 BERLIN 12
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+
+1. (C) SUMMARY: The minister said something. END SUMMARY.
+
+SMITH
+'''
+
+_HEADER = u'''VZCZCXRO%(sn)04d
+FM AMEMBASSY BERLIN
+TO RUEHC/SECSTATE WASHDC PRIORITY 3355'''
+
+
+def _rows(count):
+    for i in range(count):
+        values = {'sn': i + 100}
+        yield (str(i), u'3/5/2009 12:34', u'09BERLIN%d' % (i + 100), u'Embassy Berlin', u'CONFIDENTIAL',
+               u'', _HEADER % values, _CONTENT % values)
+
+
+def _write_csv(dirname, count):
+    return write_csv(os.path.join(dirname, 'cables.csv'), _rows(count))
+
+
+def setup_module():
+    if columnar.pa is None:
+        raise SkipTest('pyarrow is not installed')
+
+
+@with_tempdir
+def test_export(dirname):
+    filename = os.path.join(dirname, 'cables.parquet')
+    columnar.export_parquet(_write_csv(dirname, 25), filename, row_group_size=10)
+    eq_(3, columnar.pq.ParquetFile(filename).num_row_groups)
+    rows = list(columnar.rows_from_parquet(filename))
+    eq_(25, len(rows))
+    row = rows[0]
+    cable = cable_from_row(next(_rows(1)))
+    eq_(cable.reference_id, row['reference_id'])
+    eq_(cable.canonical_id, row['canonical_id'])
+    eq_(datetime(2009, 3, 5, 12, 34, tzinfo=timezone.utc), row['created'])
+    eq_(u'Embassy Berlin', row['origin'])
+    eq_(u'CONFIDENTIAL', row['classification'])
+    eq_(cable.subject, row['subject'])
+    eq_(cable.summary, row['summary'])
+    eq_(cable.transmission_id, row['transmission_id'])
+    eq_(u'2019-03-05', row['nondisclosure_deadline'])
+    eq_(cable.tags, row['tags'])
+    eq_([ref.value for ref in cable.references], [ref['value'] for ref in row['references']])
+    eq_([u'A', u'B'], [ref['bullet'] for ref in row['references']])
+    eq_([u'SECSTATE WASHDC'], [rec['name'] for rec in row['recipients']])
+    eq_([u'SMITH'], row['signers'])
+    eq_([u'Smith'], row['classificationists'])
+    eq_([u'B', u'D'], row['classification_categories'])
+    eq_(False, row['partial'])
+    eq_(False, 'content' in row)
+
+
+@raises(ValueError)
+@with_tempdir
+def test_incremental(dirname):
+    handle_source(_write_csv(dirname, 3), columnar.ParquetCableHandler(os.path.join(dirname, 'cables.parquet')),
+                  manifest=os.path.join(dirname, 'manifest.csv.gz'))
+
+
+@with_tempdir
+def test_read_columns(dirname):
+    filename = os.path.join(dirname, 'cables.parquet')
+    columnar.export_parquet(_write_csv(dirname, 5), filename, include_text=True)
+    table = columnar.read_parquet(filename, columns=['reference_id', 'tags'])
+    eq_(['reference_id', 'tags'], table.column_names)
+    eq_(5, table.num_rows)
+    rows = list(columnar.rows_from_parquet(filename, columns=['content']))
+    eq_(_CONTENT % {'sn': 100}, rows[0]['content'])
+
+
+@with_tempdir
+def test_events_and_batches(dirname):
+    source = _write_csv(dirname, 25)
+    batches, events = os.path.join(dirname, 'batches.parquet'), os.path.join(dirname, 'events.parquet')
+    handle_source(source, columnar.ParquetCableHandler(batches, row_group_size=10, include_text=True))
+    # The delegating handler hides handle_batch, so fine-grained events are issued
+    handle_source(source, DelegatingCableHandler(columnar.ParquetCableHandler(events, row_group_size=10, include_text=True)))
+    eq_(3, columnar.pq.ParquetFile(batches).num_row_groups)
+    eq_(list(columnar.rows_from_parquet(events)), list(columnar.rows_from_parquet(batches)))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
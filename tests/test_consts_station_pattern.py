@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the station trie patterns.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import re
+from nose.tools import eq_, ok_
+from cablemap.core import consts, reader
+
+
+def test_trie_pattern():
+    eq_(u'(?:A\\-B|BE(?:IJING|R(?:LIN|N))?)', consts._trie_pattern([u'BERLIN', u'BERN', u'BE', u'A-B', u'BEIJING']))
+    eq_(u'', consts._trie_pattern([]))
+
+
+def test_trie_pattern_prefer_longest():
+    pattern = re.compile(r'(%s)' % consts._trie_pattern([u'RIO', u'RIODEJANEIRO', u'RIODEJAN']))
+    eq_(u'RIODEJANEIRO', pattern.match(u'RIODEJANEIRO1').group(1))
+    eq_(u'RIODEJAN', pattern.match(u'RIODEJAN1').group(1))
+    eq_(u'RIO', pattern.match(u'RIODE1').group(1))
+
+
+def test_stations():
+    for station in consts._STATIONS:
+        eq_((u'09', station, u'123'), consts.REFERENCE_ID_PATTERN.match(u'09%s123' % station).groups())
+        ok_(not consts.REFERENCE_ID_PATTERN.match(u'09%sX123' % station))
+        ok_(not consts.REFERENCE_ID_PATTERN.match(u'09%s12345678' % station))
+
+
+def test_reader_c14n():
+    for origin, fixed in reader._C14N_FIXES.items():
+        eq_(origin, reader._C14N_PATTERN.match(u'09%s1' % origin).group(1))
+        eq_(u'09%s1' % fixed, reader.canonicalize_id(u'09%s1' % origin))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the facet index.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, ok_, raises
+from helpers import write_csv, with_tempdir
+from cablemap.core import consts, cables_from_source, handle_source
+from cablemap.core.handler import CableIdFilter
+from cablemap.core.facets import Bitmap, FacetIndexBuilder, build_facet_index
+from cablemap.core.predicates import origin_europe
+
+_CONTENT = u'''%(classification)s %(origin)s %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: %(tags)s
+SUBJECT: MEETING NUMBER %(sn)d
+
+1. (C) The minister said something.
+
+%(signer)s
+'''
+
+_CABLES = (
+    # reference id, created, classification, TAGs, signer
+    (u'08BERLIN100', u'3/5/2008 12:34', u'SECRET', u'PREL, GM', u'TIMKEN'),
+    (u'09BERLIN101', u'4/6/2009 12:34', u'SECRET', u'PREL, PGOV, GM', u'MURPHY'),
+    (u'09MADRID102', u'3/7/2009 12:34', u'CONFIDENTIAL', u'PREL, SP', u'AGUIRRE'),
+    (u'09CAIRO103', u'3/8/2009 12:34', u'SECRET', u'PREL, EG', u'SCOBEY'),
+    (u'09ROME104', u'12/9/2009 12:34', u'SECRET//NOFORN', u'ECON, IT', u'SPOGLI'),
+)
+
+
+def _rows():
+    for i, (reference_id, created, classification, tags, signer) in enumerate(_CABLES):
+        origin = reference_id[2:-3]
+        yield (str(i), created, reference_id, u'Embassy', classification, u'', u'FM AMEMBASSY %s' % origin,
+               _CONTENT % {'classification': classification, 'origin': origin, 'sn': 100 + i, 'tags': tags, 'signer': signer})
+
+
+def _index(directory):
+    source = write_csv(os.path.join(directory, 'cables.csv'), _rows())
+    return build_facet_index(source, os.path.join(directory, 'facets.db')), source
+
+
+def _with_index(test):
+    return with_tempdir(test, _index)
+
+
+def test_bitmap():
+    a, b = Bitmap(0b10110), Bitmap(0b00111)
+    eq_([1, 2, 4], list(a))
+    eq_(3, len(a))
+    ok_(2 in a)
+    ok_(0 not in a)
+    eq_([1, 2], list(a & b))
+    eq_([0, 1, 2, 4], list(a | b))
+    eq_([4], list(a - b))
+    eq_([0, 4], list(a ^ b))
+    ok_(not Bitmap())
+
+
+@_with_index
+def test_values(index, source):
+    eq_(5, len(index))
+    eq_({u'2008': 1, u'2009': 4}, index.values('year'))
+    eq_({u'SECRET': 3, u'CONFIDENTIAL': 1, u'SECRET//NOFORN': 1}, index.values('classification'))
+    eq_(4, index.values('tag')[u'PREL'])
+    eq_(5, index.values('tag_kind')[str(consts.TAG_KIND_GEO)])
+    eq_(5, index.values('tag_kind')[str(consts.TAG_KIND_SUBJECT)])
+    eq_(2, index.values('origin')[u'BERLIN'])
+
+
+@_with_index
+def test_query(index, source):
+    eq_([1, 3], list(index.query(year=2009, classification='SECRET', tag='PREL')))
+    eq_([1], list(index.query(origin=origin_europe, year=2009, classification='SECRET', tag='PREL')))
+    eq_([0, 1, 2], list(index.query(tag=['GM', 'SP'])))
+    eq_([2, 3], list(index.query(month=3) - index.query(origin='BERLIN')))
+    eq_([4], list(index.query(month=12)))
+    eq_([0], list(index.query(signer='Timken')))
+    eq_([], list(index.query(tag='KNNP')))
+    eq_([u'09BERLIN101', u'09CAIRO103'], index.reference_ids(index.query(year=2009, classification='SECRET', tag='PREL')))
+    eq_(5, len(index.query()))
+
+
+@_with_index
+def test_predicate(index, source):
+    pred = index.predicate(origin=origin_europe, tag='PREL')
+    eq_([u'08BERLIN100', u'09BERLIN101', u'09MADRID102'], [cable.reference_id for cable in cables_from_source(source, pred)])
+
+
+@raises(ValueError)
+@_with_index
+def test_unknown_facet(index, source):
+    index.query(color='red')
+
+
+@raises(ValueError)
+@_with_index
+def test_incremental(index, source):
+    handle_source(source, FacetIndexBuilder(source + '.db'), manifest=source + '.manifest')
+
+
+@raises(ValueError)
+def test_delete_cable():
+    builder = CableIdFilter(FacetIndexBuilder('facets.db'), lambda canonical_id: True)
+    builder.start()
+    builder.delete_cable(u'09BERLIN101', u'09BERLIN101')
+
+
+@_with_index
+def test_invalid_value(index, source):
+    for facet, value in (('tag', None), ('tag', 1), ('year', 2009.0), ('month', None), ('origin', 3),
+                         ('tag', [None]), ('year', True), ('tag_kind', None)):
+        try:
+            index.query(**{facet: value})
+            ok_(False, 'Expected a ValueError for %s=%r' % (facet, value))
+        except ValueError:
+            pass
+    eq_(5, len(index.query(tag_kind=consts.TAG_KIND_SUBJECT)))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
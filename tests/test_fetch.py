@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.fetch against a local HTTP server.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import sys
+import gzip
+import threading
+import subprocess
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from nose.tools import eq_, ok_
+from cablemap.core.fetch import FetchError, fetch_pages, cables_by_ids, cables_by_urls, _iterate
+
+_DATA = os.path.join(os.path.dirname(__file__), 'data-subject', 'in')
+
+_IDS = (u'07BERN881', u'08BRASILIA93', u'08REYKJAVIK195')
+
+_PATHS = {u'07BERN881': u'2007/09/07BERN881', u'08BRASILIA93': u'2008/01/08BRASILIA93',
+          u'08REYKJAVIK195': u'2008/09/08REYKJAVIK195'}
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = {}
+
+    def handle_error(self, request, client_address):
+        # The client closed the connection
+        pass
+
+    def base(self, prefix):
+        return 'http://127.0.0.1:%d/%s/' % (self.server_address[1], prefix)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for header in headers:
+            self.send_header(*header)
+        if ('Transfer-Encoding', 'chunked') in headers:
+            self.end_headers()
+            for i in range(0, len(body), 1000):
+                chunk = body[i:i + 1000]
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            n = self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+        mode, path = self.path[1:].split('/', 1)
+        name = path.rsplit('/', 1)[-1] + '.html'
+        if mode == 'down' or (mode == 'flaky' and n < 3) or (mode == 'partial' and name == '08BRASILIA93.html'):
+            return self._send(503)
+        if mode == 'missing' or not os.path.exists(os.path.join(_DATA, name)):
+            return self._send(404)
+        if mode == 'redirect':
+            return self._send(302, headers=(('Location', '/ok/' + path),))
+        with open(os.path.join(_DATA, name), 'rb') as f:
+            body = f.read()
+        if mode == 'gzip':
+            return self._send(200, gzip.compress(body), (('Content-Encoding', 'gzip'),
+                                                         ('Transfer-Encoding', 'chunked')))
+        self._send(200, body)
+
+
+def _run_server():
+    server = _Server()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def _fetch(server, modes, ids=_IDS, **kw):
+    kw.setdefault('backoff', 0.01)
+    kw.setdefault('search_base', None)
+    return list(cables_by_ids(ids, base_uris=[server.base(mode) for mode in modes], **kw))
+
+
+def test_fetch():
+    def check(modes):
+        server = _run_server()
+        try:
+            cables = _fetch(server, modes, concurrency=2)
+            eq_(sorted(_IDS), sorted(cable.reference_id for cable in cables))
+            for cable in cables:
+                ok_(cable.subject)
+        finally:
+            server.shutdown()
+    for modes in (['ok'], ['gzip'], ['redirect'], ['down', 'ok'], ['missing', 'gzip'], ['flaky']):
+        yield check, modes
+
+
+def test_keep_alive():
+    server = _run_server()
+    try:
+        eq_(12, len(_fetch(server, ['ok'], ids=_IDS * 4, concurrency=2)))
+        eq_(12, sum(server.requests.values()))
+        ok_(server.connections <= 2)
+    finally:
+        server.shutdown()
+
+
+def test_retries():
+    server = _run_server()
+    try:
+        eq_(3, len(_fetch(server, ['down', 'flaky'], concurrency=1)))
+        for reference_id in _IDS:
+            eq_(3, server.requests['/down/' + _PATHS[reference_id]])
+            eq_(3, server.requests['/flaky/' + _PATHS[reference_id]])
+    finally:
+        server.shutdown()
+
+
+def test_unknown():
+    server = _run_server()
+    try:
+        eq_([], _fetch(server, ['missing', 'ok'], ids=[u'22BERLIN1167', u'09BERLIN1167']))
+        eq_([u'/missing/2009/09/09BERLIN1167', u'/ok/2009/09/09BERLIN1167'], sorted(server.requests))
+    finally:
+        server.shutdown()
+
+
+def test_unavailable():
+    server = _run_server()
+    try:
+        eq_([], _fetch(server, ['down'], retries=1))
+    finally:
+        server.shutdown()
+
+
+def test_partial_failure():
+    server = _run_server()
+    try:
+        ids = _IDS + (u'09BERLIN1167',)
+        cables = _fetch(server, ['partial'], ids=ids, retries=1, concurrency=2)
+        eq_([u'07BERN881', u'08REYKJAVIK195'], sorted(cable.reference_id for cable in cables))
+        results = dict((reference_id, (page, error)) for reference_id, page, error in
+                       _iterate(fetch_pages(ids, base_uris=[server.base('partial')], retries=1, backoff=0.01,
+                                            search_base=None)))
+        eq_(sorted(ids), sorted(results))
+        ok_(isinstance(results[u'08BRASILIA93'][1], FetchError))
+        eq_(None, results[u'08BRASILIA93'][0])
+        eq_((None, None), results[u'09BERLIN1167'])
+        ok_(results[u'07BERN881'][0])
+        eq_(None, results[u'07BERN881'][1])
+    finally:
+        server.shutdown()
+
+
+def test_unsupported_url():
+    server = _run_server()
+    try:
+        urls = [u'ftp://127.0.0.1/%s' % _PATHS[u'07BERN881'], server.base('ok') + _PATHS[u'08BRASILIA93']]
+        # Not retried, otherwise the backoff would take more than a minute
+        results = list(_iterate(fetch_pages([u'07BERN881', u'08BRASILIA93'], base_uris=[u'ftp://127.0.0.1/'],
+                                            retries=3, backoff=10, search_base=None)))
+        eq_(2, len(results))
+        for reference_id, page, error in results:
+            eq_(None, page)
+            ok_(isinstance(error, FetchError))
+        # An unsupported mirror does not prevent the next mirror from being used
+        cables = cables_by_ids([u'07BERN881'], base_uris=[u'ftp://127.0.0.1/', server.base('ok')], backoff=10,
+                               search_base=None)
+        eq_([u'07BERN881'], [cable.reference_id for cable in cables])
+        eq_([u'08BRASILIA93'], [cable.reference_id for cable in cables_by_urls(urls, retries=3, backoff=10)])
+    finally:
+        server.shutdown()
+
+
+def test_lazy_import():
+    code = 'import sys, cablemap.core; print("cablemap.core.fetch" in sys.modules)'
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    eq_(b'False', subprocess.check_output([sys.executable, '-c', code], cwd=root).strip())
+
+
+def test_cables_by_urls():
+    server = _run_server()
+    try:
+        urls = [server.base('gzip') + _PATHS[reference_id] for reference_id in _IDS]
+        cables = list(cables_by_urls(urls + [server.base('missing') + u'x'], backoff=0.01))
+        eq_(sorted(_IDS), sorted(cable.reference_id for cable in cables))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the citation index.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, ok_, raises
+from helpers import write_csv, with_tempdir
+from cablemap.core import handle_source
+from cablemap.core.graph import build_citation_index, CitationIndex, CitationIndexBuilder
+
+_CONTENT = u'''CONFIDENTIAL SECTION 01 OF 02 %(origin)s %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV
+SUBJECT: MEETING NUMBER %(sn)d
+
+%(refs)s
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+'''
+
+# reference id -> cited cables
+_CITATIONS = (
+    (u'09BERLIN100', (u'08 STATE 1234',)),
+    (u'09BERLIN101', (u'09 BERLIN 100', u'08 STATE 1234')),
+    (u'09MADRID102', (u'09 BERLIN 101', u'09 MADRID 102')),
+    (u'09ROME103', (u'09 MADRID 102', u'08 STATE 1234', u'09 BERLIN 101')),
+    (u'09ROME104', ()),
+)
+
+
+def _rows():
+    for i, (reference_id, refs) in enumerate(_CITATIONS):
+        origin = reference_id[2:-3]
+        refs = u'REF: %s' % u' '.join(u'%s. %s' % (u'ABC'[j], ref) for j, ref in enumerate(refs)) if refs else u''
+        yield (str(i), u'3/5/2009 12:34', reference_id, u'Embassy', u'CONFIDENTIAL',
+               u'', u'FM AMEMBASSY %s' % origin, _CONTENT % {'origin': origin, 'sn': 100 + i, 'refs': refs})
+
+
+def _write_csv(directory):
+    return write_csv(os.path.join(directory, 'cables.csv'), _rows())
+
+
+def _with_index(test):
+    return with_tempdir(test, lambda directory: (build_citation_index(_write_csv(directory),
+                                                                      os.path.join(directory, 'citations.idx')),))
+
+
+@_with_index
+def test_nodes(index):
+    eq_([u'08STATE1234', u'09BERLIN100', u'09BERLIN101', u'09MADRID102', u'09ROME103', u'09ROME104'], list(index))
+    eq_(6, len(index))
+    ok_(u'08STATE1234' in index)
+    ok_(u'10STATE1' not in index)
+    ok_(index.is_known(u'09ROME104'))
+    ok_(not index.is_known(u'08STATE1234'))
+
+
+@_with_index
+def test_cites(index):
+    eq_([u'08STATE1234', u'09BERLIN101', u'09MADRID102'], index.cites(u'09ROME103'))
+    eq_([u'09BERLIN101'], index.cites(u'09MADRID102'))
+    eq_([], index.cites(u'09ROME104'))
+    eq_([], index.cites(u'10STATE1'))
+
+
+@_with_index
+def test_cited_by(index):
+    eq_([u'09BERLIN100', u'09BERLIN101', u'09ROME103'], index.cited_by(u'08STATE1234'))
+    eq_([u'09MADRID102', u'09ROME103'], index.cited_by(u'09BERLIN101'))
+    eq_([], index.cited_by(u'09ROME103'))
+
+
+@_with_index
+def test_neighbours(index):
+    eq_([u'09BERLIN101'], index.neighbours(u'09MADRID102'))
+    eq_([u'08STATE1234', u'09BERLIN100', u'09BERLIN101'], index.neighbours(u'09MADRID102', hops=2))
+    eq_([u'09BERLIN101', u'09MADRID102', u'09ROME103'], index.neighbours(u'09BERLIN100', hops=3, direction='in'))
+    eq_([u'08STATE1234', u'09BERLIN100', u'09MADRID102', u'09ROME103'], index.neighbours(u'09BERLIN101', direction='both'))
+
+
+@_with_index
+def test_most_cited(index):
+    eq_([(u'08STATE1234', 3), (u'09BERLIN101', 2)], index.most_cited(2))
+    eq_(4, len(index.most_cited(10)))
+    eq_(1, index.citation_count(u'09MADRID102'))
+    eq_(0, index.citation_count(u'10STATE1'))
+
+
+@raises(ValueError)
+@with_tempdir
+def test_incremental(directory):
+    handle_source(_write_csv(directory), CitationIndexBuilder(os.path.join(directory, 'citations.idx')),
+                  manifest=os.path.join(directory, 'manifest.csv.gz'))
+
+
+@raises(ValueError)
+def test_delete_cable():
+    builder = CitationIndexBuilder('citations.idx')
+    builder.start()
+    builder.delete_cable(u'09BERLIN101', u'09BERLIN101')
+
+
+@raises(ValueError)
+@with_tempdir
+def test_invalid_file(directory):
+    filename = os.path.join(directory, 'citations.idx')
+    with open(filename, 'wb') as f:
+        f.write(b'no citation index' * 4)
+    CitationIndex(filename)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the batch event API.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_, ok_
+from cablemap.core.models import cable_from_row
+from cablemap.core.handler import handle_cables, is_batch_handler, BatchCableHandler, \
+    NoopCableHandler, DelegatingCableHandler
+
+_CONTENT = u'''CONFIDENTIAL BERLIN %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV
+SUBJECT: MEETING NUMBER %(sn)d
+
+REF: 08 STATE 1234
+'''
+
+
+def _cables(count):
+    return [cable_from_row((str(sn), u'3/5/2009 12:34', u'09BERLIN%d' % sn, u'Embassy Berlin', u'CONFIDENTIAL',
+                            u'', u'FM AMEMBASSY BERLIN', _CONTENT % {'sn': sn}))
+            for sn in range(100, 100 + count)]
+
+
+class _RecordingHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.events.append((name,) + args)
+        return record
+
+
+class _BatchHandler(object):
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        self.events = []
+
+    def start(self):
+        self.events.append('start')
+
+    def end(self):
+        self.events.append('end')
+
+    def handle_batch(self, cables):
+        self.events.append([cable.reference_id for cable in cables])
+
+
+def test_is_batch_handler():
+    ok_(is_batch_handler(_BatchHandler()))
+    ok_(is_batch_handler(BatchCableHandler(NoopCableHandler())))
+    ok_(not is_batch_handler(NoopCableHandler()))
+    ok_(not is_batch_handler(_RecordingHandler()))
+    ok_(not is_batch_handler(DelegatingCableHandler(_BatchHandler())))
+
+
+def test_batches():
+    handler = _BatchHandler(batch_size=2)
+    handle_cables(_cables(5), handler)
+    eq_(['start', [u'09BERLIN100', u'09BERLIN101'], [u'09BERLIN102', u'09BERLIN103'], [u'09BERLIN104'], 'end'],
+        handler.events)
+
+
+def test_default_batch_size():
+    handler = _BatchHandler()
+    handle_cables(_cables(5), handler)
+    eq_(3, len(handler.events))
+
+
+def test_adapter():
+    cables = _cables(5)
+    expected, recorder = _RecordingHandler(), _RecordingHandler()
+    handle_cables(cables, expected)
+    handle_cables(cables, BatchCableHandler(recorder, batch_size=2))
+    eq_(expected.events, recorder.events)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
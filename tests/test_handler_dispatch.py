@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the event dispatch of the handlers in `cablemap.core.handler`.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_
+from cablemap.core.handler import NoopCableHandler, DelegatingCableHandler, \
+    LoggingCableHandler, TeeCableHandler, MultipleCableHandler, CableIdFilter
+
+
+class _RecordingHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.events.append((name,) + args)
+        return record
+
+
+def _emit(handler):
+    handler.start()
+    for reference_id in (u'09BERLIN1', u'09MADRID2', u'09BERLIN3'):
+        handler.start_cable(reference_id, reference_id)
+        handler.handle_subject(u'Subject of %s' % reference_id)
+        handler.handle_tag(u'PREL')
+        handler.end_cable()
+    handler.end()
+
+
+def _expected(accept=lambda canonical_id: True):
+    handler = _RecordingHandler()
+    handler.start()
+    for reference_id in (u'09BERLIN1', u'09MADRID2', u'09BERLIN3'):
+        if accept(reference_id):
+            handler.start_cable(reference_id, reference_id)
+            handler.handle_subject(u'Subject of %s' % reference_id)
+            handler.handle_tag(u'PREL')
+            handler.end_cable()
+    handler.end()
+    return handler.events
+
+
+def test_noop():
+    handler = NoopCableHandler()
+    _emit(handler)
+    _emit(handler)
+
+
+def test_delegating():
+    recorder = _RecordingHandler()
+    for handler in (DelegatingCableHandler(recorder), LoggingCableHandler(recorder, level='debug')):
+        recorder.events = []
+        _emit(handler)
+        _emit(handler)
+        eq_(_expected() * 2, recorder.events)
+
+
+def test_tee():
+    first, second = _RecordingHandler(), _RecordingHandler()
+    handler = TeeCableHandler(first, second)
+    _emit(handler)
+    _emit(handler)
+    eq_(_expected() * 2, first.events)
+    eq_(_expected() * 2, second.events)
+
+
+def test_multiple():
+    recorders = [_RecordingHandler() for _ in range(3)]
+    handler = MultipleCableHandler(recorders)
+    _emit(handler)
+    for recorder in recorders:
+        eq_(_expected(), recorder.events)
+
+
+def test_cable_id_filter():
+    accept = lambda canonical_id: u'BERLIN' in canonical_id
+    recorder = _RecordingHandler()
+    handler = CableIdFilter(recorder, accept)
+    _emit(handler)
+    _emit(handler)
+    eq_(_expected(accept) * 2, recorder.events)
+
+
+def test_chain():
+    accept = lambda canonical_id: u'MADRID' in canonical_id
+    first, second = _RecordingHandler(), _RecordingHandler()
+    handler = LoggingCableHandler(CableIdFilter(TeeCableHandler(first, MultipleCableHandler([second])), accept), level='debug')
+    _emit(handler)
+    eq_(_expected(accept), first.events)
+    eq_(_expected(accept), second.events)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests incremental runs of `handle_source`.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, ok_
+from helpers import write_csv, with_tempdir
+from cablemap.core import handle_source
+from cablemap.core.handler import CableIdFilter
+
+_CONTENT = u'''CONFIDENTIAL SECTION 01 OF 02 %(origin)s %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV
+SUBJECT: MEETING NUMBER %(subject)s
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+'''
+
+
+def _rows(numbers, changed=()):
+    for sn in numbers:
+        origin = (u'BERLIN', u'MADRID', u'ROME')[sn % 3]
+        subject = u'%d%s' % (sn, u' (CORRECTED)' if sn in changed else u'')
+        yield (str(sn), u'3/5/2009 12:34', u'09%s%d' % (origin, sn), u'Embassy', u'CONFIDENTIAL',
+               u'', u'FM AMEMBASSY %s' % origin, _CONTENT % {'origin': origin, 'sn': sn, 'subject': subject})
+
+
+class _RecordingHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.events.append((name,) + args)
+        return record
+
+    def started(self):
+        return [e[1] for e in self.events if e[0] == 'start_cable']
+
+    def deleted(self):
+        return [e[1:] for e in self.events if e[0] == 'delete_cable']
+
+
+def _run(filename, manifest, **kw):
+    handler = _RecordingHandler()
+    handle_source(filename, handler, manifest=manifest, **kw)
+    return handler
+
+
+def _with_source(test):
+    return with_tempdir(test, lambda directory: (os.path.join(directory, 'cables.csv'),
+                                                 os.path.join(directory, 'manifest.csv.gz')))
+
+
+@_with_source
+def test_first_run(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    handler = _run(filename, manifest)
+    eq_(6, len(handler.started()))
+    eq_([], handler.deleted())
+    eq_(('start',), handler.events[0])
+    eq_(('end',), handler.events[-1])
+    ok_(os.path.exists(manifest))
+
+
+@_with_source
+def test_unchanged(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    _run(filename, manifest)
+    handler = _run(filename, manifest)
+    eq_([('start',), ('end',)], handler.events)
+
+
+@_with_source
+def test_renumbered(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    _run(filename, manifest)
+    write_csv(filename, (('9%s' % row[0],) + row[1:] for row in _rows(range(100, 106))))
+    handler = _run(filename, manifest)
+    eq_([('start',), ('end',)], handler.events)
+
+
+@_with_source
+def test_new_changed_deleted(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    _run(filename, manifest)
+    write_csv(filename, _rows([100, 101, 103, 104, 106], changed=[103]))
+    handler = _run(filename, manifest, workers=2)
+    eq_([u'09MADRID103', u'09MADRID106'], handler.started())
+    eq_([(u'09BERLIN102', u'09BERLIN102'), (u'09BERLIN105', u'09BERLIN105')], handler.deleted())
+    handler = _run(filename, manifest)
+    eq_([('start',), ('end',)], handler.events)
+
+
+@_with_source
+def test_predicate(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    _run(filename, manifest)
+    write_csv(filename, _rows(range(100, 104)))
+    pred = lambda reference_id: u'MADRID' in reference_id
+    handler = _run(filename, manifest, predicate=pred)
+    eq_([], handler.started())
+    eq_([], handler.deleted())
+    handler = _run(filename, manifest)
+    eq_([(u'09BERLIN105', u'09BERLIN105'), (u'09ROME104', u'09ROME104')], handler.deleted())
+
+
+@_with_source
+def test_filter(filename, manifest):
+    write_csv(filename, _rows(range(100, 106)))
+    _run(filename, manifest)
+    write_csv(filename, _rows(range(100, 104)))
+    handler = _RecordingHandler()
+    handle_source(filename, CableIdFilter(handler, lambda canonical_id: u'BERLIN' in canonical_id),
+                  manifest=manifest)
+    eq_([(u'09BERLIN105', u'09BERLIN105')], handler.deleted())
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
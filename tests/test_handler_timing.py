@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.handler.TimingCableHandler
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import io
+import os
+import re
+import json
+import threading
+import logging
+from nose.tools import eq_, ok_, raises
+from helpers import write_csv, with_tempdir
+from cablemap.core import reader, models, utils, handler as handler_module
+from cablemap.core.handler import handle_cables, handle_source, TimingCableHandler, \
+    DefaultMetadataOnlyFilter, NoopCableHandler
+from cablemap.core.models import cable_from_row
+from cablemap.core.timing import Timings, instrument, BOUNDED, UNPARSED
+
+_CONTENT = u'''CONFIDENTIAL BERLIN %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV
+SUBJECT: MEETING NUMBER %(sn)d
+
+REF: 08 STATE 1234
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+'''
+
+
+def _rows(count):
+    return [(str(sn), u'3/5/2009 12:34', u'09BERLIN%d' % sn, u'Embassy Berlin', u'CONFIDENTIAL',
+             u'', u'FM AMEMBASSY BERLIN', _CONTENT % {'sn': sn}) for sn in range(100, 100 + count)]
+
+
+def _originals():
+    return [getattr(reader, name) for name in ('parse_subject', 'parse_references', '_clean_html')] \
+           + [models.cable_from_row, utils.cable_from_row, utils.titlefy, handler_module.titlefy]
+
+
+def test_stages():
+    originals = _originals()
+    report = io.StringIO()
+    handler = TimingCableHandler(DefaultMetadataOnlyFilter(NoopCableHandler()), slowest=2, report=report)
+    handle_cables((cable_from_row(row) for row in _rows(5)), handler)
+    eq_(originals, _originals())
+    stats = dict((stat['name'], stat) for stat in handler.timings.stats())
+    for name in ('reader.parse_subject', 'reader.parse_references', 'reader.parse_tags', 'titlefy',
+                 'handler.start', 'handler.end', 'handler.start_cable', 'handler.handle_subject',
+                 'source', 'cable'):
+        ok_(name in stats, name)
+    eq_(5, stats['reader.parse_subject']['calls'])
+    eq_(5, stats['cable']['calls'])
+    eq_(1, stats['handler.start']['calls'])
+    eq_(2, len(stats['cable']['slowest']))
+    ok_(set(reference_id for reference_id, _ in stats['reader.parse_tags']['slowest'])
+        <= set(row[2] for row in _rows(5)))
+    text = report.getvalue()
+    ok_(text.startswith('stage'))
+    ok_('reader.parse_subject' in text)
+
+
+@with_tempdir
+def test_json(directory):
+    csv_filename = write_csv(os.path.join(directory, 'cables.csv'), _rows(3))
+    json_filename = os.path.join(directory, 'timings.json')
+    handle_source(csv_filename, TimingCableHandler(NoopCableHandler(), json_file=json_filename))
+    with open(json_filename) as f:
+        stats = dict((stat['name'], stat) for stat in json.load(f)['stages'])
+    eq_(3, stats['cable_from_row']['calls'])
+    eq_(3, stats['source']['calls'])
+    eq_(u'09BERLIN10', stats['cable_from_row']['slowest'][0][0][:10])
+
+
+# Backtracks exponentially on a long line of "a" characters
+_PATHOLOGICAL_PATTERN = re.compile(r'(a+)+b')
+
+
+def _slow_subject(content, reference_id=None, clean=True, sections=None):
+    return u'matched' if _PATHOLOGICAL_PATTERN.match(content) else content[:10]
+
+
+def _run_with_budget(bounded_size, contents):
+    original = reader.parse_subject
+    reader.parse_subject = _slow_subject
+    try:
+        timings = Timings()
+        restore = instrument(timings, budget=0.05, bounded_size=bounded_size)
+        try:
+            result = []
+            for i, content in enumerate(contents):
+                timings.reference_id = u'09BERLIN%d' % i
+                result.append(reader.parse_subject(content, timings.reference_id))
+        finally:
+            restore()
+        eq_(_slow_subject, reader.parse_subject)
+    finally:
+        reader.parse_subject = original
+    return timings, result
+
+
+def test_budget_bounded():
+    timings, result = _run_with_budget(12, [u'Meeting', u'a' * 40])
+    eq_([u'Meeting', u'aaaaaaaaaa'], result)
+    eq_([(u'reader.parse_subject', u'09BERLIN1', BOUNDED)],
+        [(name, reference_id, outcome) for name, reference_id, _, outcome in timings.exceeded])
+    eq_(2, timings.stats()[0]['calls'])
+    ok_('09BERLIN1' in timings.report())
+
+
+def test_budget_unparsed():
+    timings, result = _run_with_budget(35, [u'a' * 40, u'a' * 30])
+    eq_([u'', u''], result)
+    eq_([(u'reader.parse_subject', u'09BERLIN0', UNPARSED), (u'reader.parse_subject', u'09BERLIN1', UNPARSED)],
+        [(name, reference_id, outcome) for name, reference_id, _, outcome in timings.exceeded])
+    out = io.StringIO()
+    timings.dump(out)
+    eq_(UNPARSED, json.loads(out.getvalue())['exceeded'][0]['outcome'])
+
+
+
+@raises(RuntimeError)
+def test_nested_instrument():
+    restore = instrument(Timings())
+    try:
+        instrument(Timings())
+    finally:
+        restore()
+
+
+def test_nested_handler():
+    outer = TimingCableHandler(NoopCableHandler())
+    outer.start()
+    try:
+        try:
+            TimingCableHandler(NoopCableHandler()).start()
+            ok_(False, 'Expected a RuntimeError')
+        except RuntimeError:
+            pass
+    finally:
+        outer.end()
+    # Usable again after the outer handler finished
+    restore = instrument(Timings())
+    restore()
+    restore()
+
+
+def test_concurrent_instrument():
+    restore = instrument(Timings())
+    errors = []
+    def run():
+        try:
+            instrument(Timings())()
+        except RuntimeError as ex:
+            errors.append(ex)
+    try:
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+    finally:
+        restore()
+    eq_(1, len(errors))
+    eq_(reader.parse_subject.__name__, 'parse_subject')
+    ok_(not hasattr(reader.parse_subject, '__wrapped__'))
+
+
+@raises(ValueError)
+def test_budget_workers():
+    handle_source(os.path.join(os.path.dirname(__file__), 'data-subject', 'in'),
+                  TimingCableHandler(NoopCableHandler(), budget=0.1), workers=2)
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_budget_thread_warning():
+    records = _Records()
+    logger = logging.getLogger('cablemap.core.timing')
+    logger.addHandler(records)
+    try:
+        thread = threading.Thread(target=lambda: instrument(Timings(), budget=0.1)())
+        thread.start()
+        thread.join()
+        eq_(1, len(records.records))
+        ok_('main thread' in records.records[0].getMessage())
+        instrument(Timings(), budget=0.1)()
+        eq_(1, len(records.records))
+    finally:
+        logger.removeHandler(records)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
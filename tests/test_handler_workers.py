@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests parsing cables with multiple processes.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import pickle
+from nose.tools import eq_, ok_
+from helpers import write_csv, with_tempdir
+from cablemap.core import handle_source, cables_from_source
+from cablemap.core.models import cable_from_row, cable_record, CableRecord
+
+_CONTENT = u'''CONFIDENTIAL SECTION 01 OF 02 %(origin)s %(sn)06d
+
+SIPDIS
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV, %(tag)s
+SUBJECT: MEETING NUMBER %(sn)d
+
+REF: A. 08 STATE 1234
+     B. 09 %(origin)s 12
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+
+1. (C) SUMMARY: The minister said something. END SUMMARY.
+
+2. (C) COMMENT: The minister said nothing. END COMMENT.
+
+SMITH
+'''
+
+_HEADER = u'''VZCZCXRO%(sn)04d
+DE RUEHRL #%(sn)04d/01 0641234
+P 051234Z MAR 09
+FM AMEMBASSY %(origin)s
+TO RUEHC/SECSTATE WASHDC PRIORITY 3355
+INFO RUCNMEM/EU MEMBER STATES COLLECTIVE'''
+
+
+def _rows():
+    for i, (origin, tag) in enumerate(((u'BERLIN', u'GM'), (u'MADRID', u'SP'), (u'ROME', u'IT')) * 5):
+        values = {'origin': origin, 'tag': tag, 'sn': i + 100}
+        yield (str(i), u'3/5/2009 12:34', u'09%s%d' % (origin, i + 100), u'Embassy', u'CONFIDENTIAL',
+               u'', _HEADER % values, _CONTENT % values)
+
+
+def _write_csv(directory):
+    return write_csv(os.path.join(directory, 'cables.csv'), _rows())
+
+
+class _RecordingHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.events.append((name,) + args)
+        return record
+
+
+def _events(filename, **kw):
+    handler = _RecordingHandler()
+    handle_source(filename, handler, **kw)
+    return handler.events
+
+
+def test_record():
+    cable = cable_from_row(next(_rows()))
+    record = pickle.loads(pickle.dumps(cable_record(cable)))
+    ok_(isinstance(record, CableRecord))
+    eq_(cable.reference_id, record.reference_id)
+    eq_(cable.subject, record.subject)
+    eq_(cable.tags, record.tags)
+    eq_(cable.references, record.references)
+    eq_(cable.recipients, record.recipients)
+    eq_([u'B', u'D'], record.classification_categories)
+    eq_(u'The minister said nothing.', record.comment)
+
+
+@with_tempdir
+def test_workers_input_order(directory):
+    filename = _write_csv(directory)
+    expected = _events(filename)
+    eq_(15, len([e for e in expected if e[0] == 'start_cable']))
+    eq_(expected, _events(filename, workers=2))
+    eq_(expected, _events(filename, workers=3))
+
+
+@with_tempdir
+def test_workers_predicate(directory):
+    filename = _write_csv(directory)
+    pred = lambda ref: u'ROME' in ref
+    ids = [cable.reference_id for cable in cables_from_source(filename, pred, workers=2, chunksize=2)]
+    eq_([u'09ROME102', u'09ROME105', u'09ROME108', u'09ROME111', u'09ROME114'], ids)
+
+
+@with_tempdir
+def test_workers_key(directory):
+    filename = _write_csv(directory)
+    key = lambda cable: cable.canonical_id
+    expected = _events(filename, key=key)
+    starts = [e[2] for e in expected if e[0] == 'start_cable']
+    eq_(sorted(starts), starts)
+    eq_(expected, _events(filename, workers=2, key=key))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.models.Cable
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import pickle
+from nose.tools import eq_, ok_
+from cablemap.core.models import Cable
+
+_CONTENT = u'''CONFIDENTIAL BERLIN 001167
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV, GM
+SUBJECT: FIRST SUBJECT
+
+REF: 09 BERLIN 12
+
+Classified By: Ambassador Smith for reasons 1.4 (b) and (d)
+
+1. (C) Bla.
+
+SMITH
+'''
+
+_HEADER = u'''VZCZCXRO1234
+FM AMEMBASSY BERLIN
+TO RUEHC/SECSTATE WASHDC PRIORITY 3355'''
+
+
+def _cable():
+    cable = Cable(u'09BERLIN1167')
+    cable.created = u'2009-03-05 12:34'
+    cable.header = _HEADER
+    cable.content = _CONTENT
+    return cable
+
+
+def test_cached():
+    cable = _cable()
+    tags = cable.tags
+    eq_([u'PREL', u'PGOV', u'GM'], tags)
+    ok_(tags is cable.tags)
+    ok_(cable.references is cable.references)
+    ok_(cable.recipients is cable.recipients)
+
+
+def test_no_instance_dict():
+    ok_(not hasattr(_cable(), '__dict__'))
+
+
+def test_invalidate_content():
+    cable = _cable()
+    eq_(u'FIRST SUBJECT', cable.subject)
+    recipients = cable.recipients
+    cable.content = _CONTENT.replace(u'FIRST SUBJECT', u'SECOND SUBJECT').replace(u'GM', u'SP')
+    eq_(u'SECOND SUBJECT', cable.subject)
+    eq_([u'PREL', u'PGOV', u'SP'], cable.tags)
+    ok_(recipients is cable.recipients)
+
+
+def test_invalidate_header():
+    cable = _cable()
+    eq_(u'VZCZCXRO1234', cable.transmission_id)
+    eq_(u'SECSTATE WASHDC', cable.recipients[0].name)
+    cable.header = _HEADER.replace(u'1234', u'5678').replace(u'SECSTATE', u'SECDEF')
+    eq_(u'VZCZCXRO5678', cable.transmission_id)
+    eq_(u'SECDEF WASHDC', cable.recipients[0].name)
+
+
+def test_invalidate_created():
+    cable = _cable()
+    eq_([u'09BERLIN12'], [ref.value for ref in cable.references])
+    ok_(cable.wl_uris[0].endswith(u'/2009/03/09BERLIN1167'))
+    cable.created = u'2008-01-02 00:00'
+    ok_(cable.wl_uris[0].endswith(u'/2008/01/09BERLIN1167'))
+
+
+def test_invalidate_reference_id():
+    cable = _cable()
+    eq_(u'09BERLIN1167', cable.canonical_id)
+    cable.reference_id = u'09BERLIN12'
+    eq_(u'09BERLIN12', cable.canonical_id)
+    eq_([], cable.references)
+
+
+def test_pickle():
+    cable = _cable()
+    eq_(u'FIRST SUBJECT', cable.subject)
+    cable2 = pickle.loads(pickle.dumps(cable))
+    eq_(cable.reference_id, cable2.reference_id)
+    eq_(cable.content, cable2.content)
+    eq_(cable.subject, cable2.subject)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
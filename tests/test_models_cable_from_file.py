@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.models.cable_from_file against cable_from_html.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import codecs
+import shutil
+import tempfile
+from nose.tools import eq_, raises
+from cablemap.core import reader
+from cablemap.core.models import cable_from_file, cable_from_html, cable_record
+
+_DATA = os.path.join(os.path.dirname(__file__), 'data-subject', 'in')
+
+
+def _state(cable):
+    return cable_record(cable).__getstate__()
+
+
+def test_same_results():
+    def check(filename):
+        html = codecs.open(filename, 'rb', 'utf-8').read()
+        eq_(_state(cable_from_html(html, reader.reference_id_from_filename(filename))),
+            _state(cable_from_file(filename)))
+    for name in sorted(os.listdir(_DATA)):
+        yield check, os.path.join(_DATA, name)
+
+
+def test_section_offsets():
+    def check(html):
+        data = html.encode('utf-8')
+        eq_(reader._CONTENT_PATTERN.findall(html),
+            [data[start:end].decode('utf-8') for start, end in reader._section_offsets(data)])
+    for html in (u'', u'<code><pre>a</pre></code>', u'<code><pre></pre></code>x</pre></code>',
+                 u'<code><pre></pre></code>', u'<code><pre>ä</pre></code><code><pre>ö<code><pre>b</pre></code>',
+                 u'<code><pre>a</pre></code> <code><pre>b'):
+        yield check, html
+
+
+def _write(content):
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, '09BERLIN1167.html')
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return directory, filename
+
+
+@raises(ValueError)
+def test_empty_file():
+    directory, filename = _write(b'')
+    try:
+        cable_from_file(filename)
+    finally:
+        shutil.rmtree(directory)
+
+
+@raises(ValueError)
+def test_no_table():
+    directory, filename = _write(b'<html><code><pre>a</pre></code></html>')
+    try:
+        cable_from_file(filename)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.monthindex
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import csv
+import gzip
+import shutil
+import tempfile
+from nose.tools import eq_, ok_, raises
+from cablemap.core import monthindex
+from cablemap.core.monthindex import MonthIndex, build_month_index, month_index
+
+_ROWS = ((u'09BERLIN1167', u'2'), (u'05RIO123', u'12'), (u'08SECSTATE12', u'1'),
+         (u'10MADRID87', u'9'), (u'09BERLIN116', u'3'), (u'09BERLIN11670', u'11'))
+
+
+def _build(rows=_ROWS, compress=False):
+    directory = tempfile.mkdtemp()
+    source = os.path.join(directory, 'cable2month.csv' + ('.gz' if compress else ''))
+    with (gzip.open(source, 'wt') if compress else open(source, 'w')) as f:
+        csv.writer(f).writerows(rows)
+    filename = os.path.join(directory, 'cable2month.idx')
+    build_month_index(source, filename)
+    return directory, source, filename
+
+
+def test_lookup():
+    def check(compress):
+        directory, source, filename = _build(compress=compress)
+        try:
+            with MonthIndex(filename, source) as index:
+                eq_(len(_ROWS), len(index))
+                for reference_id, month in _ROWS:
+                    ok_(reference_id in index)
+                    eq_(month, index.get(reference_id))
+                    eq_(month, index[reference_id])
+                for reference_id in (u'09BERLIN11', u'09BERLIN11671', u'', u'00AAA1', u'99ZZZ1', u'09BERLIN1167X' * 3,
+                                     u'09BÉRLIN1'):
+                    ok_(reference_id not in index)
+                    eq_(None, index.get(reference_id))
+                    eq_(u'x', index.get(reference_id, u'x'))
+        finally:
+            shutil.rmtree(directory)
+    for compress in (False, True):
+        yield check, compress
+
+
+def test_empty():
+    directory, source, filename = _build(rows=())
+    try:
+        with MonthIndex(filename) as index:
+            eq_(0, len(index))
+            eq_(None, index.get(u'09BERLIN1167'))
+    finally:
+        shutil.rmtree(directory)
+
+
+@raises(KeyError)
+def test_missing_key():
+    directory, source, filename = _build()
+    try:
+        with MonthIndex(filename) as index:
+            index[u'09BERLIN1']
+    finally:
+        shutil.rmtree(directory)
+
+
+@raises(ValueError)
+def test_not_an_index():
+    directory, source, filename = _build()
+    try:
+        MonthIndex(source)
+    finally:
+        shutil.rmtree(directory)
+
+
+@raises(ValueError)
+def test_outdated():
+    directory, source, filename = _build()
+    try:
+        with open(source, 'a') as f:
+            f.write(u'10MADRID88,4\r\n')
+        MonthIndex(filename, source)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_month_index():
+    index = month_index()
+    ok_(index is month_index())
+    eq_(u'9', index.get(u'09BERLIN1167'))
+    eq_(None, index.get(u'22BERLIN1167'))
+
+
+def test_index_filenames():
+    directory, source, filename = _build()
+    previous = os.environ.get('XDG_CACHE_HOME')
+    os.environ['XDG_CACHE_HOME'] = directory
+    try:
+        filenames = list(monthindex._index_filenames(source))
+        eq_(2, len(filenames))
+        eq_(os.path.join(directory, 'cablemap'), os.path.dirname(filenames[0]))
+        eq_(tempfile.gettempdir(), os.path.dirname(filenames[1]))
+        st = os.stat(source)
+        for name in filenames:
+            ok_(name.endswith('-%d-%d.idx' % (st.st_size, int(st.st_mtime))), name)
+        with open(source, 'a') as f:
+            f.write(u'10MADRID88,4\r\n')
+        ok_(filenames[0] != next(monthindex._index_filenames(source)))
+    finally:
+        if previous is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = previous
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the origin predicates and lookup tables of cablemap.core.predicates
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_, ok_, raises
+from cablemap.core import predicates
+from cablemap.core.consts import STATIONS
+from cablemap.core.predicates import origins_for_country, origins_for_region, countries_for_origin, \
+    origin_filter, COUNTRIES, REGIONS
+
+
+def test_country_predicates():
+    def check(country):
+        pred = getattr(predicates, 'origin_%s' % country)
+        origins = origins_for_country(country)
+        ok_(origins)
+        for origin in STATIONS:
+            eq_(origin in origins, pred(origin))
+    for country in COUNTRIES:
+        yield check, country
+
+
+def test_region_predicates():
+    def check(region):
+        pred = getattr(predicates, 'origin_%s' % region)
+        origins = origins_for_region(region)
+        for origin in STATIONS:
+            eq_(origin in origins, pred(origin))
+    for region in REGIONS:
+        yield check, region
+
+
+def test_regions():
+    origins = origins_for_region(u'europe')
+    ok_(u'BERLIN' in origins)
+    ok_(u'UNVIEVIENNA' in origins)
+    ok_(u'USEUBRUSSELS' in origins)
+    ok_(u'ROME' in origins)
+    ok_(u'UNROME' in origins)
+    ok_(u'CAIRO' not in origins)
+    ok_(u'DOHA' in origins_for_region(u'west_asia'))
+    eq_(frozenset([u'BEIJING', u'CHENGDU', u'GUANGZHOU', u'HONGKONG', u'SHANGHAI', u'SHENYANG']),
+        origins_for_country(u'china'))
+
+
+def test_fixed_predicates():
+    ok_(predicates.origin_australia(u'SYDNEY'))
+    ok_(not predicates.origin_australia(u'BERLIN'))
+    ok_(predicates.origin_barbados(u'BRIDGETOWN'))
+    ok_(not predicates.origin_barbados(u'BERLIN'))
+    ok_(predicates.origin_curacao(u'CURACAO'))
+    ok_(predicates.origin_qatar(u'DOHA'))
+
+
+def test_countries_for_origin():
+    eq_((u'germany',), countries_for_origin(u'BERLIN'))
+    eq_((u'barbados', u'grenada'), countries_for_origin(u'BRIDGETOWN'))
+    eq_((), countries_for_origin(u'STATE'))
+
+
+@raises(ValueError)
+def test_unknown_region():
+    origins_for_region(u'atlantis')
+
+
+@raises(ValueError)
+def test_unknown_country():
+    origins_for_country(u'atlantis')
+
+
+def test_origin_filter_collection():
+    pred = origin_filter(origins_for_region(u'europe'))
+    ok_(pred(u'09BERLIN1167'))
+    ok_(pred(u'09EMBASSYBERLIN1167'))
+    ok_(not pred(u'09CAIRO1'))
+    pred = origin_filter([u'CAIRO'])
+    ok_(pred(u'09CAIRO1'))
+    ok_(not pred(u'09BERLIN1167'))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests classification categories parsing.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_
+from cablemap.core.reader import parse_classification_categories
+
+_TEST_DATA = (
+    (u'Classified By: Ambassador Donald Duck for reasons 1.4 (b) and (d)\n\n1. (C) Summary', [u'B', u'D']),
+    (u'Classified By: PolCouns Donald Duck, Reasons 1.4b/d.', [u'B', u'D']),
+    (u'Classified By: Donald Duck, reason 1.5 (B, D, and H)', [u'B', u'D', u'H']),
+    (u'Classified By: Donald Duck, reasons 1.4 (c), (d) and (c)', [u'C', u'D']),
+    (u'Classified By: Donald Duck, E.O. 12958, reason 1.4 (b)', [u'B']),
+    (u'Classified By: Donald Duck\n\n1. (C) Summary: bla (a)', []),
+    (u'UNCLASSIFIED\n\n1. Summary: reasons 1.4 (b)', []),
+)
+
+def test_parse_classification_categories():
+    def check(content, expected):
+        eq_(expected, parse_classification_categories(content))
+    for content, expected in _TEST_DATA:
+        yield check, content, expected
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.reader._clean_html against the former implementation.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import codecs
+import random
+from nose.tools import eq_
+from cablemap.core import reader
+
+_DATA = os.path.join(os.path.dirname(__file__), 'data-subject', 'in')
+
+
+def _sequential_clean_html(html):
+    content = html.replace(u'&#x000A;', u'\n').replace(u'¶', '')
+    content = reader._LINK_PATTERN.sub(u'', content)
+    content = reader._HTML_TAG_PATTERN.sub(u'', content)
+    content = reader._BACKSLASH_PATTERN.sub(u'\n', content)
+    return content
+
+
+def _check(html):
+    eq_(_sequential_clean_html(html), reader._clean_html(html))
+
+
+def test_cables():
+    for name in sorted(os.listdir(_DATA)):
+        html = codecs.open(os.path.join(_DATA, name), 'rb', 'utf-8').read()
+        for section in reader._CONTENT_PATTERN.findall(html):
+            yield _check, section
+
+
+def test_edge_cases():
+    for html in (u'', u'abc', u'<<a x>b>', u'</<a>b>', u'<a <b>c', u'<b <a>', u'a < b', u'<a¶>x</a>',
+                 u'<¶b>', u'&#x00¶0A;', u'\\¶&#x000A;', u'x\\  ', u'x\\ <b>\n', u'x\\\\&#x000A;',
+                 u'<a href="#par1">¶</a>1. (C) Text\\&#x000A;'):
+        yield _check, html
+
+
+def test_random():
+    rnd = random.Random(42)
+    tokens = (u'<', u'>', u'a', u'/', u'b', u' ', u'\\', u'\n', u'¶', u'&#x000A;', u'x', u'<a ', u'</a>', u'<b>')
+    for _ in range(500):
+        yield _check, u''.join(rnd.choice(tokens) for _ in range(rnd.randint(0, 20)))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests comment parsing.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_
+from cablemap.core.reader import parse_comment
+
+_TEST_DATA = (
+    (u'11. (C) Comment: Progress Line 1\nLine 2.  End Comment. \nLine 3', u'Progress Line 1 Line 2.'),
+    (u'3. (C) BEGIN COMMENT: This is\n   it. END COMMENT.', u'This is it.'),
+    (u'4. Comment. No period END COMMENT', u'No period.'),
+    (u'END SUMMARY. 2. Bla. END COMMENT.', None),
+    (u'1. (C) Summary: No comment here. End Summary.', None),
+)
+
+def test_parse_comment():
+    def check(content, expected):
+        eq_(expected, parse_comment(content))
+    for content, expected in _TEST_DATA:
+        yield check, content, expected
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
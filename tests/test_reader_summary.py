@@ -13,7 +13,7 @@ Tests summary parsing.
 :license:      BSD license
 """
 from nose.tools import eq_
-from cablemap.core.reader import parse_summary
+from cablemap.core.reader import parse_summary, ContentSections
 
 _TEST_DATA = (
     # 72TEHRAN5055
@@ -147,6 +147,15 @@ def test_summary():
     for content, expected in _TEST_DATA:
         yield check, content, expected
 
+
+def test_summary_sections():
+    def check(content, expected):
+        eq_(expected, parse_summary(content, sections=ContentSections(content)))
+
+    for content, expected in _TEST_DATA:
+        yield check, content, expected
+
+
 if __name__ == '__main__':
     import nose
     nose.core.runmodule()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the HTTP response cache.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import gzip
+import sqlite3
+import threading
+from urllib.error import URLError
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from nose.tools import eq_, ok_
+from helpers import with_tempdir
+from cablemap.core import utils, cable_by_url
+from cablemap.core.cache import ResponseCache, _RESPONSE_CACHE_FILENAME, _ACCESS_COMMIT_INTERVAL
+
+_FILENAME = os.path.join(os.path.dirname(__file__), 'data-subject', 'in', '07BERN881.html')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match'),
+                                     self.headers.get('If-Modified-Since')))
+        validators = self.path != '/plain'
+        if validators and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        with open(_FILENAME, 'rb') as f:
+            body = gzip.compress(f.read())
+        self.send_response(200)
+        if validators:
+            self.send_header('ETag', '"v1"')
+            self.send_header('Last-Modified', 'Wed, 01 Dec 2010 12:00:00 GMT')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _with_cache(test):
+    def wrapper(cache_dir):
+        server = HTTPServer(('127.0.0.1', 0), _Handler)
+        server.requests = []
+        thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        cache = ResponseCache(cache_dir)
+        previous = utils.set_response_cache(cache)
+        try:
+            test(cache, server, 'http://127.0.0.1:%d' % server.server_address[1])
+        finally:
+            utils.set_response_cache(previous)
+            cache.close()
+            server.shutdown()
+    wrapper.__name__ = test.__name__
+    return with_tempdir(wrapper)
+
+
+@_with_cache
+def test_revalidate(cache, server, base):
+    url = base + '/cable'
+    cable = cable_by_url(url)
+    eq_(u'07BERN881', cable.reference_id)
+    ok_(url in cache)
+    eq_(cable.subject, cable_by_url(url).subject)
+    eq_([('/cable', None, None), ('/cable', '"v1"', 'Wed, 01 Dec 2010 12:00:00 GMT')], server.requests)
+
+
+@_with_cache
+def test_no_validators(cache, server, base):
+    url = base + '/plain'
+    eq_(cable_by_url(url).subject, cable_by_url(url).subject)
+    eq_([('/plain', None, None)] * 2, server.requests)
+
+
+@_with_cache
+def test_max_age(cache, server, base):
+    cache.max_age = 3600
+    url = base + '/plain'
+    eq_(cable_by_url(url).subject, cable_by_url(url).subject)
+    eq_(1, len(server.requests))
+
+
+@_with_cache
+def test_offline(cache, server, base):
+    url = base + '/cable'
+    cable = cable_by_url(url)
+    cache.offline = True
+    eq_(cable.subject, cable_by_url(url).subject)
+    eq_(1, len(server.requests))
+    try:
+        cable_by_url(base + '/other')
+        ok_(False, 'Expected an error for an uncached URL')
+    except URLError:
+        pass
+    eq_(1, len(server.requests))
+
+
+@with_tempdir
+def test_lru(cache_dir):
+    cache = ResponseCache(cache_dir, max_size=1500)
+    for i in range(3):
+        cache.put('u%d' % i, os.urandom(400).hex(), 'e%d' % i)
+    eq_(3, len(cache))
+    ok_(cache.get('u0') is not None)
+    cache.put('u3', os.urandom(400).hex())
+    eq_(3, len(cache))
+    ok_('u1' not in cache)
+    for url in ('u0', 'u2', 'u3'):
+        ok_(url in cache)
+    ok_(cache.size <= 1500)
+    body = os.urandom(400).hex()
+    cache.put('u0', body, 'x', 'y')
+    eq_((body, 'x', 'y', False), cache.get('u0'))
+    cache.close()
+    # The access order survives reopening the cache
+    cache = ResponseCache(cache_dir, max_size=1500)
+    eq_(3, len(cache))
+    cache.get('u2')
+    cache.put('u4', os.urandom(400).hex())
+    ok_('u3' not in cache)
+    cache.clear()
+    eq_(0, len(cache))
+    eq_(0, cache.size)
+    cache.close()
+
+
+@with_tempdir
+def test_access_batched(cache_dir):
+    cache = ResponseCache(cache_dir)
+    cache.put('u0', u'body')
+    conn = sqlite3.connect(os.path.join(cache_dir, _RESPONSE_CACHE_FILENAME))
+    accessed = lambda: conn.execute('SELECT accessed FROM responses').fetchone()[0]
+    eq_(1, accessed())
+    for _ in range(_ACCESS_COMMIT_INTERVAL - 1):
+        cache.get('u0')
+    # Not committed yet
+    eq_(1, accessed())
+    cache.get('u0')
+    eq_(_ACCESS_COMMIT_INTERVAL + 1, accessed())
+    cache.get('u0')
+    cache.close()
+    eq_(_ACCESS_COMMIT_INTERVAL + 2, accessed())
+    conn.close()
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests the full-text index.
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, ok_
+from helpers import with_tempdir
+from cablemap.core.search import tokenize, IndexWriter, FullTextIndex
+
+_DOCS = (
+    (u'09BERLIN1', u'1. (C) SUMMARY: The minister met the ambassador in Berlin. END SUMMARY.'),
+    (u'09BERLIN2', u'2. (SBU) The ambassador said the minister would visit Iran.'),
+    (u'09MADRID3', u'1. (C) Spain supports the sanctions against Iran.\n\nXXXXXXXXXXXX said nothing.'),
+    (u'09ROME4', u'----------\nThe North Korea talks failed. The minister of Italy was not amused.'),
+    (u'09ROME5', u'SIPDIS\nNothing to report.'),
+)
+
+
+def _write(directory, docs=_DOCS, **kw):
+    writer = IndexWriter(directory, **kw)
+    for canonical_id, content in docs:
+        writer.add(canonical_id, content)
+    writer.close()
+
+
+def _levels(directory):
+    with open(os.path.join(directory, 'segments')) as f:
+        return [int(line.split()[1]) for line in f]
+
+
+def test_tokenize():
+    eq_([u'the', u'minister', u'met', u'the', u'ambassador', u'in', u'berlin'], tokenize(_DOCS[0][1]))
+    eq_([u'spain', u'supports', u'the', u'sanctions', u'against', u'iran', u'said', u'nothing'], tokenize(_DOCS[2][1]))
+
+
+@with_tempdir
+def test_term(directory):
+    _write(directory)
+    with FullTextIndex(directory) as index:
+        eq_(5, len(index))
+        eq_([u'09BERLIN1', u'09BERLIN2', u'09ROME4'], index.term(u'minister'))
+        eq_([u'09BERLIN1', u'09BERLIN2', u'09ROME4'], index.term(u'Minister'))
+        eq_([], index.term(u'summary'))
+        eq_([], index.term(u'xxxxxxxxxxxx'))
+        eq_([], index.term(u'unknown'))
+
+
+@with_tempdir
+def test_phrase(directory):
+    _write(directory)
+    with FullTextIndex(directory) as index:
+        eq_([u'09BERLIN2'], index.phrase(u'the minister would'))
+        eq_([u'09ROME4'], index.phrase(u'North Korea'))
+        eq_([], index.phrase(u'korea north'))
+        eq_([u'09BERLIN1', u'09BERLIN2'], index.phrase(u'the ambassador'))
+
+
+@with_tempdir
+def test_boolean(directory):
+    _write(directory)
+    with FullTextIndex(directory) as index:
+        eq_([u'09BERLIN2'], index.search(u'minister iran'))
+        eq_([u'09BERLIN2'], index.search(u'minister AND iran'))
+        eq_([u'09BERLIN1', u'09BERLIN2', u'09MADRID3', u'09ROME4'], index.search(u'minister OR iran'))
+        eq_([u'09BERLIN1', u'09ROME4'], index.search(u'minister -iran'))
+        eq_([u'09BERLIN1', u'09ROME4'], index.search(u'minister NOT iran'))
+        eq_([u'09MADRID3', u'09ROME5'], index.search(u'NOT minister'))
+        eq_([u'09MADRID3', u'09ROME4'], index.search(u'(sanctions OR "north korea") -ambassador'))
+
+
+@with_tempdir
+def test_invalid_query(directory):
+    _write(directory)
+    with FullTextIndex(directory) as index:
+        for query in (u'(minister OR iran', u'minister NOT', u'NOT', u'NOT NOT', u'(NOT)', u'minister OR'):
+            try:
+                index.search(query)
+                ok_(False, 'Expected a ValueError for "%s"' % query)
+            except ValueError:
+                pass
+
+
+@with_tempdir
+def test_merge(directory):
+    _write(directory, segment_size=1, merge_factor=2)
+    eq_([2, 0], _levels(directory))
+    with FullTextIndex(directory) as index:
+        eq_(5, len(index))
+        eq_([u'09BERLIN1', u'09BERLIN2', u'09ROME4'], index.term(u'minister'))
+        eq_([u'09ROME4'], index.phrase(u'North Korea'))
+
+
+@with_tempdir
+def test_update_and_delete(directory):
+    _write(directory)
+    writer = IndexWriter(directory)
+    writer.add(u'09ROME4', u'The talks with North Korea succeeded.')
+    writer.delete(u'09BERLIN2')
+    writer.close()
+    with FullTextIndex(directory) as index:
+        eq_(4, len(index))
+        eq_([u'09BERLIN1'], index.term(u'minister'))
+        eq_([u'09ROME4'], index.term(u'succeeded'))
+        eq_([], index.term(u'failed'))
+    writer = IndexWriter(directory)
+    writer.optimize()
+    eq_(1, len(_levels(directory)))
+    with FullTextIndex(directory) as index:
+        eq_(4, len(index))
+        eq_([u'09BERLIN1'], index.term(u'minister'))
+        eq_([u'09ROME4'], index.term(u'succeeded'))
+
+
+@with_tempdir
+def test_buffered_update_and_delete(directory):
+    writer = IndexWriter(directory)
+    writer.add(u'09BERLIN1', u'alpha')
+    writer.delete(u'09BERLIN1')
+    writer.add(u'09BERLIN2', u'alpha beta')
+    writer.add(u'09BERLIN2', u'gamma')
+    writer.delete(u'09ROME4')
+    writer.add(u'09ROME4', u'delta')
+    writer.close()
+    with FullTextIndex(directory) as index:
+        eq_(2, len(index))
+        eq_([], index.term(u'alpha'))
+        eq_([], index.term(u'beta'))
+        eq_([u'09BERLIN2'], index.term(u'gamma'))
+        eq_([u'09ROME4'], index.term(u'delta'))
+        eq_([u'09BERLIN2', u'09ROME4'], index.search(u'NOT alpha'))
+    writer = IndexWriter(directory)
+    writer.optimize()
+    with FullTextIndex(directory) as index:
+        eq_(2, len(index))
+        eq_([u'09BERLIN2'], index.term(u'gamma'))
+        eq_([u'09BERLIN2', u'09ROME4'], index.search(u'NOT alpha'))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
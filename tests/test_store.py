@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.store
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+import shutil
+from nose.tools import eq_, ok_, raises
+from helpers import with_tempdir
+from cablemap.core.models import cable_from_file, cable_from_row, _RECORD_FIELDS
+from cablemap.core.store import CableStore, CableView, store_from_source
+
+_DATA_DIR = os.path.join(os.path.dirname(__file__), 'data-subject', 'in')
+
+_CONTENT = u'''CONFIDENTIAL ROME %(sn)06d
+
+E.O. 12958: DECL: 03/05/2019
+TAGS: PREL, PGOV, IT
+SUBJECT: CAFÉ MEETING NUMBER %(sn)d
+
+REF: A. 08 STATE 1234
+     B. 09 ROME 99
+
+Classified By: Ambassador Spogli for reasons 1.4 (b) and (d)
+
+1. (C) SUMMARY: The minister said that. END SUMMARY.
+
+2. (C) COMMENT: The minister would. END COMMENT.
+
+SPOGLI
+'''
+
+_HEADER = u'''VZCZCXRO1234
+PP RUEHAG
+DE RUEHRO #%(sn)04d/01 0641234
+ZNY CCCCC ZZH
+P 051234Z MAR 09
+FM AMEMBASSY ROME
+TO RUEHC/SECSTATE WASHDC PRIORITY 1234
+INFO RUCNMEM/EU MEMBER STATES COLLECTIVE'''
+
+
+def _cables():
+    cables = [cable_from_file(os.path.join(_DATA_DIR, name)) for name in sorted(os.listdir(_DATA_DIR))]
+    cables.extend(cable_from_row((str(sn), u'3/5/2009 12:34', u'09ROME%d' % sn, u'Embassy Rome', u'CONFIDENTIAL',
+                                  u'', _HEADER % {'sn': sn}, _CONTENT % {'sn': sn}))
+                  for sn in range(10, 15))
+    return cables
+
+
+def _eq_cable(expected, view):
+    for name in _RECORD_FIELDS:
+        value = getattr(expected, name)
+        if type(value) is tuple:
+            # The views return lists
+            value = list(value)
+        eq_(value, getattr(view, name), name)
+
+
+def test_roundtrip():
+    cables = _cables()
+    store = CableStore(include_text=True)
+    store.extend(cables)
+    eq_(len(cables), len(store))
+    for cable, view in zip(cables, store):
+        ok_(isinstance(view, CableView))
+        _eq_cable(cable, view)
+    eq_(u'09ROME14', store[-1].reference_id)
+    eq_(u'CAFÉ MEETING NUMBER 12', store.get(u'09ROME12').subject)
+    ok_(u'08TRIPOLI220' in store)
+    ok_(u'09ROME99' not in store)
+    eq_(None, store.get(u'09ROME99'))
+    eq_(store[0], store[0])
+
+
+def test_index_after_append():
+    cables = _cables()
+    store = CableStore()
+    store.extend(cables[:2])
+    ok_(cables[0].reference_id in store)
+    store.append(cables[2])
+    eq_(2, store._lookup(cables[2].reference_id))
+
+
+@raises(IndexError)
+def test_index_error():
+    CableStore()[0]
+
+
+def test_delete():
+    store = CableStore()
+    store.extend(_cables())
+    ok_(store.delete(u'09ROME11'))
+    ok_(not store.delete(u'09ROME11'))
+    eq_(9, len(store))
+    ok_(u'09ROME11' not in store)
+    eq_(None, store.get(u'09ROME11'))
+    ok_(u'09ROME11' not in list(store.column('reference_id')))
+    eq_(9, len(list(store)))
+    eq_(1, store.deleted[6])
+    eq_(u'09ROME12', store[7].reference_id)
+
+
+@raises(IndexError)
+def test_deleted_index_error():
+    store = CableStore()
+    store.extend(_cables())
+    store.delete(u'09ROME14')
+    store[-1]
+
+
+def test_no_text():
+    store = CableStore()
+    ok_(not store.include_text)
+    store.extend(_cables())
+    store_with_text = CableStore(include_text=True)
+    store_with_text.extend(_cables())
+    view = store.get(u'09ROME10')
+    eq_(None, view.content)
+    eq_(None, view.header)
+    eq_([u'PREL', u'PGOV', u'IT'], view.tags)
+    ok_(store.nbytes() < store_with_text.nbytes())
+
+
+def test_codes():
+    store = CableStore()
+    store.extend(_cables())
+    codes, values = store.codes('origin')
+    eq_(len(store), len(codes))
+    eq_(None, values[0])
+    eq_([cable.origin for cable in store], [values[code] for code in codes])
+    eq_(list(store.column('classification')), [cable.classification for cable in store])
+
+
+def test_created():
+    store = CableStore()
+    store.extend(_cables())
+    eq_(u'2009-03-05 12:34', store.get(u'09ROME10').created)
+    eq_(1236256440, store.timestamps[-1])
+
+
+def test_created_seconds():
+    cables = _cables()[-2:]
+    cables[0].created = u'2009-03-05 12:34:00'
+    cables[1].created = u'2009-03-05 12:34:56'
+    store = CableStore()
+    store.extend(cables)
+    eq_([u'2009-03-05 12:34:00', u'2009-03-05 12:34:56'], list(store.column('created')))
+    eq_(1236256440, store.timestamps[0])
+
+
+def test_widen_codes():
+    class FakeCable(object):
+        def __init__(self, n):
+            self.reference_id = self.canonical_id = u'09ROME%d' % n
+            self.classification = u'CLASS%d' % n
+            self.origin = self.released = self.created = None
+            self.is_partial = False
+            self.subject = self.summary = self.comment = self.transmission_id = None
+            self.nondisclosure_deadline = self.header = self.content = None
+            self.tags = self.signed_by = self.classified_by = self.classification_categories = ()
+            self.media_uris = self.references = self.recipients = self.info_recipients = ()
+    store = CableStore()
+    store.extend(FakeCable(n) for n in range(300))
+    eq_(u'CLASS299', store[299].classification)
+    eq_(u'CLASS0', store[0].classification)
+    eq_(None, store[0].created)
+
+
+def test_store_from_source():
+    store = store_from_source(_DATA_DIR)
+    eq_(5, len(store))
+    eq_(set(name[:-5] for name in os.listdir(_DATA_DIR)), set(store.column('reference_id')))
+
+
+@with_tempdir
+def test_store_from_source_manifest(directory):
+    source = os.path.join(directory, 'cables')
+    shutil.copytree(_DATA_DIR, source)
+    manifest = os.path.join(directory, 'manifest.csv.gz')
+    store = store_from_source(source, manifest=manifest)
+    eq_(5, len(store))
+    os.remove(os.path.join(source, '08TRIPOLI220.html'))
+    eq_(store, store_from_source(source, manifest=manifest, store=store))
+    eq_(4, len(store))
+    ok_(u'08TRIPOLI220' not in store)
+    shutil.copy(os.path.join(_DATA_DIR, '08TRIPOLI220.html'), source)
+    store_from_source(source, manifest=manifest, store=store)
+    eq_(5, len(store))
+    eq_(1, list(store.column('reference_id')).count(u'08TRIPOLI220'))
+    # Changed cable
+    with open(os.path.join(source, '07BERN881.html'), 'a') as f:
+        f.write('\n')
+    store_from_source(source, manifest=manifest, store=store)
+    eq_(5, len(store))
+    eq_(1, list(store.column('reference_id')).count(u'07BERN881'))
+    eq_(7, len(store.deleted))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
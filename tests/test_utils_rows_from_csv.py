@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.utils.rows_from_csv
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+import os
+from nose.tools import eq_, raises
+from helpers import write_csv, with_tempdir
+from cablemap.core.utils import rows_from_csv, cables_from_csv, cables_from_source, _scan_csv, _read_csv
+from cablemap.core.predicates import origin_filter, classification_filter
+
+_ROWS = (
+    (u'1', u'12/28/1966 18:48', u'66BUENOSAIRES2481', u'Embassy Buenos Aires', u'UNCLASSIFIED', u'',
+     u'header\nline', u'UNCLAS BUENOS AIRES 2481\n\nSUBJECT: A "quoted" subject\n\nTAGS: PREL\n'),
+    (u'2', u'3/5/2009 9:05', u'09BERLIN1167', u'Embassy Berlin', u'confidential', u'08BERLIN1',
+     u'', u'C O N F I D E N T I A L BERLIN 001167\n\nSUBJECT: Stra\xdfe\n'),
+    (u'3', u'1/1/2010 0:00', u'10MADRID87', u'Embassy Madrid', u'SECRET', u'',
+     u'', u'S E C R E T MADRID 000087\n'),
+)
+
+
+def _write_csv(directory, rows, encoding='utf-8'):
+    return write_csv(os.path.join(directory, 'cables.csv'), rows, encoding, u'\n\n')
+
+
+@with_tempdir
+def test_rows(directory):
+    filename = _write_csv(directory, _ROWS)
+    eq_(list(_ROWS), list(rows_from_csv(filename)))
+
+
+@with_tempdir
+def test_rows_predicate(directory):
+    filename = _write_csv(directory, _ROWS)
+    res = [row[2] for row in rows_from_csv(filename, lambda ref: ref.startswith(u'09'))]
+    eq_([u'09BERLIN1167'], res)
+
+
+@with_tempdir
+def test_rows_encoding(directory):
+    filename = _write_csv(directory, _ROWS, 'latin-1')
+    eq_(list(_ROWS), list(rows_from_csv(filename, encoding='latin-1')))
+
+
+@with_tempdir
+def test_rows_encoding_fallback(directory):
+    filename = _write_csv(directory, _ROWS, 'utf-16')
+    eq_(list(_ROWS), list(rows_from_csv(filename, encoding='utf-16')))
+
+
+def _write_raw(directory, content):
+    filename = os.path.join(directory, 'cables.csv')
+    with open(filename, 'wb') as f:
+        f.write(content)
+    return filename
+
+
+@with_tempdir
+def test_rows_quoting(directory):
+    content = (b'1,"1/1/2010 0:00",10MADRID87,"Embassy, Madrid","SECRET","",'
+               b'"a ""doubled"" quote","escaped \\"\\\\\\" quote, \\\\"\r\n'
+               b'"2","1/2/2010 0:00","10MADRID88","Embassy Madrid","SECRET","","",unquoted body')
+    filename = _write_raw(directory, content)
+    eq_([(u'1', u'1/1/2010 0:00', u'10MADRID87', u'Embassy, Madrid', u'SECRET', u'',
+          u'a "doubled" quote', u'escaped "\\" quote, \\'),
+         (u'2', u'1/2/2010 0:00', u'10MADRID88', u'Embassy Madrid', u'SECRET', u'',
+          u'', u'unquoted body')],
+        list(rows_from_csv(filename)))
+
+
+@raises(ValueError)
+@with_tempdir
+def test_rows_malformed(directory):
+    filename = _write_raw(directory, b'"1","1/1/2010 0:00","10MADRID87","Embassy Madrid","SECRET","","header","body\n')
+    list(rows_from_csv(filename))
+
+
+@with_tempdir
+def test_rows_empty(directory):
+    filename = _write_raw(directory, b'')
+    eq_([], list(rows_from_csv(filename)))
+
+
+@with_tempdir
+def test_rows_row_predicate(directory):
+    filename = _write_csv(directory, _ROWS)
+    pred = classification_filter(lambda c: c.upper() in (u'CONFIDENTIAL', u'SECRET'))
+    eq_([u'09BERLIN1167', u'10MADRID87'], [row[2] for row in rows_from_csv(filename, pred)])
+    pred = classification_filter(lambda c: c.upper() in (u'CONFIDENTIAL', u'SECRET'),
+                                 origin_filter(lambda o: o == u'MADRID'))
+    eq_([u'10MADRID87'], [row[2] for row in rows_from_csv(filename, pred)])
+
+
+@raises(ValueError)
+def test_row_predicate_manifest():
+    cables_from_source('cables.csv', classification_filter(bool), manifest=object())
+
+
+@with_tempdir
+def test_cables_early_stop(directory):
+    filename = _write_csv(directory, _ROWS)
+    cables = cables_from_csv(filename)
+    cable = next(cables)
+    eq_(u'66BUENOSAIRES2481', cable.reference_id)
+    eq_(u'1966-12-28 18:48', cable.created)
+    eq_(u'A "quoted" subject', cable.subject)
+    cables.close()
+    eq_([], list(cables))
+
+
+def _accept_all(reference_id, classification):
+    return True
+
+
+def _csv_result(func, filename):
+    try:
+        return list(func(filename, _accept_all, 'utf-8'))
+    except ValueError:
+        return ValueError
+
+
+def test_scan_csv_like_csv_reader():
+    @with_tempdir
+    def check(directory, content):
+        filename = _write_raw(directory, content)
+        eq_(_csv_result(_read_csv, filename), _csv_result(_scan_csv, filename))
+    for content in (b'1,a,09BERLIN1,E\\,x,S,,h,b\n',
+                    b'1,a,09BERLIN1,E,S,,h\\,x,b\n',
+                    b'1,a,09BERLIN1,E,S,,h,b\\,c\n',
+                    b'1,a,09BERLIN1,E,S,,h,b\\\nc\n',
+                    b'1,a,09BERLIN1,E,S,,h,b\n2,a,09BERLIN2,E\\,x,S,,h,b\n3,a,09BERLIN3,E,S,,h,b\n',
+                    b'1,a,09BE"RLIN1,E,S,,h,b\n',
+                    b'1,a,09BERLIN1,E,S,,"h"x,b\n',
+                    b'1,a,09BERLIN1,E,S,,h,b,c\n',
+                    b'1,a,09BERLIN1,E,S,,h,"b",c\n',
+                    b'1,a,09BERLIN1,E,S,,h,b\n2,a,09BERLIN2,E,S,,h,b,c\n',
+                    b'1,a,09BERLIN1,E,S,,h\n'):
+        yield check, content
+
+
+@raises(ValueError)
+@with_tempdir
+def test_rows_extra_field(directory):
+    filename = _write_raw(directory, b'1,a,09BERLIN1,E,S,,h,b,c\n')
+    list(rows_from_csv(filename))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()
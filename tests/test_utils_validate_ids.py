@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2011 - 2015 -- Lars Heuer <heuer[at]semagia.com>
+# All rights reserved.
+#
+# License: BSD, see LICENSE.txt for more details.
+#
+"""\
+Tests cablemap.core.utils.validate_ids
+
+:author:       Lars Heuer (heuer[at]semagia.com)
+:organization: Semagia - <http://www.semagia.com/>
+:license:      BSD license
+"""
+from nose.tools import eq_
+from cablemap.core.c14n import canonicalize_id
+from cablemap.core.utils import validate_ids, reference_id_parts
+
+_IDS = (u'09BERLIN1167', u'05RIO123', u'08SECSTATE12', u'07SOIA828', u'10MADRID87', u'09BERLIN0123',
+        u'09BERLIN12345678', u'09FOO12', u'09BERLIN', u'', u'09berlin12', u'09BERLIN1\n', u'09BERLIN1167')
+
+
+def _expected(ids, canonicalize):
+    result = ([], [], [], [])
+    for reference_id in ids:
+        if canonicalize:
+            reference_id = canonicalize_id(reference_id)
+        try:
+            parts = reference_id_parts(reference_id)
+        except ValueError:
+            parts = (None, None, None)
+        for column, value in zip(result, (reference_id,) + tuple(parts)):
+            column.append(value)
+    return result
+
+
+def test_validate_ids():
+    eq_(_expected(_IDS, True), validate_ids(_IDS))
+
+
+def test_validate_ids_no_c14n():
+    eq_(_expected(_IDS, False), validate_ids(iter(_IDS), canonicalize=False))
+
+
+def test_validate_ids_columns():
+    ids, years, origins, serials = validate_ids([u'05RIO123', u'09FOO12'])
+    eq_([u'05RIODEJANEIRO123', u'09FOO12'], ids)
+    eq_([u'05', None], years)
+    eq_([u'RIODEJANEIRO', None], origins)
+    eq_([u'123', None], serials)
+
+
+def test_validate_empty():
+    eq_(([], [], [], []), validate_ids([]))
+    eq_(([], [], [], []), validate_ids([], canonicalize=False))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.core.runmodule()